@@ -0,0 +1,135 @@
+"""
+Two-tier cache for AI assistant answers: an exact tier keyed by the prompt
+and model parameters, and a semantic tier that reuses an answer when a
+paraphrased question retrieved the same building rows.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Sequence, Tuple
+
+import numpy as np
+
+import telemetry
+
+ANSWER_TTL = 24 * 3600
+MAX_EXACT_ENTRIES = 1024
+MAX_SEMANTIC_ENTRIES = 1024
+# Cosine similarity two questions must reach to share an answer
+SEMANTIC_THRESHOLD = 0.92
+
+
+def prompt_key(prompt: str, **params: Any) -> str:
+    """Hash of the full prompt plus every model parameter that affects the answer"""
+    payload = json.dumps({"prompt": prompt, **params}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def rows_key(row_ids: Sequence[Hashable]) -> str:
+    """Identity of the retrieved context, independent of the question wording"""
+    return hashlib.sha256(json.dumps([str(r) for r in row_ids]).encode()).hexdigest()
+
+
+class AnswerCache:
+    """
+    Both tiers are LRU ordered and bounded by entry count; entries also
+    expire after ``ttl`` seconds. Safe to share between sessions.
+    """
+
+    def __init__(
+        self,
+        ttl: float = ANSWER_TTL,
+        max_exact: int = MAX_EXACT_ENTRIES,
+        max_semantic: int = MAX_SEMANTIC_ENTRIES,
+        threshold: float = SEMANTIC_THRESHOLD,
+    ):
+        self.ttl = ttl
+        self.max_exact = max_exact
+        self.max_semantic = max_semantic
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._exact: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        # (rows key, question) -> (unit question embedding, answer, expires_at)
+        self._semantic: "OrderedDict[Tuple[str, str], Tuple[np.ndarray, str, float]]" = OrderedDict()
+        self._stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    def _count(self, name: str) -> None:
+        # Callers hold self._lock
+        self._stats[name] += 1
+        telemetry.count("cache_events_total", cache="answer", event=name)
+
+    @staticmethod
+    def _unit(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _evict(self, entries: OrderedDict, limit: int) -> None:
+        while len(entries) > limit:
+            entries.popitem(last=False)
+            self._count("evictions")
+
+    def _semantic_match(self, rows: str, question_embedding, now: float) -> Optional[Tuple[Tuple[str, str], float]]:
+        query = self._unit(question_embedding)
+        best, best_score = None, self.threshold
+        for key, (embedding, _, expires_at) in list(self._semantic.items()):
+            if expires_at < now:
+                del self._semantic[key]
+                self._count("expirations")
+                continue
+            if key[0] != rows:
+                continue
+            score = float(embedding @ query)
+            if score >= best_score:
+                best, best_score = key, score
+        return (best, best_score) if best else None
+
+    def get(self, key: str, rows: Optional[str] = None, question_embedding=None) -> Tuple[Optional[str], Optional[str]]:
+        """(answer, tier) where tier is "exact", "semantic" or None on a miss"""
+        now = time.time()
+        with self._lock:
+            entry = self._exact.get(key)
+            if entry is not None:
+                if entry[1] >= now:
+                    self._exact.move_to_end(key)
+                    self._count("exact_hits")
+                    return entry[0], "exact"
+                del self._exact[key]
+                self._count("expirations")
+            if rows is not None and question_embedding is not None:
+                match = self._semantic_match(rows, question_embedding, now)
+                if match:
+                    self._semantic.move_to_end(match[0])
+                    self._count("semantic_hits")
+                    return self._semantic[match[0]][1], "semantic"
+            self._count("misses")
+            return None, None
+
+    def put(self, key: str, answer: str, rows: Optional[str] = None, question: Optional[str] = None,
+            question_embedding=None) -> None:
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._exact[key] = (answer, expires_at)
+            self._exact.move_to_end(key)
+            self._evict(self._exact, self.max_exact)
+            if rows is not None and question is not None and question_embedding is not None:
+                semantic_key = (rows, question)
+                self._semantic[semantic_key] = (self._unit(question_embedding), answer, expires_at)
+                self._semantic.move_to_end(semantic_key)
+                self._evict(self._semantic, self.max_semantic)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._exact.clear()
+            self._semantic.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["exact_entries"] = len(self._exact)
+            stats["semantic_entries"] = len(self._semantic)
+        lookups = stats["exact_hits"] + stats["semantic_hits"] + stats["misses"]
+        stats["hit_ratio"] = (stats["exact_hits"] + stats["semantic_hits"]) / lookups if lookups else 0.0
+        return stats
@@ -0,0 +1,295 @@
+"""
+Headless JSON API over the same data layer as the Streamlit app. Every
+request thread shares the process-wide registry (model, building store,
+indexes, geocoder and caches), so machine clients skip the UI entirely.
+
+    python api_server.py --port 8600
+
+    GET  /health
+    GET  /location?location=Seattle, WA&rank_by=usable_sqft
+    POST /locations        {"locations": ["Seattle, WA", ...], "rank_by": "usable_sqft"}
+    GET  /real-estate?city=Seattle&state=WA
+    POST /real-estate      {"places": [{"city": "Seattle", "state": "WA"}, ...]}
+    GET  /retrieve?q=parking in Seattle&top_k=3
+    POST /retrieve         {"queries": ["...", ...], "top_k": 3, "filters": {"states": ["WA"]}}
+    GET  /metrics          Prometheus text: stage latency histograms, cache/retry/error counters
+    GET  /metrics.json     the same as JSON, plus the most recent request traces
+"""
+import argparse
+import json
+import logging
+from contextlib import nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+import telemetry
+from building_index import DEFAULT_RANK_KEY, RANK_KEYS
+
+logger = logging.getLogger(__name__)
+
+MAX_BATCH = 100
+MAX_TOP_K = 50
+FILTER_KEYS = ("states", "statuses", "locations")
+
+
+class APIError(Exception):
+    """Rejected request, reported to the client with ``status``"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, np.generic):
+        return value.item()
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def _rows_to_records(rows) -> List[Dict[str, Any]]:
+    from rexus_store import format_rexus_value
+
+    return [
+        {"position": int(position), **{column: format_rexus_value(value) for column, value in row.items()}}
+        for position, row in zip(rows.index, rows.to_dict("records"))
+    ]
+
+
+def _batch(payload: Dict[str, Any], key: str) -> List[Any]:
+    items = payload.get(key)
+    if not isinstance(items, list) or not items:
+        raise APIError(400, f"'{key}' must be a non-empty list")
+    if len(items) > MAX_BATCH:
+        raise APIError(413, f"At most {MAX_BATCH} {key} per request")
+    return items
+
+
+def _rank_by(value: Optional[str]) -> str:
+    rank_by = value or DEFAULT_RANK_KEY
+    if rank_by not in RANK_KEYS:
+        raise APIError(400, f"rank_by must be one of {sorted(RANK_KEYS)}")
+    return rank_by
+
+
+def _top_k(value: Any) -> int:
+    try:
+        top_k = int(value if value is not None else 3)
+    except (TypeError, ValueError):
+        raise APIError(400, "top_k must be an integer")
+    if not 1 <= top_k <= MAX_TOP_K:
+        raise APIError(400, f"top_k must be between 1 and {MAX_TOP_K}")
+    return top_k
+
+
+def _filters(value: Any) -> Optional[Dict[str, Any]]:
+    """Retrieval filters as HybridRetriever.filter_mask takes them"""
+    if value is None:
+        return None
+    if not isinstance(value, dict):
+        raise APIError(400, "filters must be an object")
+    unknown = sorted(set(value) - set(FILTER_KEYS))
+    if unknown:
+        raise APIError(400, f"Unknown filters {unknown}; expected some of {list(FILTER_KEYS)}")
+    filters = dict(value)
+    for key in ("states", "statuses"):
+        if key in filters and not (
+            isinstance(filters[key], list) and all(isinstance(item, str) for item in filters[key])
+        ):
+            raise APIError(400, f"filters.{key} must be a list of strings")
+    if "locations" in filters:
+        locations = filters["locations"]
+        if not isinstance(locations, list) or not all(
+            isinstance(place, list) and len(place) == 2 and all(isinstance(part, str) for part in place)
+            for place in locations
+        ):
+            raise APIError(400, 'filters.locations must be a list of [city, state] pairs, e.g. [["Seattle", "WA"]]')
+        filters["locations"] = [tuple(place) for place in locations]
+    return filters
+
+
+def fetch_locations(locations: List[str], rank_by: str) -> List[Optional[Dict[str, Any]]]:
+    from location_data import get_orchestrator
+
+    if not all(isinstance(location, str) for location in locations):
+        raise APIError(400, "locations must be strings like 'Seattle, WA'")
+    return get_orchestrator().fetch(locations, rank_by)
+
+
+def fetch_real_estate(places: List[Dict[str, str]], rank_by: str) -> List[Dict[str, Any]]:
+    from location_data import get_real_estate_data
+
+    results = []
+    for place in places:
+        if not isinstance(place, dict) or not place.get("city") or not place.get("state"):
+            raise APIError(400, "each place needs 'city' and 'state'")
+        results.append(get_real_estate_data(place["city"], place["state"], rank_by))
+    return results
+
+
+def retrieve_buildings(queries: List[str], top_k: int, filters: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Retrieval for a batch of queries, encoded in a single model call"""
+    from assistant import semantic_retrieve_rexus
+    from resources import refresh_if_stale, registry
+
+    if not all(isinstance(query, str) and query.strip() for query in queries):
+        raise APIError(400, "queries must be non-empty strings")
+    filters = _filters(filters)
+
+    refresh_if_stale()
+    emb_model = registry.get("emb_model")
+    retriever = registry.get("rexus_retriever")
+    with telemetry.span("retrieval.embed_query", queries=len(queries)):
+        embeddings = emb_model.encode(queries)
+    return [
+        {
+            "query": query,
+            "rows": _rows_to_records(
+                semantic_retrieve_rexus(query, retriever, emb_model, top_k, filters, question_emb=embeddings[i:i + 1])
+            ),
+        }
+        for i, query in enumerate(queries)
+    ]
+
+
+def health() -> Dict[str, Any]:
+    from resources import registry
+
+    names = ["rexus_df", "rexus_retriever", "emb_model", "geocoder", "census_snapshot", "score_table"]
+    return {"status": "ok", "loaded": {name: registry.is_loaded(name) for name in names}}
+
+
+class Text(str):
+    """A plain-text response body"""
+
+
+class APIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "NeighborhoodAPI/1.0"
+
+    def log_message(self, format, *args):
+        logger.info("%s - %s", self.address_string(), format % args)
+
+    def _send(self, status: int, payload: Any) -> None:
+        if isinstance(payload, Text):
+            body, content_type = payload.encode(), "text/plain; version=0.0.4"
+        else:
+            body, content_type = json.dumps(payload, default=_json_default).encode(), "application/json"
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self) -> bytes:
+        """The whole request body, read before routing so none is left on a keep-alive connection"""
+        if self.headers.get("Transfer-Encoding"):
+            self.close_connection = True
+            raise APIError(411, "Send the body with a Content-Length")
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            self.close_connection = True
+            raise APIError(400, "Invalid Content-Length")
+        return self.rfile.read(length) if length > 0 else b""
+
+    def _body(self) -> Dict[str, Any]:
+        try:
+            payload = json.loads(self._raw_body or b"{}")
+        except json.JSONDecodeError as e:
+            raise APIError(400, f"Invalid JSON: {e}")
+        if not isinstance(payload, dict):
+            raise APIError(400, "Request body must be a JSON object")
+        return payload
+
+    def _route(self, method: str) -> Tuple[int, Any]:
+        url = urlparse(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        route = (method, url.path.rstrip("/") or "/")
+
+        if route == ("GET", "/health"):
+            return 200, health()
+        if route == ("GET", "/metrics"):
+            return 200, Text(telemetry.prometheus_text())
+        if route == ("GET", "/metrics.json"):
+            return 200, telemetry.snapshot()
+        if route == ("GET", "/location"):
+            if not query.get("location"):
+                raise APIError(400, "'location' is required")
+            result = fetch_locations([query["location"]], _rank_by(query.get("rank_by")))[0]
+            if result is None:
+                raise APIError(400, f"Could not parse '{query['location']}' as 'City, State'")
+            return 200, result
+        if route == ("POST", "/locations"):
+            payload = self._body()
+            locations = _batch(payload, "locations")
+            results = fetch_locations(locations, _rank_by(payload.get("rank_by")))
+            return 200, {"results": [{"location": loc, "data": data} for loc, data in zip(locations, results)]}
+        if route == ("GET", "/real-estate"):
+            place = {"city": query.get("city"), "state": query.get("state")}
+            return 200, fetch_real_estate([place], _rank_by(query.get("rank_by")))[0]
+        if route == ("POST", "/real-estate"):
+            payload = self._body()
+            places = _batch(payload, "places")
+            return 200, {"results": fetch_real_estate(places, _rank_by(payload.get("rank_by")))}
+        if route == ("GET", "/retrieve"):
+            if not query.get("q"):
+                raise APIError(400, "'q' is required")
+            return 200, retrieve_buildings([query["q"]], _top_k(query.get("top_k")), None)[0]
+        if route == ("POST", "/retrieve"):
+            payload = self._body()
+            queries = _batch(payload, "queries")
+            return 200, {"results": retrieve_buildings(queries, _top_k(payload.get("top_k")), payload.get("filters"))}
+        raise APIError(404, f"No route for {method} {url.path}")
+
+    def _handle(self, method: str) -> None:
+        path = urlparse(self.path).path.rstrip("/") or "/"
+        # Scrapes are not traced, or they would push real requests out of the recent traces
+        with nullcontext() if path.startswith("/metrics") else telemetry.trace("api", method=method, path=path):
+            try:
+                self._raw_body = self._read_body()
+                status, payload = self._route(method)
+            except APIError as e:
+                status, payload = e.status, {"error": str(e)}
+            except Exception as e:
+                logger.exception("Unhandled error for %s %s", method, self.path)
+                status, payload = 500, {"error": str(e) or type(e).__name__}
+        telemetry.count("api_requests_total", method=method, path=path if status != 404 else "unmatched", status=status)
+        self._send(status, payload)
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+
+def make_server(host: str = "127.0.0.1", port: int = 8600) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), APIHandler)
+    server.daemon_threads = True
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless JSON API for location data and building retrieval")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--warm", action="store_true", help="load the building store and geocoder before serving")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    from dotenv import load_dotenv
+    load_dotenv()
+    if args.warm:
+        from resources import registry
+        registry.get("city_state_index")
+        registry.get("geocoder")
+    server = make_server(args.host, args.port)
+    logger.info("Serving on http://%s:%d", args.host, args.port)
+    server.serve_forever()
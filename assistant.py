@@ -0,0 +1,169 @@
+"""
+AI assistant: building retrieval, grounded prompts and streaming
+completions run off the Streamlit script thread.
+
+The OpenAI client honours ``OPENAI_BASE_URL``, so the assistant can be
+pointed at any compatible server, e.g. ``benchmarks/fake_completion_server.py``.
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+import telemetry
+
+logger = logging.getLogger(__name__)
+
+LLM_PARAMS = {"model": os.getenv("OPENAI_MODEL", "gpt-3.5-turbo"), "temperature": 0.2, "max_tokens": 350}
+
+_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="llm-stream")
+_client_lock = threading.Lock()
+_client: Dict[str, Any] = {}
+
+
+def openai_client():
+    """Process-wide OpenAI client (keeps its HTTP connection pool warm)"""
+    with _client_lock:
+        if "default" not in _client:
+            from openai import OpenAI
+            _client["default"] = OpenAI(base_url=os.getenv("OPENAI_BASE_URL") or None)
+        return _client["default"]
+
+
+class AnswerStream:
+    """
+    One streaming completion. The worker appends text chunks as they
+    arrive; readers poll :attr:`text` and :attr:`done` from any thread.
+    ``cancel()`` stops reading and closes the HTTP stream at the next chunk.
+    """
+
+    def __init__(self, question: str, trace: Optional[telemetry.Trace] = None):
+        self.question = question
+        self.trace = trace
+        self.chunks: List[str] = []
+        self.error: Optional[str] = None
+        self.started_at = time.monotonic()
+        self._perf_started = time.perf_counter()
+        self.first_token_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._done = threading.Event()
+        self._cancelled = threading.Event()
+
+    @property
+    def text(self) -> str:
+        return "".join(self.chunks)
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    @property
+    def ttft(self) -> Optional[float]:
+        """Seconds from the request to the first token"""
+        return None if self.first_token_at is None else self.first_token_at - self.started_at
+
+    @property
+    def latency(self) -> Optional[float]:
+        """Seconds from the request to the last token"""
+        return None if self.finished_at is None else self.finished_at - self.started_at
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+    def _run(self, messages: List[Dict[str, str]], params: Dict[str, Any]) -> None:
+        try:
+            stream = openai_client().chat.completions.create(messages=messages, stream=True, **params)
+            try:
+                for chunk in stream:
+                    if self.cancelled:
+                        break
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        if self.first_token_at is None:
+                            self.first_token_at = time.monotonic()
+                        self.chunks.append(delta)
+            finally:
+                stream.close()
+        except Exception as e:
+            self.error = f"Error with OpenAI API: {e}"
+            telemetry.count("upstream_errors_total", upstream="openai")
+        finally:
+            self.finished_at = time.monotonic()
+            # Reported against the trace of the question that started the stream
+            if self.ttft is not None:
+                telemetry.record_span("llm.first_token", self._perf_started, self.ttft, self.trace)
+            telemetry.record_span("llm.stream", self._perf_started, self.latency, self.trace,
+                                  error="error" if self.error else None, cancelled=self.cancelled)
+            logger.info(
+                "Answer for %r: ttft=%s latency=%.3fs cancelled=%s error=%s",
+                self.question, None if self.ttft is None else round(self.ttft, 3), self.latency,
+                self.cancelled, self.error,
+            )
+            self._done.set()
+
+
+def semantic_retrieve_rexus(user_question, rexus_retriever, emb_model, top_k=3, filters=None, question_emb=None):
+    """
+    Retrieve the top K building rows for the user_question, fusing BM25 over
+    address/city/county/state/zip with embedding similarity. Structured
+    filters (states, statuses, locations) restrict the rows before scoring.
+    Pass question_emb to reuse an embedding the caller already computed.
+    """
+
+    if question_emb is None:
+        with telemetry.span("retrieval.embed_query"):
+            question_emb = emb_model.encode([user_question])
+    with telemetry.span("retrieval.search", top_k=top_k):
+        return rexus_retriever.retrieve(user_question, question_emb, top_k, filters)
+
+
+def build_prompt(user_question: str, retrieved_rows) -> str:
+    """The grounded prompt: retrieved building rows as context, then the question"""
+    from rexus_store import format_rexus_value
+
+    context_snippets = []
+    for idx, row in retrieved_rows.iterrows():
+        snippet = (
+            f"Address: {row['Bldg Address1']}, {row['Bldg City']}, {row['Bldg State']} | "
+            f"Status: {row['Bldg Status']} | Type: {row['Property Type']} | "
+            f"Usable SqFt: {format_rexus_value(row['Bldg ANSI Usable'])} | Parking: {format_rexus_value(row['Total Parking Spaces'])} | "
+            f"Owned/Leased: {row['Owned/Leased']} | Built: {format_rexus_value(row['Construction Date'])} | "
+            f"Historical: {format_rexus_value(row['Historical Status'])} | ABA Accessibility: {row.get('ABA Accessibility Flag', 'Unknown')}"
+        )
+        context_snippets.append(snippet)
+    context = "\n".join(context_snippets)
+
+    return (
+        "You are an expert assistant answering questions about US government buildings. "
+        "Use ONLY the data provided below to answer the user's question. If the answer is not in the data, say so.\n\n"
+        f"Building Data:\n{context}\n\n"
+        f"User Question: {user_question}\n"
+        "Answer:"
+    )
+
+
+def start_answer(
+    question: str,
+    prompt: str,
+    params: Optional[Dict[str, Any]] = None,
+    on_complete: Optional[Callable[[AnswerStream], None]] = None,
+) -> AnswerStream:
+    """Start streaming an answer in the background and return immediately"""
+    answer = AnswerStream(question, telemetry.current_trace())
+
+    def run():
+        answer._run([{"role": "system", "content": prompt}], params or LLM_PARAMS)
+        if on_complete is not None and not answer.cancelled and not answer.error:
+            on_complete(answer)
+
+    _pool.submit(run)
+    return answer
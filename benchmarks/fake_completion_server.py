@@ -0,0 +1,74 @@
+"""
+Local stand-in for the OpenAI chat completions endpoint, streaming a canned
+answer word by word so the assistant can be exercised without network
+access or an API key:
+
+    python benchmarks/fake_completion_server.py --port 8808 --delay 0.05
+    OPENAI_BASE_URL=http://127.0.0.1:8808/v1 OPENAI_API_KEY=fake streamlit run streamlit_app.py
+"""
+import argparse
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ANSWER = (
+    "Based on the building data provided, the listed federal buildings are active and owned. "
+    "The largest by usable square footage is the first one in the list."
+)
+
+
+def make_handler(answer: str, delay: float, first_token_delay: float):
+    class CompletionHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _chunk(self, payload: dict) -> None:
+            data = f"data: {json.dumps(payload)}\n\n".encode()
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            base = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()),
+                    "model": body.get("model", "fake")}
+            if not body.get("stream"):
+                payload = json.dumps({**base, "object": "chat.completion", "choices": [
+                    {"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}
+                ]}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            time.sleep(first_token_delay)
+            try:
+                for i, word in enumerate(answer.split(" ")):
+                    delta = {"content": word if i == 0 else " " + word}
+                    self._chunk({**base, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]})
+                    time.sleep(delay)
+                self._chunk({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+                data = b"data: [DONE]\n\n"
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n0\r\n\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # the client cancelled
+
+    return CompletionHandler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake streaming chat completions server")
+    parser.add_argument("--port", type=int, default=8808)
+    parser.add_argument("--delay", type=float, default=0.05, help="seconds between streamed words")
+    parser.add_argument("--first-token-delay", type=float, default=0.2)
+    args = parser.parse_args()
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(ANSWER, args.delay, args.first_token_delay))
+    print(f"Serving fake completions on http://127.0.0.1:{args.port}/v1")
+    server.serve_forever()
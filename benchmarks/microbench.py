@@ -0,0 +1,344 @@
+"""
+Microbenchmarks for the data, retrieval, scoring and render hot paths.
+
+Every case runs against fixed fixtures built in a temporary directory: the
+bundled REXUS CSV, synthetically scaled copies of it and a deterministic
+hashing encoder standing in for the sentence-transformer (``--model``
+benchmarks the real one when it is already cached locally). Outbound
+sockets are blocked for the whole run, so nothing touches the network.
+
+Each case reports the median, p95 and min wall time over ``repeat`` runs
+after a warm-up. With ``--baseline`` the run is compared against an earlier
+report and exits non-zero when a case's median regresses by more than its
+tolerance (and by more than the noise floor).
+
+    python benchmarks/microbench.py [--scales 1 4 16] [--only retrieval]
+    python benchmarks/microbench.py --baseline benchmarks/results/microbench.json --output /tmp/microbench.json
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import socket
+import statistics
+import sys
+import tempfile
+import time
+import zlib
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import scoring  # noqa: E402
+from assistant import semantic_retrieve_rexus  # noqa: E402
+from building_index import CityStateIndex  # noqa: E402
+from embedding_cache import rexus_corpus_text  # noqa: E402
+from hybrid_retrieval import HybridRetriever  # noqa: E402
+from location_data import (  # noqa: E402
+    get_education_batch, get_quality_batch, get_real_estate_data, get_safety_batch,
+)
+from render import render_comparison  # noqa: E402
+from resources import registry  # noqa: E402
+from rexus_store import REXUS_CSV_PATH, ingest_rexus_csv, load_rexus_store  # noqa: E402
+from vector_index import build_vector_index  # noqa: E402
+
+# A case regresses when its median is more than this fraction slower than the
+# baseline and also slower by more than the noise floor
+DEFAULT_TOLERANCE = 0.30
+NOISE_FLOOR_MS = 0.5
+TOLERANCES = {
+    # Whole-file parsing and index builds are dominated by the allocator and disk cache
+    "store.csv_ingest": 0.50,
+    "retrieval.build": 0.50,
+}
+
+LOOKUP_PLACES = [
+    ("Seattle", "WA"), ("  portland ", "or"), ("Washington", "DC"), ("New York", "NY"),
+    ("Hartford", "CT"), ("Nowhere", "ZZ"), ("Kansas City", "MO"), ("Anchorage", "AK"),
+]
+QUERIES = [
+    "federal building with parking in Seattle",
+    "historic courthouse downtown",
+    "buildings in 20405",
+    "largest owned building in TX",
+    "leased office near Main St",
+]
+FILTERS = {"states": ["CA", "TX"], "statuses": ["ACTIVE"]}
+RENDER_CITIES = [
+    ("Seattle", "WA", 47.6, -122.3), ("Portland", "OR", 45.5, -122.7), ("Boston", "MA", 42.4, -71.1),
+    ("Austin", "TX", 30.3, -97.7), ("Denver", "CO", 39.7, -105.0), ("Chicago", "IL", 41.9, -87.6),
+]
+
+
+class HashingEncoder:
+    """
+    Deterministic stand-in for the sentence-transformer: each token maps to
+    a fixed random vector and a text embeds as their normalized sum, so
+    texts sharing words land close together
+    """
+
+    def __init__(self, dim: int = 384, buckets: int = 1 << 14, seed: int = 0):
+        self.table = np.random.default_rng(seed).standard_normal((buckets, dim)).astype(np.float32)
+        self.buckets = buckets
+
+    def encode(self, texts, batch_size: int = 32, **kwargs) -> np.ndarray:
+        out = np.zeros((len(texts), self.table.shape[1]), dtype=np.float32)
+        for i, text in enumerate(texts):
+            ids = [zlib.crc32(token.encode()) % self.buckets for token in str(text).upper().split()]
+            if ids:
+                out[i] = self.table[ids].sum(axis=0)
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.where(norms == 0, 1, norms)
+
+
+def _block_network() -> None:
+    def refuse(*args, **kwargs):
+        raise OSError("network access is disabled during benchmarks")
+
+    socket.socket.connect = refuse
+    socket.create_connection = refuse
+    socket.getaddrinfo = refuse
+
+
+def scaled_csv(source: str, scale: int, path: str) -> str:
+    """``scale`` copies of the source CSV; copy k renumbers addresses and location codes"""
+    raw = pd.read_csv(source, dtype=str, keep_default_na=False)
+    copies = [raw]
+    for k in range(1, scale):
+        copy = raw.copy()
+        copy["Location Code"] = copy["Location Code"] + f"-{k}"
+        copy["Bldg Address1"] = f"{k}" + copy["Bldg Address1"]
+        copies.append(copy)
+    pd.concat(copies, ignore_index=True).to_csv(path, index=False)
+    return path
+
+
+def measure(fn: Callable[[], Any], repeat: int, warmup: int = 1) -> Dict[str, float]:
+    """Median, p95 and min milliseconds of ``fn`` over ``repeat`` timed calls"""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        "median_ms": statistics.median(samples),
+        "p95_ms": samples[min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))],
+        "min_ms": samples[0],
+        "repeat": repeat,
+    }
+
+
+def _use_store(df: pd.DataFrame) -> None:
+    """Point the shared registry (and so get_real_estate_data) at a fixture table"""
+    registry.register("rexus_df", lambda r: df)
+    registry.invalidate("rexus_df")
+
+
+def bench_store(fixtures: Dict[str, str], repeat: int) -> Dict[str, Dict[str, Any]]:
+    csv_path, store_path = fixtures["csv"], fixtures["store"]
+    results = {
+        "store.csv_ingest": measure(lambda: ingest_rexus_csv(csv_path, store_path), max(3, repeat // 5)),
+        "store.feather_load": measure(lambda: load_rexus_store(csv_path, store_path), repeat),
+    }
+    results["store.csv_ingest"]["rows"] = results["store.feather_load"]["rows"] = len(load_rexus_store(csv_path, store_path))
+    return results
+
+
+def bench_lookup(df: pd.DataFrame, repeat: int) -> Dict[str, Dict[str, Any]]:
+    _use_store(df)
+
+    def lookups():
+        for city, state in LOOKUP_PLACES:
+            get_real_estate_data(city, state)
+
+    results = {
+        "lookup.index_build": measure(lambda: CityStateIndex(df), repeat),
+        "lookup.get_real_estate_data": measure(lookups, repeat * 5),
+    }
+    results["lookup.get_real_estate_data"]["calls"] = len(LOOKUP_PLACES)
+    return results
+
+
+def bench_embedding(df: pd.DataFrame, encoder, repeat: int) -> Dict[str, Dict[str, Any]]:
+    texts = rexus_corpus_text(df).tolist()
+    result = measure(lambda: encoder.encode(texts), max(1, repeat // 10), warmup=0)
+    result["rows"] = len(texts)
+    result["rows_per_s"] = len(texts) / (result["median_ms"] / 1000)
+    return {"embedding.corpus": result}
+
+
+def bench_retrieval(df: pd.DataFrame, encoder, scale: int, repeat: int) -> Dict[str, Dict[str, Any]]:
+    embeddings = np.asarray(encoder.encode(rexus_corpus_text(df).tolist()), dtype=np.float32)
+    query_embeddings = encoder.encode(QUERIES)
+
+    def build():
+        return HybridRetriever(df, build_vector_index(embeddings, "exact"))
+
+    results = {f"retrieval.build@{scale}x": measure(build, max(1, repeat // 10), warmup=0)}
+    retriever = build()
+
+    def retrieve(filters):
+        def run():
+            for i, query in enumerate(QUERIES):
+                semantic_retrieve_rexus(query, retriever, encoder, 3, filters, question_emb=query_embeddings[i:i + 1])
+        return run
+
+    results[f"retrieval.semantic@{scale}x"] = measure(retrieve(None), repeat)
+    results[f"retrieval.filtered@{scale}x"] = measure(retrieve(FILTERS), repeat)
+    for name in results:
+        results[name]["rows"] = len(df)
+    results[f"retrieval.semantic@{scale}x"]["queries"] = results[f"retrieval.filtered@{scale}x"]["queries"] = len(QUERIES)
+    return results
+
+
+def bench_scoring(repeat: int) -> Dict[str, Dict[str, Any]]:
+    rng = np.random.default_rng(0)
+    n = 10_000
+    cities = [RENDER_CITIES[i % len(RENDER_CITIES)][0] for i in range(n)]
+    states = [RENDER_CITIES[i % len(RENDER_CITIES)][1] for i in range(n)]
+    lat, lon = rng.uniform(25, 49, n), rng.uniform(-124, -67, n)
+    results = {
+        "scoring.models@10000": measure(
+            lambda: (scoring.safety_scores(cities), scoring.quality_scores(lat, lon), scoring.education_scores(cities)),
+            repeat,
+        ),
+        "scoring.sections@50": measure(
+            lambda: (get_safety_batch(cities[:50], states[:50]), get_quality_batch(lat[:50], lon[:50]),
+                     get_education_batch(cities[:50], states[:50])),
+            repeat,
+        ),
+    }
+    return results
+
+
+def _render_fixture(n: int):
+    places = [RENDER_CITIES[i % len(RENDER_CITIES)] for i in range(n)]
+    cities, states = [p[0] for p in places], [p[1] for p in places]
+    safety = get_safety_batch(cities, states)
+    quality = get_quality_batch([p[2] for p in places], [p[3] for p in places])
+    education = get_education_batch(cities, states)
+    comparison = [
+        {
+            "real_estate": get_real_estate_data(cities[i], states[i]), "safety": safety[i],
+            "quality_of_life": quality[i], "education": education[i], "demographics": {}, "failed_sources": {},
+        }
+        for i in range(n)
+    ]
+    return comparison, [f"{city}, {state}" for city, state in zip(cities, states)]
+
+
+def bench_render(df: pd.DataFrame, repeat: int) -> Dict[str, Dict[str, Any]]:
+    _use_store(df)
+    results = {}
+    for n in (2, 50):
+        comparison, locations = _render_fixture(n)
+        results[f"render.comparison@{n}"] = measure(lambda: render_comparison(comparison, locations), repeat)
+    return results
+
+
+GROUPS = ["store", "lookup", "embedding", "retrieval", "scoring", "render"]
+
+
+def run(scales: List[int], repeat: int, groups: List[str], model: Optional[str] = None) -> Dict[str, Any]:
+    _block_network()
+    if model:
+        os.environ["HF_HUB_OFFLINE"] = "1"
+        from sentence_transformers import SentenceTransformer
+        encoder, encoder_name = SentenceTransformer(model), model
+    else:
+        encoder, encoder_name = HashingEncoder(), "hashing"
+
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "encoder": encoder_name,
+        "repeat": repeat,
+        "results": {},
+    }
+    workdir = tempfile.mkdtemp(prefix="microbench-")
+    try:
+        fixtures = {"csv": os.path.join(ROOT, REXUS_CSV_PATH), "store": os.path.join(workdir, "rexus.feather")}
+        df = ingest_rexus_csv(fixtures["csv"], fixtures["store"])
+        results = report["results"]
+        if "store" in groups:
+            results.update(bench_store(fixtures, repeat))
+        if "lookup" in groups:
+            results.update(bench_lookup(df, repeat))
+        if "embedding" in groups:
+            results.update(bench_embedding(df, encoder, repeat))
+        if "retrieval" in groups:
+            for scale in scales:
+                scaled = df if scale == 1 else ingest_rexus_csv(
+                    scaled_csv(fixtures["csv"], scale, os.path.join(workdir, f"rexus-{scale}x.csv")),
+                    os.path.join(workdir, f"rexus-{scale}x.feather"),
+                )
+                results.update(bench_retrieval(scaled, encoder, scale, repeat))
+        if "scoring" in groups:
+            results.update(bench_scoring(repeat))
+        if "render" in groups:
+            results.update(bench_render(df, repeat))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return report
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Cases whose median regressed past their tolerance against ``baseline``"""
+    regressions = []
+    for name, result in report["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if before is None:
+            continue
+        tolerance = TOLERANCES.get(name.split("@")[0], DEFAULT_TOLERANCE)
+        limit = max(before["median_ms"] * (1 + tolerance), before["median_ms"] + NOISE_FLOOR_MS)
+        if result["median_ms"] > limit:
+            regressions.append({
+                "case": name, "baseline_ms": before["median_ms"], "median_ms": result["median_ms"],
+                "limit_ms": limit, "tolerance": tolerance,
+            })
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 4, 16], help="corpus sizes as multiples of the REXUS CSV")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--only", nargs="+", choices=GROUPS, default=GROUPS)
+    parser.add_argument("--model", help="benchmark this locally cached sentence-transformer instead of the hashing encoder")
+    parser.add_argument("--baseline", help="earlier report to check for regressions")
+    parser.add_argument("--output", default=os.path.join(ROOT, "benchmarks", "results", "microbench.json"))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    report = run(args.scales, args.repeat, args.only, args.model)
+    for name, result in report["results"].items():
+        print(f"{name:<34} median {result['median_ms']:>10.3f} ms  p95 {result['p95_ms']:>10.3f} ms")
+
+    if baseline is not None:
+        report["baseline"] = {"path": args.baseline, "timestamp": baseline.get("timestamp")}
+        report["regressions"] = compare(report, baseline)
+        for regression in report["regressions"]:
+            print(f"REGRESSION {regression['case']}: {regression['baseline_ms']:.3f} -> "
+                  f"{regression['median_ms']:.3f} ms (limit {regression['limit_ms']:.3f} ms)")
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
+    sys.exit(1 if report.get("regressions") else 0)
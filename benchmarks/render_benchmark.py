@@ -0,0 +1,151 @@
+"""
+Render-time benchmark for the comparison sections at 2 and N locations.
+
+"legacy" replays the element stream the section loop used to send (one
+st.markdown per metric per location, the card open/close tags as separate
+elements and the real estate cards rendered twice); "render" is
+render.render_comparison, one element per section. Both build the same
+strings and pass each element to st.markdown in bare mode (no server), so
+"ms" covers HTML building plus Streamlit's per-element cost on the script
+thread; "elements" is the number of websocket deltas per rerun.
+
+    python benchmarks/render_benchmark.py [--locations 2 10 50] [--output benchmarks/results/render.json]
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+
+import streamlit as st
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from location_data import (  # noqa: E402
+    get_demographic_data, get_education_batch, get_quality_batch, get_safety_batch,
+)
+from render import REAL_ESTATE_FIELDS, SECTIONS, render_comparison  # noqa: E402
+
+CITIES = [
+    ("Seattle", "WA", 47.6, -122.3), ("Portland", "OR", 45.5, -122.7), ("Boston", "MA", 42.4, -71.1),
+    ("Austin", "TX", 30.3, -97.7), ("Denver", "CO", 39.7, -105.0), ("Chicago", "IL", 41.9, -87.6),
+]
+REAL_ESTATE = {
+    "matching_buildings": "12", "first_address": "915 2ND AVE", "building_status": "ACTIVE",
+    "property_type": "BUILDING", "usable_sqft": "598,000", "total_parking": "40", "owned_leased": "OWNED",
+    "construction_date": "01-Jan-1974", "historical_status": "NOT ELIGIBLE", "aba_accessibility": "Y",
+    "city": "SEATTLE", "state": "WA",
+}
+
+
+def synthetic_comparison(n: int):
+    places = [CITIES[i % len(CITIES)] for i in range(n)]
+    cities, states = [p[0] for p in places], [p[1] for p in places]
+    safety = get_safety_batch(cities, states)
+    quality = get_quality_batch([p[2] for p in places], [p[3] for p in places])
+    education = get_education_batch(cities, states)
+    comparison = [
+        {
+            "real_estate": dict(REAL_ESTATE), "safety": safety[i], "quality_of_life": quality[i],
+            "education": education[i], "demographics": get_demographic_data(cities[i], states[i]),
+            "failed_sources": {},
+        }
+        for i in range(n)
+    ]
+    return comparison, [f"{city}, {state}" for city, state in zip(cities, states)]
+
+
+def legacy_elements(comparison, locations):
+    """The markdown strings the old per-metric section loop emitted, in order"""
+    elements = []
+    for i, (section, title, icon) in enumerate(SECTIONS):
+        elements.append(f"<h2 class='section-title'>{icon} {title}</h2>")
+        if section == "real_estate":
+            elements.append("<h2>🏠 Best available home</h2>")
+            for _ in range(2):  # display_market_metrics was defined and called twice
+                for data, location in zip(comparison, locations):
+                    real_estate = data.get("real_estate", {})
+                    items = "".join(
+                        f"<div class='metric-item'><span class='metric-title'>{label}:</span> "
+                        f"<span class='metric-value'>{real_estate.get(key, default)}</span></div>"
+                        for label, key, default in REAL_ESTATE_FIELDS
+                    )
+                    elements.append(f"<div><h4>{location}</h4><div class='metrics-container'>{items}</div></div>")
+        else:
+            for data, location in zip(comparison, locations):
+                elements.append(f"<div class='comparison-card'><h3>{location}</h3><div class='metrics-container'>")
+                for key, value in data[section].items():
+                    elements.append(
+                        f"<div class='metric-item'><div class='metric-title'>{key.replace('_', ' ').title()}</div>"
+                        f"<div class='metric-value'>{value}</div></div>"
+                    )
+                elements.append("</div></div>")
+        if i < len(SECTIONS) - 1:
+            elements.append("<br>")
+    return elements
+
+
+def _emit(elements) -> None:
+    for html in elements:
+        st.markdown(html, unsafe_allow_html=True)
+
+
+def _median_ms(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def run(location_counts, repeat: int) -> dict:
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "results": {},
+    }
+    for n in location_counts:
+        comparison, locations = synthetic_comparison(n)
+        legacy = legacy_elements(comparison, locations)
+        rendered = render_comparison(comparison, locations)
+        report["results"][str(n)] = {
+            "legacy": {
+                "elements": len(legacy),
+                "ms": _median_ms(lambda: _emit(legacy_elements(comparison, locations)), repeat),
+            },
+            "render": {
+                "elements": len(rendered),
+                "ms": _median_ms(lambda: _emit(html for _, html in render_comparison(comparison, locations)), repeat),
+                "html_bytes": sum(len(html.encode()) for _, html in rendered),
+            },
+        }
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--locations", type=int, nargs="+", default=[2, 10, 50])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output", default=os.path.join(ROOT, "benchmarks", "results", "render.json"))
+    args = parser.parse_args()
+
+    # Bare-mode st.markdown warns about the missing script run context on every call
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    report = run(args.locations, args.repeat)
+    for n, result in report["results"].items():
+        legacy, render = result["legacy"], result["render"]
+        print(f"{n:>4} locations: legacy {legacy['elements']:>5} elements {legacy['ms']:.3f} ms | "
+              f"render {render['elements']:>2} elements {render['ms']:.3f} ms")
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
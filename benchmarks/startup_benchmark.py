@@ -0,0 +1,93 @@
+"""
+Cold-start import benchmark for streamlit_app.py.
+
+Each measurement runs in a fresh interpreter so module caches do not leak
+between runs. "before" is the eager import block the app used to execute
+before drawing the comparison form; "after" is what it imports now. Each
+heavy dependency is also timed on its own.
+
+    python benchmarks/startup_benchmark.py [--repeat 5] [--output benchmarks/results/startup.json]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SETS = {
+    "before": [
+        "streamlit", "pandas", "requests", "plotly.express", "numpy", "sentence_transformers",
+        "openai", "yfinance", "geopy.geocoders", "bs4", "dotenv",
+    ],
+    "after": ["streamlit", "dotenv", "building_index"],
+}
+HEAVY_MODULES = [
+    "sentence_transformers", "torch", "openai", "yfinance", "plotly.express", "bs4",
+    "geopy.geocoders", "requests", "pandas", "pyarrow", "resources",
+]
+
+_TIMER = (
+    "import sys, time\n"
+    "start = time.perf_counter()\n"
+    "for name in sys.argv[1:]:\n"
+    "    __import__(name)\n"
+    "print(time.perf_counter() - start)\n"
+)
+
+
+def time_imports(modules, repeat: int):
+    """Median wall time to import ``modules`` in a fresh interpreter, or None if one is missing"""
+    samples = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-c", _TIMER, *modules], cwd=ROOT, capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            return None, result.stderr.strip().splitlines()[-1] if result.stderr else "import failed"
+        samples.append(float(result.stdout.strip().splitlines()[-1]))
+    return statistics.median(samples), None
+
+
+def run(repeat: int) -> dict:
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "import_sets": {},
+        "modules": {},
+    }
+    for name, modules in IMPORT_SETS.items():
+        seconds, error = time_imports(modules, repeat)
+        report["import_sets"][name] = {"modules": modules, "seconds": seconds, "error": error}
+    for module in HEAVY_MODULES:
+        seconds, error = time_imports([module], repeat)
+        report["modules"][module] = {"seconds": seconds, "error": error}
+    return report
+
+
+def _fmt(entry) -> str:
+    return f"{entry['seconds']:.3f}s" if entry["seconds"] is not None else f"n/a ({entry['error']})"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default=os.path.join(ROOT, "benchmarks", "results", "startup.json"))
+    args = parser.parse_args()
+
+    report = run(args.repeat)
+    for name, entry in report["import_sets"].items():
+        print(f"{name:>8} imports before first paint: {_fmt(entry)}")
+    for module, entry in report["modules"].items():
+        print(f"{module:>24}: {_fmt(entry)}")
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
@@ -0,0 +1,117 @@
+"""
+Accuracy vs latency report for the vector index backends.
+
+Compares the original brute-force retrieval (unnormalized np.dot + full
+argsort) against the exact, IVF and quantized (int8 / float16 codes with
+float32 re-ranking) indexes on synthetic clustered embeddings at several
+corpus sizes, or on a real embedding cache with ``--embeddings``. Recall is
+measured against the exact float32 cosine top-k; "MB" is the resident size
+of the matrix each method scans.
+
+    python benchmarks/vector_index_report.py [--sizes 8743 50000 200000] [--rerank 4 10]
+    python benchmarks/vector_index_report.py --embeddings data/cache/embeddings/rexus-<model>-<hash>.npy
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vector_index import ExactIndex, Float16Index, Int8Index, IVFIndex, normalize_rows  # noqa: E402
+
+
+def synthetic_embeddings(n: int, dim: int = 384, n_clusters: int = 200, seed: int = 0, noise: float = 1.5) -> np.ndarray:
+    """
+    Clustered unit vectors shaped like sentence-transformer output. The
+    cluster centres depend only on ``dim`` and ``n_clusters`` so corpora and
+    queries drawn with different seeds share the same topics.
+    """
+    centers = normalize_rows(np.random.default_rng(12345).standard_normal((n_clusters, dim)))
+    rng = np.random.default_rng(seed)
+    labels = rng.integers(0, n_clusters, n)
+    jitter = rng.standard_normal((n, dim)).astype(np.float32) * (noise / np.sqrt(dim))
+    return normalize_rows(centers[labels] + jitter)
+
+
+def brute_force_top_k(embeddings: np.ndarray, query: np.ndarray, top_k: int) -> np.ndarray:
+    """The retrieval path semantic_retrieve_rexus used before the index"""
+    similarities = np.dot(embeddings, query.T).squeeze()
+    return similarities.argsort()[-top_k:][::-1]
+
+
+def recall(truth: np.ndarray, found: np.ndarray) -> float:
+    hits = sum(len(set(t) & set(f)) for t, f in zip(truth, found))
+    return hits / truth.size
+
+
+def perturbed_queries(corpus: np.ndarray, n_queries: int, seed: int = 1, noise: float = 1.0) -> np.ndarray:
+    """Queries near real corpus rows, for reports on a cached embedding matrix"""
+    rng = np.random.default_rng(seed)
+    base = np.asarray(corpus[np.sort(rng.choice(len(corpus), n_queries, replace=False))], dtype=np.float32)
+    return normalize_rows(base + rng.standard_normal(base.shape).astype(np.float32) * (noise / np.sqrt(base.shape[1])))
+
+
+def report(sizes, n_queries: int, top_k: int, probes, reranks, embeddings_path=None) -> None:
+    print(f"{'corpus':>8} {'method':<22} {'build s':>8} {'ms/query':>9} {'batch ms/q':>10} {'recall@k':>9} {'MB':>8}")
+    if embeddings_path:
+        corpus = np.load(embeddings_path, mmap_mode="r")
+        corpora = [(corpus, perturbed_queries(corpus, n_queries))]
+    else:
+        corpora = ((synthetic_embeddings(n), synthetic_embeddings(n_queries, seed=1)) for n in sizes)
+    for corpus, queries in corpora:
+        n = len(corpus)
+        float_mb = corpus.shape[0] * corpus.shape[1] * 4 / 1e6
+
+        start = time.perf_counter()
+        brute = np.stack([brute_force_top_k(corpus, q[None, :], top_k) for q in queries])
+        brute_ms = (time.perf_counter() - start) * 1000 / n_queries
+
+        start = time.perf_counter()
+        exact = ExactIndex(corpus)
+        build = time.perf_counter() - start
+        _, truth = exact.search(queries, top_k)
+        rows = [("brute force (old)", 0.0, brute_ms, float("nan"), recall(truth, brute), float_mb)]
+        rows.append(("exact",) + _time_index(exact, queries, top_k, truth, build) + (float_mb,))
+
+        for n_probe in probes:
+            start = time.perf_counter()
+            ivf = IVFIndex(corpus, n_probe=n_probe)
+            build = time.perf_counter() - start
+            rows.append((f"ivf nprobe={n_probe}",) + _time_index(ivf, queries, top_k, truth, build) + (float_mb,))
+
+        for index_cls in (Int8Index, Float16Index):
+            for rerank in reranks:
+                start = time.perf_counter()
+                quantized = index_cls(corpus, rerank=rerank)
+                build = time.perf_counter() - start
+                rows.append((f"{index_cls.name} rerank={rerank}x",)
+                            + _time_index(quantized, queries, top_k, truth, build) + (quantized.nbytes / 1e6,))
+
+        for name, build, single, batched, rec, mb in rows:
+            print(f"{n:>8} {name:<22} {build:>8.2f} {single:>9.3f} {batched:>10.3f} {rec:>9.3f} {mb:>8.1f}")
+
+
+def _time_index(index, queries, top_k, truth, build):
+    start = time.perf_counter()
+    for q in queries:
+        index.search(q, top_k)
+    single = (time.perf_counter() - start) * 1000 / len(queries)
+    start = time.perf_counter()
+    _, found = index.search(queries, top_k)
+    batched = (time.perf_counter() - start) * 1000 / len(queries)
+    return build, single, batched, recall(truth, found)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[8743, 50000, 200000])
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--probes", type=int, nargs="+", default=[4, 8, 16])
+    parser.add_argument("--rerank", type=int, nargs="+", default=[1, 4, 10], help="quantized shortlist sizes, as multiples of top-k")
+    parser.add_argument("--embeddings", help="report on this cached .npy matrix instead of synthetic corpora")
+    args = parser.parse_args()
+    report(args.sizes, args.queries, args.top_k, args.probes, args.rerank, args.embeddings)
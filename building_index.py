@@ -0,0 +1,66 @@
+"""Hash index over normalized (city, state) keys for REXUS building lookups."""
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+from geocoder import normalize_place, normalize_state
+
+# Ranking options exposed to the UI, mapped to store columns and sort direction
+RANK_KEYS = {
+    "usable_sqft": ("Bldg ANSI Usable", False),
+    "total_parking": ("Total Parking Spaces", False),
+    "construction_date": ("Construction Date", False),
+    "oldest": ("Construction Date", True),
+}
+DEFAULT_RANK_KEY = "usable_sqft"
+
+
+def normalize_city(city: str) -> str:
+    """The geocoder's place key, so "St. Paul", "ST PAUL" and "Saint Paul" match one stored city"""
+    return normalize_place(city)
+
+
+def city_state_key(city: str, state: str) -> str:
+    return f"{normalize_place(city)}|{normalize_state(state)}"
+
+
+def city_state_keys(cities: pd.Series, states: pd.Series) -> np.ndarray:
+    """:func:`city_state_key` for whole columns, normalizing each distinct value once rather than once per row"""
+    cities, states = cities.astype(str), states.astype(str)
+    return (
+        cities.map({city: normalize_place(city) for city in cities.unique()}).to_numpy(dtype=object)
+        + "|"
+        + states.map({state: normalize_state(state) for state in states.unique()}).to_numpy(dtype=object)
+    )
+
+
+class CityStateIndex:
+    """Maps each normalized (city, state) key to the row positions of its buildings"""
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.keys = city_state_keys(df["Bldg City"], df["Bldg State"])
+        self._positions: Dict[str, np.ndarray] = {
+            key: np.asarray(positions, dtype=np.int64)
+            for key, positions in pd.Series(np.arange(len(df))).groupby(self.keys).indices.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._positions
+
+    def positions(self, city: str, state: str) -> np.ndarray:
+        """Row positions for a city, in store order (empty if unknown)"""
+        return self._positions.get(city_state_key(city, state), np.empty(0, dtype=np.int64))
+
+    def lookup(self, city: str, state: str, rank_by: str = DEFAULT_RANK_KEY) -> pd.DataFrame:
+        """Every building in the city, best first according to ``rank_by``"""
+        positions = self.positions(city, state)
+        matches = self.df.iloc[positions]
+        if matches.empty or rank_by not in RANK_KEYS:
+            return matches
+        column, ascending = RANK_KEYS[rank_by]
+        return matches.sort_values(column, ascending=ascending, na_position="last", kind="stable")
@@ -0,0 +1,323 @@
+"""
+Offline bulk comparison: fetch and score thousands of locations or
+(location A, location B) pairs across a process pool, using the same
+orchestrator and scoring models as the app.
+
+The input CSV has either a ``location`` column or ``location_a`` and
+``location_b`` columns. Each distinct place (after normalization, so
+"St. Paul, MN" and "Saint Paul, Minnesota" are one) is fetched once.
+Finished chunks are appended to ``<output>.checkpoint.jsonl``, so an
+interrupted run resumes where it stopped; places with a failed source are
+left out of it and fetched again on resume.
+
+Output rows are streamed, in input order, to ``<output>.rows.jsonl`` as soon
+as every place they name is fetched, and a place's record is dropped once
+the last row naming it is written; at most two chunks per worker are in
+flight. Places return different fields (e.g. when no building is found), so
+the CSV or Parquet file takes its columns from every row and is converted
+from that spool at the end, a batch of rows at a time.
+
+Places missing from the bundled gazetteer are geocoded once, in the parent
+process, through the shared rate-limited Nominatim cache; workers only read
+those results and never call Nominatim themselves.
+
+    python bulk_compare.py pairs.csv -o results.parquet --workers 4 --offline
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import pandas as pd
+
+from building_index import DEFAULT_RANK_KEY, RANK_KEYS
+from geocode_cache import cache_key
+
+logger = logging.getLogger(__name__)
+
+SECTION_KEYS = ["real_estate", "safety", "quality_of_life", "education", "demographics"]
+
+
+class _Resolved:
+    """Stands in for Nominatim in workers: answers gazetteer misses the parent already resolved"""
+
+    def __init__(self, results: Dict[str, Any]):
+        self.results = results
+
+    def lookup(self, location: str):
+        return self.results.get(cache_key(location))
+
+
+def _init_worker(resolved: Dict[str, Any]) -> None:
+    """Per-process setup; shared datasets are loaded once per worker, not per task"""
+    from geocoder import Geocoder
+    from resources import registry
+
+    registry.register("geocoder", lambda r: Geocoder(r.get("gazetteer"), fallback=_Resolved(resolved)), depends_on=["gazetteer"])
+    registry.get("city_state_index")
+    registry.get("geocoder")
+
+
+def resolve_gazetteer_misses(locations: Iterable[str]) -> Dict[str, Any]:
+    """
+    Geocode the places the gazetteer does not know, here and one at a time,
+    so the Nominatim rate limit holds however many workers fetch afterwards
+    """
+    from resources import registry
+
+    gazetteer = registry.get("gazetteer")
+    misses = [location for location in locations if gazetteer.lookup(location) is None]
+    if misses:
+        logger.info("Geocoding %d places missing from the gazetteer", len(misses))
+    resolved: Dict[str, Any] = {}
+    for location in misses:
+        try:
+            resolved[cache_key(location)] = registry.get("upstream_geocoder").lookup(location)
+        except Exception as e:
+            logger.error("Could not geocode %s: %s", location, e)
+    return resolved
+
+
+def flatten_result(data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """One flat record per location: coordinates, then ``section.field`` columns"""
+    if data is None:
+        return {"error": "could not parse location"}
+    coords = data.get("coordinates") or {}
+    record: Dict[str, Any] = {
+        "lat": coords.get("lat"),
+        "lon": coords.get("lon"),
+        "geocode_source": coords.get("source"),
+        "failed_sources": ";".join(f"{k}: {v}" for k, v in data.get("failed_sources", {}).items()) or None,
+    }
+    for section in SECTION_KEYS:
+        for field, value in (data.get(section) or {}).items():
+            # Display values mix numbers and "N/A", so columns are kept as text
+            record[f"{section}.{field}"] = None if value is None else str(value)
+    return record
+
+
+def _fetch_chunk(locations: List[str], rank_by: str) -> List[Tuple[str, Dict[str, Any]]]:
+    from location_data import get_orchestrator
+
+    results = get_orchestrator().fetch(locations, rank_by)
+    return [(location, flatten_result(data)) for location, data in zip(locations, results)]
+
+
+def read_locations(path: str) -> Tuple[pd.DataFrame, bool]:
+    """The input rows and whether they are pairs"""
+    df = pd.read_csv(path, dtype=str).fillna("")
+    if {"location_a", "location_b"} <= set(df.columns):
+        return df, True
+    if "location" in df.columns:
+        return df, False
+    raise ValueError("Input CSV needs a 'location' column or 'location_a' and 'location_b' columns")
+
+
+def _place_keys(rows: pd.DataFrame, columns: List[str]) -> List[Tuple[str, ...]]:
+    """Each input row's normalized place keys ("" for an empty cell)"""
+    return [
+        tuple(cache_key(location.strip()) if location.strip() else "" for location in values)
+        for values in zip(*(rows[column] for column in columns))
+    ]
+
+
+def _unique_places(rows: pd.DataFrame, columns: List[str]) -> Dict[str, str]:
+    """
+    Normalized key -> the first spelling seen, which is what gets fetched, in
+    order of first appearance row by row so early rows complete first
+    """
+    places: Dict[str, str] = {}
+    for values in zip(*(rows[column] for column in columns)):
+        for location in values:
+            location = location.strip()
+            if location:
+                places.setdefault(cache_key(location), location)
+    return places
+
+
+def _load_checkpoint(path: str) -> Dict[str, Dict[str, Any]]:
+    done: Dict[str, Dict[str, Any]] = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    break  # a torn final line from an interrupted write
+                if not entry["record"].get("failed_sources"):
+                    done[entry["key"]] = entry["record"]
+    return done
+
+
+def _chunks(items: List[str], size: int) -> Iterable[List[str]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _output_row(location_values: Tuple[str, ...], keys: Tuple[str, ...], results: Dict[str, Dict[str, Any]],
+                pairs: bool) -> Dict[str, Any]:
+    records = [results[key] if key else {"error": "empty location"} for key in keys]
+    if pairs:
+        (a, b), (record_a, record_b) = location_values, records
+        return {
+            "location_a": a, "location_b": b,
+            **{f"a.{k}": v for k, v in record_a.items()},
+            **{f"b.{k}": v for k, v in record_b.items()},
+        }
+    return {"location": location_values[0], **records[0]}
+
+
+def _write_output(spool_path: str, output_path: str, batch_size: int = 10000) -> int:
+    """
+    Convert the spooled JSON rows to CSV or Parquet ``batch_size`` rows at a
+    time. Places return different fields (e.g. no building found), so the
+    columns are the union over every row, collected in a first pass.
+    """
+    columns: Dict[str, None] = {}
+    n_rows = 0
+    with open(spool_path) as spool:
+        for line in spool:
+            columns.update(dict.fromkeys(json.loads(line)))
+            n_rows += 1
+
+    def batches() -> Iterable[List[Dict[str, Any]]]:
+        with open(spool_path) as spool:
+            batch = []
+            for line in spool:
+                batch.append(json.loads(line))
+                if len(batch) == batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+
+    tmp_path = output_path + ".tmp"
+    if output_path.lower().endswith(".parquet"):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        # Coordinates are numbers; every other value is display text (see flatten_result)
+        schema = pa.schema([
+            (column, pa.float64() if column.rsplit(".", 1)[-1] in ("lat", "lon") else pa.string()) for column in columns
+        ])
+        with pq.ParquetWriter(tmp_path, schema) as writer:
+            for batch in batches():
+                writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+    else:
+        with open(tmp_path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(columns))
+            writer.writeheader()
+            for batch in batches():
+                writer.writerows(batch)
+    os.replace(tmp_path, output_path)
+    return n_rows
+
+
+def run(
+    input_path: str,
+    output_path: str,
+    workers: int = os.cpu_count() or 1,
+    chunk_size: int = 50,
+    rank_by: str = DEFAULT_RANK_KEY,
+    offline: bool = False,
+    keep_checkpoint: bool = False,
+) -> int:
+    """Compare every input row and write the results to ``output_path``; returns the number of rows"""
+    rows, pairs = read_locations(input_path)
+    columns = ["location_a", "location_b"] if pairs else ["location"]
+    location_values = list(zip(*(rows[column] for column in columns)))
+    row_keys = _place_keys(rows, columns)
+    places = _unique_places(rows, columns)
+    del rows
+
+    checkpoint_path = output_path + ".checkpoint.jsonl"
+    results = _load_checkpoint(checkpoint_path)
+    pending = [location for key, location in places.items() if key not in results]
+    logger.info("%d input rows, %d distinct places, %d already done, %d to fetch",
+                len(row_keys), len(places), len(places) - len(pending), len(pending))
+
+    # A place's record is kept only until the last row that needs it is written
+    remaining_uses: Dict[str, int] = {}
+    for keys in row_keys:
+        for key in keys:
+            if key:
+                remaining_uses[key] = remaining_uses.get(key, 0) + 1
+
+    spool_path = output_path + ".rows.jsonl"
+    next_row = 0
+
+    def write_ready_rows(spool) -> None:
+        # Rows go out in input order, as soon as every place they name has a record
+        nonlocal next_row
+        while next_row < len(row_keys) and all(not key or key in results for key in row_keys[next_row]):
+            keys = row_keys[next_row]
+            spool.write(json.dumps(_output_row(location_values[next_row], keys, results, pairs)) + "\n")
+            for key in keys:
+                if key:
+                    remaining_uses[key] -= 1
+                    if not remaining_uses[key]:
+                        del results[key]
+            next_row += 1
+        spool.flush()
+
+    started = time.monotonic()
+    with open(spool_path, "w") as spool:
+        write_ready_rows(spool)
+        if pending:
+            resolved = {} if offline else resolve_gazetteer_misses(pending)
+            with open(checkpoint_path, "a") as checkpoint, ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_worker, initargs=(resolved,)
+            ) as pool:
+                chunks = iter(_chunks(pending, chunk_size))
+                in_flight: Set[Future] = set()
+                fetched = 0
+                while True:
+                    # At most two chunks per worker are queued, so finished rows are not
+                    # held back behind the whole input
+                    for chunk in chunks:
+                        in_flight.add(pool.submit(_fetch_chunk, chunk, rank_by))
+                        if len(in_flight) >= 2 * workers:
+                            break
+                    if not in_flight:
+                        break
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        for location, record in future.result():
+                            key = cache_key(location)
+                            results[key] = record
+                            fetched += 1
+                            # Timed-out or failed sources are retried on resume rather than saved as done
+                            if record.get("failed_sources"):
+                                continue
+                            checkpoint.write(json.dumps({"key": key, "location": location, "record": record}) + "\n")
+                    checkpoint.flush()
+                    write_ready_rows(spool)
+                    logger.info("%d/%d places, %d/%d rows (%.1f places/s)", len(places) - len(pending) + fetched,
+                                len(places), next_row, len(row_keys), fetched / max(time.monotonic() - started, 1e-9))
+
+    n_rows = _write_output(spool_path, output_path)
+    os.remove(spool_path)
+    if not keep_checkpoint and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return n_rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="CSV with a 'location' column or 'location_a'/'location_b' columns")
+    parser.add_argument("-o", "--output", required=True, help="results file (.csv or .parquet)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=50, help="places per task; scoring is batched per chunk")
+    parser.add_argument("--rank-by", choices=sorted(RANK_KEYS), default=DEFAULT_RANK_KEY)
+    parser.add_argument("--offline", action="store_true", help="geocode from the bundled gazetteer only")
+    parser.add_argument("--keep-checkpoint", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    started = time.monotonic()
+    written = run(args.input, args.output, args.workers, args.chunk_size, args.rank_by, args.offline, args.keep_checkpoint)
+    print(f"Wrote {written} rows to {args.output} in {time.monotonic() - started:.1f}s")
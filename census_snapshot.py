@@ -0,0 +1,139 @@
+"""
+Bulk Census ACS snapshot: ingest whole place-level tables once, store them
+locally keyed by state+place FIPS and normalized name, and serve
+demographic metrics from memory instead of calling the Census API per query.
+
+    python census_snapshot.py                  # download all places via the Census API
+    python census_snapshot.py acs_places.json  # ingest a saved API response (or CSV) offline
+"""
+import json
+import os
+import re
+import sys
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from geocoder import normalize_place, normalize_state
+from rexus_store import STORE_DIR
+
+CENSUS_SNAPSHOT_PATH = os.path.join(STORE_DIR, "acs_places.feather")
+ACS_YEAR = 2021
+ACS_VARIABLES = {
+    "B19013_001E": "median_household_income",
+    "B01003_001E": "total_population",
+    "B01002_001E": "median_age",
+    "B25077_001E": "median_home_value",
+    "B25064_001E": "median_gross_rent",
+}
+STATE_FIPS = {
+    "01": "AL", "02": "AK", "04": "AZ", "05": "AR", "06": "CA", "08": "CO", "09": "CT", "10": "DE",
+    "11": "DC", "12": "FL", "13": "GA", "15": "HI", "16": "ID", "17": "IL", "18": "IN", "19": "IA",
+    "20": "KS", "21": "KY", "22": "LA", "23": "ME", "24": "MD", "25": "MA", "26": "MI", "27": "MN",
+    "28": "MS", "29": "MO", "30": "MT", "31": "NE", "32": "NV", "33": "NH", "34": "NJ", "35": "NM",
+    "36": "NY", "37": "NC", "38": "ND", "39": "OH", "40": "OK", "41": "OR", "42": "PA", "44": "RI",
+    "45": "SC", "46": "SD", "47": "TN", "48": "TX", "49": "UT", "50": "VT", "51": "VA", "53": "WA",
+    "54": "WV", "55": "WI", "56": "WY", "72": "PR",
+}
+
+# Legal/statistical area descriptions the API appends to place names:
+# "Seattle city", "Anchorage municipality", "Nashville-Davidson metropolitan government (balance)"
+_LSAD_SUFFIX = re.compile(r"(\s+(?:[a-z]+|\([a-z]+\)))+$|\s+(?:CDP|zona urbana|comunidad)$")
+
+
+def place_key(name: str) -> str:
+    """Normalized key for an ACS place NAME such as "Seattle city, Washington" """
+    place = name.rsplit(",", 1)[0]
+    return normalize_place(_LSAD_SUFFIX.sub("", place.strip()))
+
+
+def _read_source(path: str) -> pd.DataFrame:
+    """A saved Census API JSON array response, or a CSV with the same columns"""
+    if path.lower().endswith(".json"):
+        with open(path) as f:
+            header, *rows = json.load(f)
+        return pd.DataFrame(rows, columns=header)
+    return pd.read_csv(path, dtype=str)
+
+
+def _download(year: int) -> pd.DataFrame:
+    from providers import get_provider
+
+    rows = get_provider("census").query(list(ACS_VARIABLES), "place:*", within="state:*", year=year)
+    return pd.DataFrame(rows)
+
+
+def ingest_acs(source: Optional[str] = None, store_path: str = CENSUS_SNAPSHOT_PATH, year: int = ACS_YEAR) -> pd.DataFrame:
+    """Build the snapshot from a local file, or from the Census API when ``source`` is None"""
+    raw = _read_source(source) if source else _download(year)
+    df = pd.DataFrame({
+        "geoid": raw["state"].str.zfill(2) + raw["place"].str.zfill(5),
+        "state": raw["state"].str.zfill(2).map(STATE_FIPS),
+        "name": raw["NAME"],
+        "key": raw["NAME"].map(place_key),
+        "is_cdp": raw["NAME"].str.contains(r"\bCDP,", regex=True),
+    })
+    for variable, column in ACS_VARIABLES.items():
+        values = pd.to_numeric(raw[variable], errors="coerce") if variable in raw else np.nan
+        # The API reports suppressed/unavailable estimates as large negative sentinels
+        df[column] = pd.Series(values, index=raw.index, dtype="float64").where(lambda v: v >= 0)
+    df = df.dropna(subset=["state"])
+
+    # Prefer incorporated places over a census-designated place of the same name
+    df = df.sort_values(["state", "key", "is_cdp", "total_population"], ascending=[True, True, True, False])
+    df = df.drop(columns="is_cdp").reset_index(drop=True)
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), b"acs_year": str(year).encode()})
+    os.makedirs(os.path.dirname(store_path) or ".", exist_ok=True)
+    feather.write_feather(table, store_path + ".tmp", compression="uncompressed")
+    os.replace(store_path + ".tmp", store_path)
+    return df
+
+
+class CensusSnapshot:
+    """In-memory ACS place table with dict indexes on FIPS GEOID and (name, state)"""
+
+    def __init__(self, df: pd.DataFrame, year: Optional[int] = None):
+        self.df = df.reset_index(drop=True)
+        self.year = year
+        self.metrics = [c for c in ACS_VARIABLES.values() if c in df.columns]
+        self._values = self.df[self.metrics].to_numpy(dtype=np.float64)
+        self._by_geoid: Dict[str, int] = {g: i for i, g in enumerate(self.df["geoid"])}
+        self._by_name: Dict[Tuple[str, str], int] = {}
+        for i, key in enumerate(zip(self.df["key"], self.df["state"])):
+            self._by_name.setdefault(key, i)
+
+    @classmethod
+    def load(cls, path: str = CENSUS_SNAPSHOT_PATH) -> Optional["CensusSnapshot"]:
+        """The stored snapshot, or None if it has not been ingested yet"""
+        if not os.path.exists(path):
+            return None
+        table = feather.read_table(path, memory_map=True)
+        year = (table.schema.metadata or {}).get(b"acs_year")
+        return cls(table.to_pandas(), int(year) if year else None)
+
+    def __len__(self) -> int:
+        return len(self.df)
+
+    def _row(self, i: int) -> Dict[str, Optional[float]]:
+        row = {"geoid": self.df.at[i, "geoid"], "name": self.df.at[i, "name"]}
+        for column, value in zip(self.metrics, self._values[i]):
+            row[column] = None if np.isnan(value) else float(value)
+        return row
+
+    def by_geoid(self, geoid: str) -> Optional[Dict[str, Optional[float]]]:
+        i = self._by_geoid.get(geoid)
+        return None if i is None else self._row(i)
+
+    def lookup(self, city: str, state: str) -> Optional[Dict[str, Optional[float]]]:
+        i = self._by_name.get((normalize_place(city), normalize_state(state)))
+        return None if i is None else self._row(i)
+
+
+if __name__ == "__main__":
+    snapshot = ingest_acs(sys.argv[1] if len(sys.argv) > 1 else None)
+    print(f"Wrote {len(snapshot)} places to {CENSUS_SNAPSHOT_PATH}")
@@ -0,0 +1,271 @@
+"""Persistent, memory-mapped cache of the REXUS corpus embeddings."""
+import argparse
+import hashlib
+import logging
+import os
+import re
+import shutil
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Any, Callable, Dict, NamedTuple, Optional, Sequence, Set
+
+import numpy as np
+import pandas as pd
+
+import telemetry
+from rexus_store import REXUS_CSV_PATH, STORE_DIR, load_rexus_store
+
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+EMBEDDING_CACHE_DIR = os.path.join(STORE_DIR, "embeddings")
+# Rows encoded per task. Peak memory is roughly one model plus
+# 2 * chunk_size * dim float32 rows per worker; the matrix itself lives on disk.
+EMBEDDING_CHUNK_SIZE = 4096
+# Worker processes used to rebuild the cache on a miss; 1 encodes in-process
+EMBEDDING_WORKERS = int(os.getenv("EMBEDDING_WORKERS", "1"))
+
+logger = logging.getLogger(__name__)
+
+
+def rexus_corpus_text(df: pd.DataFrame) -> pd.Series:
+    """The address + city + state strings that get embedded for each building"""
+    return (
+        df["Bldg Address1"].astype(str) + " " + df["Bldg City"].astype(str) + " " + df["Bldg State"].astype(str)
+    )
+
+
+def file_content_hash(path: str, chunk_size: int = 1 << 20) -> str:
+    """SHA-256 of a file's bytes, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def embedding_cache_path(
+    csv_path: str = REXUS_CSV_PATH,
+    model_name: str = EMBEDDING_MODEL_NAME,
+    cache_dir: str = EMBEDDING_CACHE_DIR,
+) -> str:
+    """Cache file for a (source CSV content, model) pair"""
+    model_slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+    return os.path.join(cache_dir, f"rexus-{model_slug}-{file_content_hash(csv_path)[:16]}.npy")
+
+
+def _prune_stale(cache_dir: str, keep: str) -> None:
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if name.startswith("rexus-") and name.endswith(".npy") and path != keep:
+            os.remove(path)
+
+
+class EncodeStats(NamedTuple):
+    rows: int
+    seconds: float
+    workers: int
+    chunk_size: int
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else float("inf")
+
+
+# The encoder of the current worker process, set by _init_worker
+_worker: Dict[str, Any] = {}
+
+
+def _init_worker(model_name: str, model_factory: Optional[Callable[[], Any]], threads: int) -> None:
+    if threads:
+        try:
+            import torch
+            torch.set_num_threads(threads)
+        except ImportError:
+            pass
+    if model_factory is not None:
+        _worker["model"] = model_factory()
+    else:
+        from sentence_transformers import SentenceTransformer
+        _worker["model"] = SentenceTransformer(model_name)
+
+
+def _embedding_dim() -> int:
+    return int(np.asarray(_worker["model"].encode(["dimension probe"])).shape[1])
+
+
+def _encode_into(path: str, start: int, texts: Sequence[str]) -> int:
+    """Encode one chunk and write it straight into the on-disk matrix"""
+    vectors = np.asarray(_worker["model"].encode(list(texts)), dtype=np.float32)
+    out = np.load(path, mmap_mode="r+")
+    out[start:start + len(vectors)] = vectors
+    out.flush()
+    del out
+    return len(vectors)
+
+
+def encode_corpus(
+    texts: Sequence[str],
+    path: str,
+    emb_model=None,
+    model_name: str = EMBEDDING_MODEL_NAME,
+    workers: int = 1,
+    chunk_size: int = EMBEDDING_CHUNK_SIZE,
+    model_factory: Optional[Callable[[], Any]] = None,
+) -> EncodeStats:
+    """
+    Encode ``texts`` chunk by chunk into a preallocated float32 ``.npy`` at
+    ``path``. With ``workers`` > 1 the chunks are spread over that many
+    processes, each loading its own model (``model_factory()`` when given,
+    which must be picklable); at most two chunks per worker are in flight.
+    Otherwise ``emb_model`` (or a freshly loaded model) encodes in-process.
+    """
+    start = time.perf_counter()
+    n = len(texts)
+    chunks = range(0, n, chunk_size)
+    if workers <= 1:
+        _worker["model"] = emb_model if emb_model is not None else (
+            model_factory() if model_factory is not None else None
+        )
+        if _worker["model"] is None:
+            _init_worker(model_name, None, 0)
+        np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=(n, _embedding_dim()))
+        for offset in chunks:
+            _encode_into(path, offset, texts[offset:offset + chunk_size])
+        _worker.clear()
+    else:
+        import multiprocessing
+
+        # Spawned, not forked: the app process runs server and pool threads
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(model_name, model_factory, threads),
+        ) as pool:
+            dim = pool.submit(_embedding_dim).result()
+            np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=(n, dim))
+            in_flight: Set[Future] = set()
+            for offset in chunks:
+                if len(in_flight) >= 2 * workers:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        future.result()
+                in_flight.add(pool.submit(_encode_into, path, offset, list(texts[offset:offset + chunk_size])))
+            for future in in_flight:
+                future.result()
+
+    stats = EncodeStats(n, time.perf_counter() - start, max(1, workers), chunk_size)
+    telemetry.count("embedding_rows_total", n)
+    logger.info("Encoded %d rows in %.2fs (%.0f rows/s, %d workers, chunks of %d)",
+                n, stats.seconds, stats.rows_per_sec, stats.workers, chunk_size)
+    return stats
+
+
+def load_or_build_embeddings(
+    df: pd.DataFrame,
+    emb_model=None,
+    csv_path: str = REXUS_CSV_PATH,
+    model_name: str = EMBEDDING_MODEL_NAME,
+    cache_dir: str = EMBEDDING_CACHE_DIR,
+    workers: int = EMBEDDING_WORKERS,
+    chunk_size: int = EMBEDDING_CHUNK_SIZE,
+) -> np.ndarray:
+    """
+    Return the corpus embedding matrix, memory-mapped from disk when a cache
+    entry exists for this CSV content and model, otherwise encode it in
+    chunks (see :func:`encode_corpus`) and save it.
+    """
+    start = time.perf_counter()
+    path = embedding_cache_path(csv_path, model_name, cache_dir)
+    if os.path.exists(path):
+        embeddings = np.load(path, mmap_mode="r")
+        if embeddings.shape[0] == len(df):
+            telemetry.count("cache_events_total", cache="embeddings", event="hits")
+            logger.info("Loaded %d cached embeddings from %s in %.3fs", len(df), path, time.perf_counter() - start)
+            return embeddings
+        logger.warning("Discarding embedding cache %s with %d rows for a %d row corpus", path, embeddings.shape[0], len(df))
+
+    telemetry.count("cache_events_total", cache="embeddings", event="misses")
+    os.makedirs(cache_dir, exist_ok=True)
+    # Not ending in .npy, so a crashed build is never mistaken for a cache entry
+    tmp_path = path + ".tmp"
+    with telemetry.span("embeddings.encode_corpus", rows=len(df), workers=workers):
+        encode_corpus(rexus_corpus_text(df).tolist(), tmp_path, emb_model, model_name, workers, chunk_size)
+    os.replace(tmp_path, path)
+    _prune_stale(cache_dir, keep=path)
+    logger.info("Encoded and cached %d embeddings to %s in %.3fs", len(df), path, time.perf_counter() - start)
+    return np.load(path, mmap_mode="r")
+
+
+def update_embeddings(
+    previous: np.ndarray,
+    source: np.ndarray,
+    texts: Sequence[str],
+    path: str,
+    emb_model=None,
+    model_name: str = EMBEDDING_MODEL_NAME,
+    chunk_size: int = EMBEDDING_CHUNK_SIZE,
+) -> np.ndarray:
+    """
+    Write the embeddings of a changed corpus to ``path``: row ``i`` is copied
+    from ``previous[source[i]]``, or encoded from ``texts[i]`` when
+    ``source[i]`` is -1, so only new and re-worded buildings hit the model.
+    """
+    start = time.perf_counter()
+    fresh = np.flatnonzero(source < 0)
+    reused = np.flatnonzero(source >= 0)
+    tmp_path = path + ".tmp"
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    out = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float32, shape=(len(source), previous.shape[1]))
+    for offset in range(0, len(reused), chunk_size):
+        rows = reused[offset:offset + chunk_size]
+        out[rows] = previous[source[rows]]
+    if len(fresh):
+        model = emb_model
+        if model is None:
+            from sentence_transformers import SentenceTransformer
+            model = SentenceTransformer(model_name)
+        with telemetry.span("embeddings.encode_delta", rows=len(fresh)):
+            for offset in range(0, len(fresh), chunk_size):
+                rows = fresh[offset:offset + chunk_size]
+                out[rows] = np.asarray(model.encode([texts[i] for i in rows]), dtype=np.float32)
+        telemetry.count("embedding_rows_total", len(fresh))
+    out.flush()
+    del out
+    os.replace(tmp_path, path)
+    _prune_stale(os.path.dirname(path), keep=path)
+    logger.info("Updated embeddings at %s: %d reused, %d encoded in %.3fs",
+                path, len(reused), len(fresh), time.perf_counter() - start)
+    return np.load(path, mmap_mode="r")
+
+
+def _report_start_times(csv_path: str, model_name: str, workers: int, chunk_size: int) -> None:
+    """Time a cold (empty cache) and a warm start of the corpus embeddings"""
+    cache_dir = os.path.join(STORE_DIR, "embeddings-benchmark")
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    df = load_rexus_store(csv_path)
+
+    start = time.perf_counter()
+    load_or_build_embeddings(df, csv_path=csv_path, model_name=model_name, cache_dir=cache_dir,
+                             workers=workers, chunk_size=chunk_size)
+    cold = time.perf_counter() - start
+
+    start = time.perf_counter()
+    load_or_build_embeddings(df, csv_path=csv_path, model_name=model_name, cache_dir=cache_dir)
+    warm = time.perf_counter() - start
+
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    print(f"rows={len(df)} model={model_name} workers={workers} chunk_size={chunk_size}")
+    print(f"cold start (encode + save): {cold:.3f}s ({len(df) / cold:.0f} rows/s)")
+    print(f"warm start (memory-map):    {warm:.3f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time a cold and a warm start of the corpus embedding cache")
+    parser.add_argument("csv_path", nargs="?", default=REXUS_CSV_PATH)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="encoder processes (1 encodes in-process)")
+    parser.add_argument("--chunk-size", type=int, default=EMBEDDING_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    _report_start_times(args.csv_path, EMBEDDING_MODEL_NAME, args.workers, args.chunk_size)
@@ -0,0 +1,185 @@
+"""
+Durable geocode cache shared across sessions and processes (SQLite), with
+TTLs, negative caching, a token-bucket rate limiter for the upstream
+service and single-flight coalescing of concurrent lookups.
+"""
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, Optional, Tuple
+
+import telemetry
+from geocoder import GeocodeResult, normalize_place, normalize_state
+from rexus_store import STORE_DIR
+
+GEOCODE_CACHE_PATH = os.path.join(STORE_DIR, "geocode.sqlite")
+POSITIVE_TTL = 30 * 24 * 3600
+NEGATIVE_TTL = 24 * 3600
+# Nominatim's usage policy allows at most one request per second
+NOMINATIM_RATE = 1.0
+
+
+def cache_key(location: str) -> str:
+    """Normalized key so "St. Paul, Minnesota" and "saint paul, MN" share an entry"""
+    if "," not in location:
+        return normalize_place(location)
+    city, state = location.rsplit(",", 1)
+    return f"{normalize_place(city)}|{normalize_state(state)}"
+
+
+class TokenBucket:
+    """Blocking token bucket: ``rate`` tokens per second, bursts up to ``capacity``"""
+
+    def __init__(self, rate: float = NOMINATIM_RATE, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take one token, sleeping until one is available; returns seconds waited"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class SingleFlight:
+    """Runs one call per key at a time; concurrent callers for the same key share its result"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+
+    def do(self, key: str, fn) -> Tuple[object, bool]:
+        """Returns (result, shared) where shared is True if another caller did the work"""
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+        if not leader:
+            return future.result(), True
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+        return future.result(), False
+
+
+class GeocodeCache:
+    """SQLite table of geocode results; misses (unknown places) are stored too, with a shorter TTL"""
+
+    def __init__(self, path: str = GEOCODE_CACHE_PATH, ttl: float = POSITIVE_TTL, negative_ttl: float = NEGATIVE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS geocode ("
+            " key TEXT PRIMARY KEY, lat REAL, lon REAL, city TEXT, state TEXT, source TEXT,"
+            " found INTEGER NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Tuple[bool, Optional[GeocodeResult]]:
+        """(hit, result); a hit with result None is a cached "not found" """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT lat, lon, city, state, source, found, expires_at FROM geocode WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or row[6] < time.time():
+            return False, None
+        if not row[5]:
+            return True, None
+        return True, GeocodeResult(row[0], row[1], row[2], row[3], row[4])
+
+    def put(self, key: str, result: Optional[GeocodeResult]) -> None:
+        expires_at = time.time() + (self.ttl if result else self.negative_ttl)
+        values = (key,) + (tuple(result) if result else (None,) * 5) + (int(result is not None), expires_at)
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO geocode VALUES (?, ?, ?, ?, ?, ?, ?, ?)", values)
+            self._conn.commit()
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            deleted = self._conn.execute("DELETE FROM geocode WHERE expires_at < ?", (time.time(),)).rowcount
+            self._conn.commit()
+        return deleted
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM geocode").fetchone()[0]
+
+
+class CachedGeocoder:
+    """
+    Wraps an upstream geocoder (anything with ``lookup(location)``) with the
+    durable cache and request coalescing. Upstream errors are not cached.
+    """
+
+    def __init__(self, upstream, cache: Optional[GeocodeCache] = None):
+        self.upstream = upstream
+        self.cache = cache if cache is not None else GeocodeCache()
+        self._flight = SingleFlight()
+        self._stats_lock = threading.Lock()
+        self._stats = {"hits": 0, "negative_hits": 0, "misses": 0, "coalesced": 0, "upstream_calls": 0, "upstream_errors": 0}
+
+    def _count(self, name: str) -> None:
+        with self._stats_lock:
+            self._stats[name] += 1
+        telemetry.count("cache_events_total", cache="geocode", event=name)
+
+    def _fetch(self, key: str, location: str) -> Optional[GeocodeResult]:
+        # Another flight may have filled the cache while this one was queued
+        hit, result = self.cache.get(key)
+        if hit:
+            return result
+        self._count("upstream_calls")
+        try:
+            with telemetry.span("geocode.upstream"):
+                result = self.upstream.lookup(location)
+        except Exception:
+            self._count("upstream_errors")
+            telemetry.count("upstream_errors_total", upstream="nominatim")
+            raise
+        self.cache.put(key, result)
+        return result
+
+    def lookup(self, location: str) -> Optional[GeocodeResult]:
+        key = cache_key(location)
+        hit, result = self.cache.get(key)
+        if hit:
+            self._count("hits" if result else "negative_hits")
+            return result
+        self._count("misses")
+        result, shared = self._flight.do(key, lambda: self._fetch(key, location))
+        if shared:
+            self._count("coalesced")
+        return result
+
+    def stats(self) -> Dict[str, float]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["negative_hits"] + stats["misses"]
+        stats["hit_ratio"] = (stats["hits"] + stats["negative_hits"]) / lookups if lookups else 0.0
+        stats["entries"] = len(self.cache)
+        return stats
@@ -0,0 +1,243 @@
+"""
+Offline US geocoder backed by a bundled ZIP centroid gazetteer, with
+Nominatim as a network fallback for places the local table does not know.
+"""
+import difflib
+import logging
+import os
+import re
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import telemetry
+
+GAZETTEER_PATH = os.path.join("data", "us_zip_centroids.csv.gz")
+
+logger = logging.getLogger(__name__)
+
+STATE_CODES = {
+    "ALABAMA": "AL", "ALASKA": "AK", "ARIZONA": "AZ", "ARKANSAS": "AR", "CALIFORNIA": "CA",
+    "COLORADO": "CO", "CONNECTICUT": "CT", "DELAWARE": "DE", "DISTRICT OF COLUMBIA": "DC",
+    "FLORIDA": "FL", "GEORGIA": "GA", "HAWAII": "HI", "IDAHO": "ID", "ILLINOIS": "IL",
+    "INDIANA": "IN", "IOWA": "IA", "KANSAS": "KS", "KENTUCKY": "KY", "LOUISIANA": "LA",
+    "MAINE": "ME", "MARYLAND": "MD", "MASSACHUSETTS": "MA", "MICHIGAN": "MI", "MINNESOTA": "MN",
+    "MISSISSIPPI": "MS", "MISSOURI": "MO", "MONTANA": "MT", "NEBRASKA": "NE", "NEVADA": "NV",
+    "NEW HAMPSHIRE": "NH", "NEW JERSEY": "NJ", "NEW MEXICO": "NM", "NEW YORK": "NY",
+    "NORTH CAROLINA": "NC", "NORTH DAKOTA": "ND", "OHIO": "OH", "OKLAHOMA": "OK", "OREGON": "OR",
+    "PENNSYLVANIA": "PA", "RHODE ISLAND": "RI", "SOUTH CAROLINA": "SC", "SOUTH DAKOTA": "SD",
+    "TENNESSEE": "TN", "TEXAS": "TX", "UTAH": "UT", "VERMONT": "VT", "VIRGINIA": "VA",
+    "WASHINGTON": "WA", "WEST VIRGINIA": "WV", "WISCONSIN": "WI", "WYOMING": "WY",
+    "PUERTO RICO": "PR", "GUAM": "GU", "VIRGIN ISLANDS": "VI", "AMERICAN SAMOA": "AS",
+    "NORTHERN MARIANA ISLANDS": "MP",
+}
+
+# Leading/standalone abbreviations expanded before matching ("St. Paul" -> "SAINT PAUL")
+_ABBREVIATIONS = {
+    "ST": "SAINT", "STE": "SAINTE", "FT": "FORT", "MT": "MOUNT", "PT": "POINT",
+    "N": "NORTH", "S": "SOUTH", "E": "EAST", "W": "WEST", "HTS": "HEIGHTS", "SPGS": "SPRINGS",
+}
+_PLACE_ALIASES = {
+    "NYC": "NEW YORK", "NEW YORK CITY": "NEW YORK", "LA": "LOS ANGELES", "SF": "SAN FRANCISCO",
+    "WASHINGTON DC": "WASHINGTON", "DC": "WASHINGTON",
+}
+_NON_WORD = re.compile(r"[^A-Z0-9 ]+")
+_ZIP = re.compile(r"^\d{5}(?:-?\d{4})?$")
+
+
+class GeocodeResult(NamedTuple):
+    lat: float
+    lon: float
+    city: str
+    state: str
+    source: str  # "gazetteer", "gazetteer-zip", "gazetteer-fuzzy" or "nominatim"
+
+
+def normalize_state(state: str) -> str:
+    """Two-letter code for a state name or code ("Washington" / "wa" -> "WA")"""
+    cleaned = _NON_WORD.sub(" ", str(state).upper()).strip()
+    cleaned = re.sub(r"\s+", " ", cleaned)
+    return STATE_CODES.get(cleaned, cleaned)
+
+
+def normalize_place(name: str) -> str:
+    """Case, punctuation and abbreviation tolerant key for a place name"""
+    cleaned = _NON_WORD.sub(" ", str(name).upper().replace(".", " "))
+    words = [_ABBREVIATIONS.get(word, word) for word in cleaned.split()]
+    key = " ".join(words)
+    return _PLACE_ALIASES.get(key, key)
+
+
+def parse_location(location: str) -> Tuple[str, str]:
+    """Split "City, ST" into its parts; raises ValueError without a comma"""
+    if "," not in location:
+        raise ValueError(f"Expected 'City, State' but got '{location}'")
+    city, state = location.rsplit(",", 1)
+    return city.strip(), state.strip()
+
+
+class Gazetteer:
+    """In-memory (place, state) and ZIP centroid lookups"""
+
+    def __init__(self, zips: pd.DataFrame):
+        keys = {name: normalize_place(name) for name in zips["city"].unique()}
+        zips = zips.assign(
+            zip=zips["zip"].astype(str).str.zfill(5),
+            state=zips["state"].astype(str).str.upper(),
+            key=zips["city"].map(keys),
+            primary=zips["primary"].astype(int),
+        )
+        primary = zips[zips["primary"] == 1].drop_duplicates("zip")
+        self.zips: Dict[str, Tuple[float, float, str, str]] = {
+            z: (lat, lon, city, state)
+            for z, lat, lon, city, state in zip(primary["zip"], primary["lat"], primary["lon"], primary["city"], primary["state"])
+        }
+        # A place's centroid is the mean of the ZIPs it is the primary city
+        # for; alternate ZIP city names only count for places with no ZIP of
+        # their own, since they often cover a whole rural delivery area
+        has_primary = zips.groupby(["key", "state"], sort=False)["primary"].transform("max")
+        zips = zips[zips["primary"] == has_primary]
+        centroids = zips.groupby(["key", "state"], sort=False).agg(lat=("lat", "mean"), lon=("lon", "mean"), city=("city", "first"))
+        self.places: Dict[Tuple[str, str], Tuple[float, float, str]] = {
+            key: (row.lat, row.lon, row.city) for key, row in zip(centroids.index, centroids.itertuples(index=False))
+        }
+        self._rebuild_state_lists()
+
+    @classmethod
+    def from_file(cls, path: str = GAZETTEER_PATH) -> "Gazetteer":
+        return cls(pd.read_csv(path, dtype={"zip": str}))
+
+    def _rebuild_state_lists(self) -> None:
+        self._by_state: Dict[str, List[str]] = {}
+        for place, state in self.places:
+            self._by_state.setdefault(state, []).append(place)
+
+    def __len__(self) -> int:
+        return len(self.places)
+
+    def add_place(self, city: str, state: str, lat: float, lon: float) -> None:
+        key = (normalize_place(city), normalize_state(state))
+        if key not in self.places:
+            self._by_state.setdefault(key[1], []).append(key[0])
+        self.places[key] = (float(lat), float(lon), city)
+
+    def extend_from_buildings(self, df: pd.DataFrame) -> int:
+        """
+        Add places that only appear in the building inventory, placing each at
+        the mean centroid of its buildings' ZIP codes. Returns how many were added.
+        """
+        cities = df["Bldg City"].astype(str)
+        states = df["Bldg State"].astype(str).str.upper()
+        zips = df["Bldg Zip"].astype(str).str.strip().str[:5]
+        coords: Dict[Tuple[str, str], List[Tuple[float, float, str]]] = {}
+        for city, state, zip5 in zip(cities, states, zips):
+            key = (normalize_place(city), state)
+            if key in self.places or zip5 not in self.zips:
+                continue
+            lat, lon = self.zips[zip5][:2]
+            coords.setdefault(key, []).append((lat, lon, city.title()))
+        for (place, state), points in coords.items():
+            lat, lon = np.mean([p[:2] for p in points], axis=0)
+            self.add_place(points[0][2], state, lat, lon)
+        return len(coords)
+
+    def lookup(self, location: str, fuzzy_cutoff: float = 0.85) -> Optional[GeocodeResult]:
+        """Resolve "City, ST", "City, State Name" or a ZIP code without touching the network"""
+        query = location.strip()
+        if _ZIP.match(query):
+            hit = self.zips.get(query[:5])
+            return GeocodeResult(hit[0], hit[1], hit[2], hit[3], "gazetteer-zip") if hit else None
+        try:
+            city, state = parse_location(query)
+        except ValueError:
+            return None
+        place, state = normalize_place(city), normalize_state(state)
+        hit = self.places.get((place, state))
+        if hit:
+            return GeocodeResult(hit[0], hit[1], hit[2], state, "gazetteer")
+        close = difflib.get_close_matches(place, self._by_state.get(state, []), n=1, cutoff=fuzzy_cutoff)
+        if close:
+            lat, lon, name = self.places[(close[0], state)]
+            return GeocodeResult(lat, lon, name, state, "gazetteer-fuzzy")
+        return None
+
+
+class NominatimGeocoder:
+    """
+    Network geocoder with the app's original retry behaviour. Each HTTP
+    attempt first takes a token from ``rate_limiter`` when one is given.
+    """
+
+    def __init__(
+        self,
+        user_agent: str = "neighborhood_comparison_tool",
+        max_retries: int = 3,
+        retry_delay: float = 1.0,
+        rate_limiter=None,
+    ):
+        self.user_agent = user_agent
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.rate_limiter = rate_limiter
+        self._geolocator = None
+
+    @property
+    def geolocator(self):
+        if self._geolocator is None:
+            from geopy.geocoders import Nominatim
+            self._geolocator = Nominatim(user_agent=self.user_agent)
+        return self._geolocator
+
+    def lookup(self, location: str) -> Optional[GeocodeResult]:
+        """
+        None if Nominatim does not know the place or answers without usable
+        coordinates (both are answers, cached as negatives); raises if every
+        attempt errored
+        """
+        city, state = parse_location(location)
+        for attempt in range(self.max_retries):
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            try:
+                found = self.geolocator.geocode(f"{city}, {state}, USA", timeout=10)
+            except Exception as e:
+                logger.warning("Nominatim attempt %d for %s failed: %s", attempt + 1, location, e)
+                if attempt == self.max_retries - 1:
+                    raise
+                telemetry.count("upstream_retries_total", upstream="nominatim")
+                time.sleep(self.retry_delay)
+                continue
+            if found is None:
+                return None
+            try:
+                lat, lon = float(found.latitude), float(found.longitude)
+            except (TypeError, ValueError):
+                lat = lon = float("nan")
+            if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+                # Asking again returns the same record, so it is not retried
+                logger.warning("Nominatim returned unusable coordinates for %s: %r, %r",
+                               location, found.latitude, found.longitude)
+                return None
+            return GeocodeResult(lat, lon, city, normalize_state(state), "nominatim")
+        return None
+
+
+class Geocoder:
+    """Local gazetteer first; the network fallback is only consulted on a local miss"""
+
+    def __init__(self, gazetteer: Gazetteer, fallback=None):
+        self.gazetteer = gazetteer
+        self.fallback = fallback if fallback is not None else NominatimGeocoder()
+
+    def geocode(self, location: str) -> Optional[GeocodeResult]:
+        with telemetry.span("geocode.gazetteer"):
+            result = self.gazetteer.lookup(location)
+        if result is not None:
+            return result
+        try:
+            return self.fallback.lookup(location)
+        except Exception as e:
+            logger.error("Could not geocode %s: %s", location, e)
+            return None
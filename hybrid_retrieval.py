@@ -0,0 +1,210 @@
+"""Hybrid BM25 + embedding retrieval over the REXUS buildings with filter pushdown."""
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from building_index import city_state_key, city_state_keys
+from vector_index import VectorIndex, normalize_rows, top_k_indices
+
+LEXICAL_FIELDS = ["Bldg Address1", "Bldg City", "Bldg County", "Bldg State", "Bldg Zip"]
+
+_TOKEN = re.compile(r"[A-Za-z0-9]+")
+# Dropped from questions unless typed in capitals, where they are more
+# likely to be state codes ("Portland, OR", "Gary, IN")
+_STOPWORDS = {
+    "A", "AN", "AND", "ARE", "AT", "BE", "BY", "DO", "FOR", "FROM", "HOW", "I", "IN", "IS", "IT",
+    "ME", "OF", "ON", "OR", "SHOW", "THE", "TO", "WHAT", "WHERE", "WHICH", "WITH",
+}
+
+
+def tokenize_document(text: str) -> List[str]:
+    tokens = _TOKEN.findall(str(text).upper())
+    # Index 5-digit ZIP prefixes alongside the ZIP+4 values in the export
+    return tokens + [t[:5] for t in tokens if len(t) == 9 and t.isdigit()]
+
+
+def tokenize_query(text: str) -> List[str]:
+    tokens = []
+    for word in _TOKEN.findall(str(text)):
+        upper = word.upper()
+        if upper in _STOPWORDS and word != upper:
+            continue
+        tokens.append(upper)
+    return tokens
+
+
+class BM25Index:
+    """Inverted index with Okapi BM25 scoring that can be restricted to a candidate subset"""
+
+    def __init__(self, documents: Sequence[str], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.n_docs = len(documents)
+        self.doc_lengths = np.zeros(self.n_docs, dtype=np.float32)
+        self.postings = self._tokenize(documents, range(self.n_docs))
+        self.avg_length = float(self.doc_lengths.mean()) if self.n_docs else 0.0
+
+    def _tokenize(self, documents: Sequence[str], doc_ids: Iterable[int]) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+        """Postings of ``documents[i]`` for each ``i`` in ``doc_ids``, filling in their lengths"""
+        postings: Dict[str, Dict[int, int]] = {}
+        for doc_id in doc_ids:
+            tokens = tokenize_document(documents[doc_id])
+            self.doc_lengths[doc_id] = len(tokens)
+            for token in tokens:
+                counts = postings.setdefault(token, {})
+                counts[doc_id] = counts.get(doc_id, 0) + 1
+        return {
+            token: (np.fromiter(counts.keys(), dtype=np.int64, count=len(counts)),
+                    np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+            for token, counts in postings.items()
+        }
+
+    def updated(self, documents: Sequence[str], source: np.ndarray) -> "BM25Index":
+        """
+        The index over ``documents``, where document ``i`` is unchanged from
+        document ``source[i]`` of this index (or new when -1). Existing
+        postings are renumbered; only the new documents are tokenized.
+        """
+        index = object.__new__(type(self))
+        index.k1, index.b, index.n_docs = self.k1, self.b, len(documents)
+        reused = source >= 0
+        renumber = np.full(self.n_docs, -1, dtype=np.int64)
+        renumber[source[reused]] = np.flatnonzero(reused)
+        index.doc_lengths = np.zeros(index.n_docs, dtype=np.float32)
+        index.doc_lengths[reused] = self.doc_lengths[source[reused]]
+        index.postings = {}
+        for token, (doc_ids, tf) in self.postings.items():
+            doc_ids = renumber[doc_ids]
+            keep = doc_ids >= 0
+            if keep.all():
+                index.postings[token] = (doc_ids, tf)
+            elif keep.any():
+                index.postings[token] = (doc_ids[keep], tf[keep])
+        for token, (doc_ids, tf) in index._tokenize(documents, np.flatnonzero(~reused)).items():
+            if token in index.postings:
+                old_ids, old_tf = index.postings[token]
+                doc_ids, tf = np.concatenate([old_ids, doc_ids]), np.concatenate([old_tf, tf])
+            index.postings[token] = (doc_ids, tf)
+        index.avg_length = float(index.doc_lengths.mean()) if index.n_docs else 0.0
+        return index
+
+    def idf(self, token: str) -> float:
+        df = len(self.postings[token][0]) if token in self.postings else 0
+        return float(np.log(1 + (self.n_docs - df + 0.5) / (df + 0.5)))
+
+    def score(self, tokens: Iterable[str], candidate_mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """Dense BM25 scores; documents outside ``candidate_mask`` are never touched"""
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        for token in set(tokens):
+            if token not in self.postings:
+                continue
+            doc_ids, tf = self.postings[token]
+            if candidate_mask is not None:
+                keep = candidate_mask[doc_ids]
+                doc_ids, tf = doc_ids[keep], tf[keep]
+            norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_ids] / max(self.avg_length, 1e-9))
+            scores[doc_ids] += self.idf(token) * tf * (self.k1 + 1) / (tf + norm)
+        return scores
+
+
+class HybridRetriever:
+    """
+    Combines BM25 over address/city/county/state/zip with embedding cosine
+    similarity. Structured filters are applied first so only the surviving
+    rows are scored.
+    """
+
+    def __init__(self, df: pd.DataFrame, vector_index: VectorIndex, alpha: float = 0.5, shortlist: int = 100):
+        self.df = df
+        self.vector_index = vector_index
+        self.alpha = alpha
+        self.shortlist = shortlist
+        self.bm25 = BM25Index(self._documents(df))
+        self._states = df["Bldg State"].astype(str).str.strip().str.upper().to_numpy()
+        self._statuses = df["Bldg Status"].astype(str).str.strip().str.upper().to_numpy()
+        self._city_state = city_state_keys(df["Bldg City"], df["Bldg State"])
+
+    @staticmethod
+    def _documents(df: pd.DataFrame) -> List[str]:
+        documents = df[LEXICAL_FIELDS[0]].astype(str)
+        for field in LEXICAL_FIELDS[1:]:
+            documents = documents + " " + df[field].astype(str)
+        return documents.tolist()
+
+    def updated(self, df: pd.DataFrame, vector_index: VectorIndex, source: np.ndarray) -> "HybridRetriever":
+        """
+        The retriever over ``df``, where row ``i`` is unchanged from row
+        ``source[i]`` of the current table (or inserted/updated when -1).
+        """
+        retriever = object.__new__(type(self))
+        retriever.df, retriever.vector_index = df, vector_index
+        retriever.alpha, retriever.shortlist = self.alpha, self.shortlist
+        retriever.bm25 = self.bm25.updated(self._documents(df), source)
+        retriever._states = df["Bldg State"].astype(str).str.strip().str.upper().to_numpy()
+        retriever._statuses = df["Bldg Status"].astype(str).str.strip().str.upper().to_numpy()
+        reused = source >= 0
+        city_state = np.empty(len(df), dtype=object)
+        city_state[reused] = self._city_state[source[reused]]
+        fresh = np.flatnonzero(~reused)
+        city_state[fresh] = city_state_keys(df["Bldg City"].iloc[fresh], df["Bldg State"].iloc[fresh])
+        retriever._city_state = city_state
+        return retriever
+
+    def filter_mask(
+        self,
+        states: Optional[Iterable[str]] = None,
+        statuses: Optional[Iterable[str]] = None,
+        locations: Optional[Iterable[Tuple[str, str]]] = None,
+    ) -> Optional[np.ndarray]:
+        """Boolean row mask for the structured filters, or None when no filter is set"""
+        mask = None
+        if states:
+            mask = np.isin(self._states, [s.strip().upper() for s in states])
+        if statuses:
+            status_mask = np.isin(self._statuses, [s.strip().upper() for s in statuses])
+            mask = status_mask if mask is None else mask & status_mask
+        if locations:
+            location_mask = np.isin(self._city_state, [city_state_key(city, state) for city, state in locations])
+            mask = location_mask if mask is None else mask & location_mask
+        return mask
+
+    def search(
+        self,
+        query: str,
+        query_embedding: np.ndarray,
+        top_k: int = 3,
+        filters: Optional[Dict[str, Iterable]] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (fused scores, row positions) of the best ``top_k`` rows, best first"""
+        mask = self.filter_mask(**(filters or {}))
+        if mask is not None and not mask.any():
+            return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+
+        lexical = self.bm25.score(tokenize_query(query), mask)
+        if mask is not None:
+            candidates = np.flatnonzero(mask)
+        else:
+            # Unfiltered: union the ANN shortlist with every lexical hit
+            _, shortlist = self.vector_index.search(query_embedding, max(self.shortlist, top_k))
+            shortlist = shortlist[0][shortlist[0] >= 0]
+            candidates = np.union1d(shortlist, np.flatnonzero(lexical))
+
+        query_vector = normalize_rows(query_embedding)[0]
+        semantic = np.clip(self.vector_index.vectors[candidates] @ query_vector, 0.0, 1.0)
+        lexical = lexical[candidates]
+        if lexical.max(initial=0.0) > 0:
+            lexical = lexical / lexical.max()
+        fused = self.alpha * semantic + (1 - self.alpha) * lexical
+
+        best = top_k_indices(fused, top_k)
+        return fused[best], candidates[best]
+
+    def retrieve(self, query: str, query_embedding: np.ndarray, top_k: int = 3,
+                 filters: Optional[Dict[str, Iterable]] = None) -> pd.DataFrame:
+        """The best matching building rows; filters that match nothing are ignored"""
+        _, positions = self.search(query, query_embedding, top_k, filters)
+        if filters and len(positions) == 0:
+            _, positions = self.search(query, query_embedding, top_k)
+        return self.df.iloc[positions]
@@ -0,0 +1,379 @@
+"""
+Per-location data sources and the orchestrator that fetches them
+concurrently, each under its own deadline, for one or many locations.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import scoring
+import telemetry
+from building_index import DEFAULT_RANK_KEY
+from geocoder import parse_location
+from providers import get_provider
+from resources import refresh_if_stale, registry
+from rexus_store import format_rexus_value
+
+logger = logging.getLogger(__name__)
+
+# Seconds each source may take, measured from the start of the fetch. The
+# quality of life deadline includes geocoding, which it depends on.
+SOURCE_TIMEOUTS = {
+    "geocode": 20.0,
+    "real_estate": 5.0,
+    "safety": 5.0,
+    "quality_of_life": 20.0,
+    "education": 5.0,
+    "demographics": 5.0,
+}
+
+
+def get_real_estate_data(city: str, state: str, rank_by: str = DEFAULT_RANK_KEY) -> Dict[str, Any]:
+    """Get the best ranked building from the REXUS store for the given city and state"""
+    try:
+        # Serve an edited CSV from the next lookup on, not only after the next question
+        refresh_if_stale()
+        # O(1) lookup of every building in the city (ignores case and extra spaces)
+        matches = registry.get("city_state_index").lookup(city, state, rank_by)
+
+        if matches.empty:
+            return {
+                "median_price": "No data",
+                "median_rent": "No data",
+                "total_units": "No data",
+                "occupancy_rate": "No data",
+                "market_health": "No data",
+                "first_address": "No building found in database."
+            }
+        else:
+            # Matches are already ranked, so the first row is the best available
+            row = matches.iloc[0]
+            return {
+                "matching_buildings": str(len(matches)),
+                "first_address": format_rexus_value(row["Bldg Address1"]),
+                "building_status": format_rexus_value(row["Bldg Status"]),
+                "property_type": format_rexus_value(row["Property Type"]),
+                "usable_sqft": format_rexus_value(row["Bldg ANSI Usable"]),
+                "total_parking": format_rexus_value(row["Total Parking Spaces"]),
+                "owned_leased": format_rexus_value(row["Owned/Leased"]),
+                "construction_date": format_rexus_value(row["Construction Date"]),
+                "historical_status": format_rexus_value(row["Historical Status"]),
+                "aba_accessibility": format_rexus_value(row.get("ABA Accessibility Flag", "Unknown")),
+                "city": format_rexus_value(row["Bldg City"]),
+                "state": format_rexus_value(row["Bldg State"])
+            }
+    except Exception as e:
+        logger.error("Error reading real estate data from the building store: %s", e)
+        return {
+            "first_address": "Error",
+            "building_status": "Error",
+            "property_type": "Error",
+            "usable_sqft": "Error",
+            "total_parking": "Error",
+            "owned_leased": "Error",
+            "construction_date": "Error",
+            "historical_status": "Error",
+            "aba_accessibility": "Error",
+            "city": city,
+            "state": state
+        }
+
+
+SAFETY_NA = {
+    "crime_index": "N/A",
+    "safety_score": "N/A",
+    "violent_crime_rate": "N/A",
+    "property_crime_rate": "N/A",
+    "police_response": "N/A",
+    "crime_trend": "N/A",
+    "neighborhood_watch": "N/A"
+}
+QUALITY_NA = {
+    "walkability": "N/A",
+    "air_quality": "N/A",
+    "parks_nearby": "N/A",
+    "restaurants": "N/A",
+    "commute_time": "N/A",
+    "public_transit": "N/A",
+    "healthcare_access": "N/A"
+}
+
+
+def get_safety_batch(cities: Sequence[str], states: Sequence[str]) -> List[Dict[str, Any]]:
+    """Get safety data from FBI UCR and local sources for many cities at once"""
+    try:
+        # Simulated FBI UCR data, scored for the whole batch in one pass
+        scores = scoring.safety_scores(cities)
+        return [
+            {
+                "crime_index": int(score),
+                "safety_score": f"{int(score)}%",
+                "violent_crime_rate": f"{violent:.1f} per 1,000",
+                "property_crime_rate": f"{prop:.1f} per 1,000",
+                "police_response": f"{int(response)} min avg",
+                "crime_trend": f"{trend:.1f}% YoY",
+                "neighborhood_watch": f"{int(watch)} active groups"
+            }
+            for score, violent, prop, response, trend, watch in zip(
+                scores["crime_index"], scores["violent_crime_rate"], scores["property_crime_rate"],
+                scores["police_response"], scores["crime_trend"], scores["neighborhood_watch"],
+            )
+        ]
+    except Exception as e:
+        logger.warning("Using estimated safety data: %s", e)
+        return [dict(SAFETY_NA) for _ in cities]
+
+
+def get_safety_data(city: str, state: str) -> Dict[str, Any]:
+    """Get safety data from FBI UCR and local sources"""
+    return get_safety_batch([city], [state])[0]
+
+
+def get_measured_aqi(lat: Optional[float], lon: Optional[float]) -> float:
+    """AQI from the nearest WAQI station, or NaN when unavailable or not configured"""
+    waqi = get_provider("waqi")
+    if lat is None or lon is None or not waqi.configured:
+        return float("nan")
+    try:
+        return float(waqi.air_quality(lat, lon)["aqi"])
+    except Exception as e:
+        logger.warning("Using estimated air quality: %s", e)
+        return float("nan")
+
+
+def get_quality_batch(
+    lats: Sequence[Optional[float]],
+    lons: Sequence[Optional[float]],
+    measured_aqi: Optional[Sequence[float]] = None,
+) -> List[Dict[str, Any]]:
+    """Get quality of life data for many coordinates at once; None coordinates give N/A"""
+    try:
+        lat = np.array([np.nan if v is None else v for v in lats], dtype=np.float64)
+        lon = np.array([np.nan if v is None else v for v in lons], dtype=np.float64)
+        scores = scoring.quality_scores(lat, lon)
+
+        # Measured air quality from the nearest WAQI station replaces the estimate where available
+        if measured_aqi is not None:
+            aqi = np.asarray(measured_aqi, dtype=np.float64)
+            scores["air_quality"] = np.where(np.isnan(aqi), scores["air_quality"], scoring.aqi_to_score(aqi))
+
+        results = []
+        for i in range(len(lat)):
+            # Unknown location: scoring (0, 0) would produce plausible-looking nonsense
+            if np.isnan(lat[i]) or np.isnan(lon[i]):
+                results.append(dict(QUALITY_NA))
+                continue
+            results.append({
+                "walkability": f"{int(scores['walkability'][i])}/100",
+                "air_quality": f"{int(scores['air_quality'][i])}/100",
+                "parks_nearby": int(scores["parks_nearby"][i]),
+                "restaurants": int(scores["restaurants"][i]),
+                "commute_time": f"{int(scores['commute_time'][i])} min avg",
+                "public_transit": f"{int(scores['public_transit'][i])}/100",
+                "healthcare_access": f"{int(scores['healthcare_access'][i])}/100"
+            })
+        return results
+    except Exception as e:
+        logger.warning("Using estimated quality of life data: %s", e)
+        return [dict(QUALITY_NA) for _ in lats]
+
+
+def get_quality_data(lat: Optional[float], lon: Optional[float]) -> Dict[str, Any]:
+    """Get quality of life data using various APIs"""
+    return get_quality_batch([lat], [lon], [get_measured_aqi(lat, lon)])[0]
+
+
+def get_education_batch(cities: Sequence[str], states: Sequence[str]) -> List[Dict[str, Any]]:
+    """Get education data with highest ranked school in the district for many cities at once"""
+    try:
+        # Demo data based on city characteristics
+        scores = scoring.education_scores(cities)
+        return [
+            {
+                "district_name": f"{city} School District",
+                "highest_ranked_school": f"{city} High School",
+                "school_rank": f"#{int(rank)} in {state}",
+                "school_rating": f"{rating}/10",
+                "total_schools": str(int(total))
+            }
+            for city, state, rating, rank, total in zip(
+                cities, states, scores["school_rating"], scores["school_rank"], scores["total_schools"]
+            )
+        ]
+    except Exception as e:
+        logger.warning("Using estimated education data: %s", e)
+        return [
+            {
+                "district_name": f"{city} School District",
+                "highest_ranked_school": "Local High School",
+                "school_rank": "N/A",
+                "school_rating": "7.0/10",
+                "total_schools": "35"
+            }
+            for city in cities
+        ]
+
+
+def get_education_data(city: str, state: str) -> Dict[str, Any]:
+    """Get education data with highest ranked school in the district"""
+    return get_education_batch([city], [state])[0]
+
+
+def get_demographic_data(city: str, state: str) -> Dict[str, Any]:
+    """Get ACS demographics for the place from the local Census snapshot"""
+    fields = ["population", "median_age", "median_household_income", "median_home_value", "median_gross_rent"]
+    snapshot = registry.get("census_snapshot")
+    row = snapshot.lookup(city, state) if snapshot is not None else None
+    if row is None:
+        return {field: "No data" for field in fields}
+
+    def fmt(value, template):
+        return "No data" if value is None else template.format(value)
+
+    return {
+        "population": fmt(row["total_population"], "{:,.0f}"),
+        "median_age": fmt(row["median_age"], "{:.1f}"),
+        "median_household_income": fmt(row["median_household_income"], "${:,.0f}"),
+        "median_home_value": fmt(row["median_home_value"], "${:,.0f}"),
+        "median_gross_rent": fmt(row["median_gross_rent"], "${:,.0f}/mo"),
+        "acs_year": str(snapshot.year or "Unknown"),
+    }
+
+
+class FetchOrchestrator:
+    """
+    Fans every independent source for every location out to a shared thread
+    pool. Per-place lookups (geocoding, buildings, demographics) run one task
+    per location; the scoring models run once over the whole batch. A source
+    that raises or misses its deadline is recorded under ``failed_sources``
+    and its section is left as None; the rest still arrive.
+    """
+
+    def __init__(self, max_workers: int = 16, timeouts: Optional[Dict[str, float]] = None):
+        self.timeouts = dict(SOURCE_TIMEOUTS, **(timeouts or {}))
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="location-fetch")
+
+    def _submit(self, stage: str, fn: Callable, *args) -> Future:
+        # Worker threads inherit the caller's trace, so each task shows up as a span
+        return self._pool.submit(telemetry.bind(fn, stage), *args)
+
+    def _wait(self, future: Future, deadline: float, default: Any = None) -> Any:
+        try:
+            return future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except Exception:
+            return default
+
+    def _measured_aqi(self, geocode: Future, deadline: float) -> float:
+        coords = self._wait(geocode, deadline)
+        return get_measured_aqi(coords.lat, coords.lon) if coords else float("nan")
+
+    def _quality_batch(self, geocodes: List[Future], aqis: List[Future], started: float) -> List[Dict[str, Any]]:
+        geocode_deadline = started + self.timeouts["geocode"]
+        quality_deadline = started + self.timeouts["quality_of_life"]
+        coords = [self._wait(f, geocode_deadline) for f in geocodes]
+        aqi = [self._wait(f, quality_deadline, float("nan")) for f in aqis]
+        return get_quality_batch([c.lat if c else None for c in coords], [c.lon if c else None for c in coords], aqi)
+
+    def _start(self, locations: List[str], rank_by: str, started: float) -> List[Optional[Dict[str, Tuple[Future, Optional[int]]]]]:
+        """Per location, each source's future and its row in a batch result (None for per-location tasks)"""
+        parsed: List[Optional[Tuple[str, str]]] = []
+        for location in locations:
+            try:
+                parsed.append(parse_location(location))
+            except ValueError as e:
+                logger.error("Error fetching data for %s: %s", location, e)
+                parsed.append(None)
+        valid = [i for i, place in enumerate(parsed) if place is not None]
+        if not valid:
+            return [None] * len(locations)
+
+        geocoder = registry.get("geocoder")
+        tasks: Dict[int, Dict[str, Tuple[Future, Optional[int]]]] = {}
+        geocodes, aqis = [], []
+        for i in valid:
+            city, state = parsed[i]
+            geocode = self._submit("geocode", geocoder.geocode, locations[i])
+            geocodes.append(geocode)
+            aqis.append(self._submit("air_quality", self._measured_aqi, geocode, started + self.timeouts["quality_of_life"]))
+            tasks[i] = {
+                "geocode": (geocode, None),
+                "real_estate": (self._submit("real_estate", get_real_estate_data, city, state, rank_by), None),
+                "demographics": (self._submit("demographics", get_demographic_data, city, state), None),
+            }
+
+        cities = [parsed[i][0] for i in valid]
+        states = [parsed[i][1] for i in valid]
+        batches = {
+            "safety": self._submit("safety", get_safety_batch, cities, states),
+            "quality_of_life": self._submit("quality_of_life", self._quality_batch, geocodes, aqis, started),
+            "education": self._submit("education", get_education_batch, cities, states),
+        }
+        for row, i in enumerate(valid):
+            tasks[i].update({source: (future, row) for source, future in batches.items()})
+        return [tasks.get(i) for i in range(len(locations))]
+
+    def fetch(self, locations: List[str], rank_by: str = DEFAULT_RANK_KEY) -> List[Optional[Dict[str, Any]]]:
+        """
+        Data for each location, in order. A location that cannot be parsed
+        yields None; otherwise the dict holds each section plus
+        ``coordinates``, ``failed_sources`` and per-source ``timings``.
+        """
+        with telemetry.span("fetch", locations=len(locations)):
+            return self._fetch(list(locations), rank_by)
+
+    def _fetch(self, locations: List[str], rank_by: str) -> List[Optional[Dict[str, Any]]]:
+        started = time.monotonic()
+        pending = self._start(locations, rank_by, started)
+
+        results = []
+        for futures in pending:
+            if futures is None:
+                results.append(None)
+                continue
+            data: Dict[str, Any] = {"failed_sources": {}, "timings": {}}
+            for source, (future, row) in futures.items():
+                remaining = max(0.0, started + self.timeouts[source] - time.monotonic())
+                try:
+                    value = future.result(timeout=remaining)
+                    if row is not None:
+                        value = value[row]
+                except TimeoutError:
+                    # Batch futures, and the geocode that quality of life also waits on, are
+                    # shared with other locations: only a task this location owns is dropped
+                    if row is None and source != "geocode":
+                        future.cancel()
+                    value = None
+                    data["failed_sources"][source] = f"timed out after {self.timeouts[source]:.0f}s"
+                    telemetry.count("source_failures_total", source=source, reason="timeout")
+                except Exception as e:
+                    value = None
+                    data["failed_sources"][source] = str(e) or type(e).__name__
+                    telemetry.count("source_failures_total", source=source, reason="error")
+                data["timings"][source] = round(time.monotonic() - started, 3)
+                if source == "geocode":
+                    data["coordinates"] = value._asdict() if value else None
+                else:
+                    data[source] = value
+            results.append(data)
+        return results
+
+
+_orchestrator_lock = threading.Lock()
+_orchestrator: Dict[str, FetchOrchestrator] = {}
+
+
+def get_orchestrator() -> FetchOrchestrator:
+    """The process-wide orchestrator, so every session shares one bounded pool"""
+    with _orchestrator_lock:
+        if "default" not in _orchestrator:
+            _orchestrator["default"] = FetchOrchestrator()
+        return _orchestrator["default"]
+
+
+def get_location_data(location: str, rank_by: str = DEFAULT_RANK_KEY) -> Optional[Dict[str, Any]]:
+    """Get data for one location; see FetchOrchestrator.fetch"""
+    return get_orchestrator().fetch([location], rank_by)[0]
@@ -0,0 +1,141 @@
+"""
+Small memoized computation graph for the app's pipelines. Streamlit reruns
+the whole script on every interaction; asking the graph for a node only
+recomputes it (and its ancestors) when one of its inputs actually changed.
+"""
+import time
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+import numpy as np
+
+import telemetry
+
+
+def fingerprint(value: Any) -> Any:
+    """Cheap, hashable identity of an input value"""
+    if value is None or isinstance(value, (str, int, float, bool, bytes)):
+        return value
+    if isinstance(value, np.ndarray):
+        return ("ndarray", value.shape, value.dtype.str, hash(value.tobytes()))
+    if isinstance(value, (list, tuple)):
+        return (type(value).__name__,) + tuple(fingerprint(v) for v in value)
+    if isinstance(value, dict):
+        return ("dict",) + tuple(sorted((str(k), fingerprint(v)) for k, v in value.items()))
+    # Shared resources (models, indexes) are compared by identity: a rebuilt one is a new object
+    return ("id", id(value))
+
+
+class ComputationGraph:
+    """
+    Inputs are set each run with :meth:`set_input`; derived nodes are
+    registered once with :meth:`node` and computed lazily by :meth:`get`.
+    Every node carries a version that changes when its value is replaced,
+    so a node is fresh if its dependencies' versions match its last run.
+    """
+
+    def __init__(self):
+        self._fns: Dict[str, Callable] = {}
+        self._deps: Dict[str, List[str]] = {}
+        self._values: Dict[str, Any] = {}
+        self._versions: Dict[str, int] = {}
+        self._seen: Dict[str, Tuple] = {}
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def _stat(self, name: str) -> Dict[str, float]:
+        return self._stats.setdefault(name, {"hits": 0, "misses": 0, "last_ms": 0.0})
+
+    def input(self, name: str) -> None:
+        self._deps[name] = []
+
+    def node(self, name: str, fn: Callable, deps: Iterable[str]) -> None:
+        """Register ``name = fn(*deps)``; re-registering keeps its memoized value"""
+        self._fns[name] = fn
+        self._deps[name] = list(deps)
+
+    def set_input(self, name: str, value: Any) -> None:
+        if name not in self._deps:
+            self.input(name)
+        key = fingerprint(value)
+        stat = self._stat(name)
+        if name in self._seen and self._seen[name] == key:
+            stat["hits"] += 1
+            return
+        stat["misses"] += 1
+        self._seen[name] = key
+        self._values[name] = value
+        self._versions[name] = self._versions.get(name, 0) + 1
+
+    def get(self, name: str) -> Any:
+        if name not in self._fns:
+            if name not in self._values:
+                raise KeyError(f"Input '{name}' has not been set")
+            return self._values[name]
+        deps = self._deps[name]
+        args = [self.get(dep) for dep in deps]
+        key = tuple(self._versions[dep] for dep in deps)
+        stat = self._stat(name)
+        if self._seen.get(name) == key and name in self._values:
+            stat["hits"] += 1
+            telemetry.count("cache_events_total", cache=f"pipeline.{name}", event="hits")
+            return self._values[name]
+        started = time.perf_counter()
+        with telemetry.span(f"pipeline.{name}"):
+            value = self._fns[name](*args)
+        stat["misses"] += 1
+        telemetry.count("cache_events_total", cache=f"pipeline.{name}", event="misses")
+        stat["last_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        self._seen[name] = key
+        self._values[name] = value
+        self._versions[name] = self._versions.get(name, 0) + 1
+        return value
+
+    def invalidate(self, name: str) -> None:
+        """Force ``name`` to recompute on its next :meth:`get`"""
+        self._seen.pop(name, None)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-node hit/miss counts and the duration of each node's last computation"""
+        return {name: dict(stat) for name, stat in self._stats.items()}
+
+
+def _fetch_comparison(locations: List[str], rank_by: str):
+    from location_data import get_orchestrator
+    return get_orchestrator().fetch(locations, rank_by)
+
+
+def _section_html(comparison, locations: List[str]):
+    from render import render_comparison
+    # Locations that could not be parsed have no data and no column
+    parsed = [(data, location) for data, location in zip(comparison, locations) if data is not None]
+    return render_comparison([data for data, _ in parsed], [location for _, location in parsed])
+
+
+def _embed_question(question: str):
+    from resources import registry
+    return registry.get("emb_model").encode([question])
+
+
+def _retrieve(question: str, query_embedding, filters, retriever):
+    from assistant import semantic_retrieve_rexus
+    return semantic_retrieve_rexus(question, retriever, None, top_k=3, filters=filters, question_emb=query_embedding)
+
+
+def _prompt(question: str, rows) -> str:
+    from assistant import build_prompt
+    return build_prompt(question, rows)
+
+
+def build_app_graph() -> ComputationGraph:
+    """
+    locations, rank_by -> comparison (geocode, source fetches and scoring) -> section_html
+    question -> query_embedding -> retrieval (+ retrieval_filters, retriever) -> prompt
+    """
+    graph = ComputationGraph()
+    for name in ("locations", "rank_by", "question", "retrieval_filters", "retriever"):
+        graph.input(name)
+    graph.node("comparison", _fetch_comparison, ["locations", "rank_by"])
+    graph.node("section_html", _section_html, ["comparison", "locations"])
+    graph.node("query_embedding", _embed_question, ["question"])
+    graph.node("retrieval", _retrieve, ["question", "query_embedding", "retrieval_filters", "retriever"])
+    graph.node("prompt", _prompt, ["question", "retrieval"])
+    return graph
@@ -0,0 +1,181 @@
+"""
+External data providers (Census ACS, WAQI air quality, FBI crime data)
+sharing one pooled keep-alive HTTP client.
+
+Every provider's base URL can be overridden with ``<NAME>_BASE_URL`` in the
+environment (e.g. ``CENSUS_BASE_URL=http://127.0.0.1:8765``) so the app can
+be pointed at a local fake server.
+"""
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+import telemetry
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class ProviderError(Exception):
+    """An upstream request failed after all retries"""
+
+
+class HTTPClient:
+    """
+    One ``requests.Session`` with a sized connection pool, so repeated calls
+    to the same host reuse TCP/TLS connections. Requests are retried with
+    jittered exponential backoff on connection errors and retryable statuses.
+    """
+
+    def __init__(self, pool_size: int = 32, max_retries: int = 3, backoff: float = 0.5, timeout: float = 10.0):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self._requests = requests
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+
+    def _sleep_before_retry(self, attempt: int) -> None:
+        time.sleep(self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5))
+
+    def get_json(self, url: str, params: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None) -> Any:
+        host = urlparse(url).netloc
+        last_error: Optional[str] = None
+        for attempt in range(self.max_retries + 1):
+            telemetry.count("upstream_requests_total", upstream=host)
+            try:
+                response = self.session.get(url, params=params, timeout=timeout or self.timeout)
+            except self._requests.RequestException as e:
+                last_error = str(e)
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    if response.status_code >= 400:
+                        telemetry.count("upstream_errors_total", upstream=host)
+                        raise ProviderError(f"GET {url} returned {response.status_code}: {response.text[:200]}")
+                    return response.json()
+                last_error = f"status {response.status_code}"
+            if attempt < self.max_retries:
+                logger.info("Retrying GET %s after %s (attempt %d)", url, last_error, attempt + 1)
+                telemetry.count("upstream_retries_total", upstream=host)
+                self._sleep_before_retry(attempt)
+        telemetry.count("upstream_errors_total", upstream=host)
+        raise ProviderError(f"GET {url} failed after {self.max_retries + 1} attempts: {last_error}")
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_client_lock = threading.Lock()
+_shared_client: Dict[str, HTTPClient] = {}
+
+
+def shared_http_client() -> HTTPClient:
+    """The process-wide pooled client used by every provider"""
+    with _client_lock:
+        if "default" not in _shared_client:
+            _shared_client["default"] = HTTPClient()
+        return _shared_client["default"]
+
+
+class Provider:
+    """
+    Base class for a data source plugin. Subclasses set ``name`` and
+    ``default_base_url`` and build requests with :meth:`get`, which is
+    limited to ``max_concurrency`` requests in flight per provider.
+    """
+
+    name = "provider"
+    default_base_url = ""
+    api_key_env: Optional[str] = None
+
+    def __init__(self, base_url: Optional[str] = None, api_key: Optional[str] = None,
+                 client: Optional[HTTPClient] = None, max_concurrency: int = 4):
+        env_prefix = self.name.upper()
+        self.base_url = (base_url or os.getenv(f"{env_prefix}_BASE_URL") or self.default_base_url).rstrip("/")
+        self.api_key = api_key or (os.getenv(self.api_key_env) if self.api_key_env else None)
+        self._client = client
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+    @property
+    def client(self) -> HTTPClient:
+        return self._client or shared_http_client()
+
+    @property
+    def configured(self) -> bool:
+        return self.api_key_env is None or bool(self.api_key)
+
+    def get(self, path: str, params: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None) -> Any:
+        with self._slots, telemetry.span(f"upstream.{self.name}"):
+            return self.client.get_json(f"{self.base_url}/{path.lstrip('/')}", params, timeout)
+
+
+class CensusACSProvider(Provider):
+    """American Community Survey tables from the Census Data API"""
+
+    name = "census"
+    default_base_url = "https://api.census.gov/data"
+    api_key_env = "CENSUS_API_KEY"
+
+    def query(self, variables: Iterable[str], geography: str, within: Optional[str] = None,
+              year: int = 2021, dataset: str = "acs/acs5") -> List[Dict[str, str]]:
+        """Rows of ``NAME`` plus ``variables`` for e.g. geography="place:*", within="state:53" """
+        params = {"get": ",".join(["NAME", *variables]), "for": geography}
+        if within:
+            params["in"] = within
+        if self.api_key:
+            params["key"] = self.api_key
+        header, *rows = self.get(f"{year}/{dataset}", params)
+        return [dict(zip(header, row)) for row in rows]
+
+
+class WAQIProvider(Provider):
+    """World Air Quality Index station feed nearest to a coordinate"""
+
+    name = "waqi"
+    default_base_url = "https://api.waqi.info"
+    api_key_env = "WAQI_API_KEY"
+
+    def air_quality(self, lat: float, lon: float) -> Dict[str, Any]:
+        payload = self.get(f"feed/geo:{lat};{lon}/", {"token": self.api_key})
+        if payload.get("status") != "ok":
+            raise ProviderError(f"WAQI returned {payload.get('status')}: {payload.get('data')}")
+        data = payload["data"]
+        return {"aqi": data.get("aqi"), "station": data.get("city", {}).get("name"), "time": data.get("time", {}).get("s")}
+
+
+class CrimeDataProvider(Provider):
+    """FBI Crime Data Explorer summarized offense counts"""
+
+    name = "crime"
+    default_base_url = "https://api.usa.gov/crime/fbi/cde"
+    api_key_env = "CRIME_DATA_API_KEY"
+
+    def state_summary(self, state: str, offense: str, from_date: str, to_date: str) -> Dict[str, Any]:
+        """Monthly rates for ``offense`` (e.g. "violent-crime") between MM-YYYY dates"""
+        return self.get(
+            f"summarized/state/{state.upper()}/{offense}",
+            {"from": from_date, "to": to_date, "API_KEY": self.api_key},
+        )
+
+
+PROVIDERS = {cls.name: cls for cls in (CensusACSProvider, WAQIProvider, CrimeDataProvider)}
+_provider_lock = threading.Lock()
+_providers: Dict[str, Provider] = {}
+
+
+def get_provider(name: str) -> Provider:
+    """Process-wide provider instance, created on first use"""
+    with _provider_lock:
+        if name not in _providers:
+            _providers[name] = PROVIDERS[name]()
+        return _providers[name]
@@ -0,0 +1,98 @@
+"""
+HTML render layer for the comparison page. Each section is built in one
+pass over module-level templates and emitted as a single Streamlit element,
+so a rerun sends one websocket delta per section instead of one per metric.
+"""
+from html import escape
+from typing import Any, Dict, List, Sequence, Tuple
+
+# (section key, title, icon) in display order
+SECTIONS = [
+    ("education", "Education & Schools", "📚"),
+    ("real_estate", "Real Estate Market", "🏠"),
+    ("safety", "Safety & Crime", "🚓"),
+    ("quality_of_life", "Quality of Life", "✨"),
+    ("demographics", "Demographics", "👥"),
+]
+# (label, key, default) shown on each best available home card
+REAL_ESTATE_FIELDS = [
+    ("Address", "first_address", "N/A"),
+    ("Building Status", "building_status", "N/A"),
+    ("Property Type", "property_type", "N/A"),
+    ("Usable SqFt", "usable_sqft", "N/A"),
+    ("Parking Spaces", "total_parking", "N/A"),
+    ("Owned/Leased", "owned_leased", "N/A"),
+    ("Construction Date", "construction_date", "N/A"),
+    ("Historical Status", "historical_status", "N/A"),
+    ("ABA Accessibility", "aba_accessibility", "N/A"),
+    ("Buildings in City", "matching_buildings", "0"),
+]
+
+_SECTION = "<h2 class='section-title'>{icon} {title}</h2>{body}{spacer}"
+_GRID = "<div class='comparison-grid' style='grid-template-columns: repeat({n}, minmax(0, 1fr));'>{cards}</div>"
+_CARD = (
+    "<div class='comparison-card'><h3 style='color: #111827; margin-bottom: 1rem;'>{location}</h3>"
+    "<div class='metrics-container'>{items}</div></div>"
+)
+_ITEM = "<div class='metric-item'><div class='metric-title'>{title}</div><div class='metric-value'>{value}</div></div>"
+_WARNING = "<div class='section-warning'>⚠️ {message}</div>"
+_HOME_HEADING = "<h2 style='text-align: center; color: #111827; margin: 2rem 0 1rem;'>🏠 Best available home</h2>"
+_HOME_CARD = (
+    "<div style='background-color: white; padding: 1.5rem; border-radius: 0.5rem; box-shadow: 0 1px 3px rgba(0,0,0,0.1);'>"
+    "<h4 style='color: #111827; margin-bottom: 1rem;'>{location}</h4><div class='metrics-container'>{items}</div></div>"
+)
+_HOME_ITEM = "<div class='metric-item'><span class='metric-title'>{title}:</span> <span class='metric-value'>{value}</span></div>"
+
+_TITLES: Dict[str, str] = {}
+
+
+def metric_title(key: str) -> str:
+    """"median_gross_rent" -> "Median Gross Rent", memoized since keys repeat every render"""
+    title = _TITLES.get(key)
+    if title is None:
+        title = _TITLES[key] = escape(key.replace("_", " ").title())
+    return title
+
+
+def _missing(section: str, location: str, data: Dict[str, Any]) -> str:
+    reason = (data.get("failed_sources") or {}).get(section, "")
+    message = f"No {section} data available for {location}" + (f" ({reason})" if reason else "")
+    return _WARNING.format(message=escape(message))
+
+
+def _section_card(section: str, location: str, data: Dict[str, Any]) -> str:
+    values = data.get(section)
+    if not values:
+        items = _missing(section, location, data)
+    else:
+        items = "".join(_ITEM.format(title=metric_title(k), value=escape(str(v))) for k, v in values.items())
+    return _CARD.format(location=escape(location), items=items)
+
+
+def _home_card(location: str, data: Dict[str, Any]) -> str:
+    real_estate = data.get("real_estate") or {}
+    items = "".join(
+        _HOME_ITEM.format(title=title, value=escape(str(real_estate.get(key, default))))
+        for title, key, default in REAL_ESTATE_FIELDS
+    )
+    return _HOME_CARD.format(location=escape(location), items=items)
+
+
+def render_section(section: str, title: str, icon: str, comparison: Sequence[Dict[str, Any]],
+                   locations: Sequence[str], last: bool = False) -> str:
+    """The complete HTML for one section across every location"""
+    if section == "real_estate":
+        cards = "".join(_home_card(location, data) for location, data in zip(locations, comparison))
+        body = _HOME_HEADING + _GRID.format(n=len(locations), cards=cards)
+    else:
+        cards = "".join(_section_card(section, location, data) for location, data in zip(locations, comparison))
+        body = _GRID.format(n=len(locations), cards=cards)
+    return _SECTION.format(icon=icon, title=title, body=body, spacer="" if last else "<br>")
+
+
+def render_comparison(comparison: Sequence[Dict[str, Any]], locations: Sequence[str]) -> List[Tuple[str, str]]:
+    """(section key, html) for every section, in display order"""
+    return [
+        (section, render_section(section, title, icon, comparison, locations, last=i == len(SECTIONS) - 1))
+        for i, (section, title, icon) in enumerate(SECTIONS)
+    ]
@@ -0,0 +1,204 @@
+"""
+Process-wide registry of heavy, read-only resources shared by every
+Streamlit session and rerun: the sentence-transformer, the building table,
+its indexes, the embedding matrix, the offline geocoder and the Census
+snapshot.
+"""
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import telemetry
+from answer_cache import AnswerCache
+from building_index import CityStateIndex
+from census_snapshot import CensusSnapshot
+from embedding_cache import EMBEDDING_MODEL_NAME, load_or_build_embeddings
+from geocode_cache import CachedGeocoder, TokenBucket
+from geocoder import Gazetteer, Geocoder, NominatimGeocoder
+from hybrid_retrieval import HybridRetriever
+from rexus_store import REXUS_CSV_PATH, load_rexus_store, store_source_mtime
+from score_table import ScoreTable
+from vector_index import build_vector_index
+
+logger = logging.getLogger(__name__)
+
+
+class ResourceRegistry:
+    """
+    Lazily builds each named resource once per process and hands the same
+    object to every caller. Invalidating a resource also drops everything
+    registered as depending on it, and notifies invalidation hooks.
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[["ResourceRegistry"], Any]] = {}
+        self._dependencies: Dict[str, List[str]] = {}
+        self._values: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._registry_lock = threading.RLock()
+        self._hooks: List[Callable[[str], None]] = []
+
+    def register(self, name: str, factory: Callable[["ResourceRegistry"], Any], depends_on: Iterable[str] = ()) -> None:
+        with self._registry_lock:
+            self._factories[name] = factory
+            self._dependencies[name] = list(depends_on)
+            self._locks[name] = threading.Lock()
+            self._values.pop(name, None)
+
+    def get(self, name: str) -> Any:
+        if name in self._values:
+            return self._values[name]
+        if name not in self._factories:
+            raise KeyError(f"Unknown resource '{name}'")
+        # Per-resource lock: concurrent sessions wait for one build instead of racing
+        with self._locks[name]:
+            if name not in self._values:
+                with telemetry.span(f"resource.{name}"):
+                    self._values[name] = self._factories[name](self)
+            return self._values[name]
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._values
+
+    def dependents(self, name: str) -> List[str]:
+        """Every resource that transitively depends on ``name``"""
+        found: List[str] = []
+        pending = [name]
+        while pending:
+            current = pending.pop()
+            for other, deps in self._dependencies.items():
+                if current in deps and other not in found:
+                    found.append(other)
+                    pending.append(other)
+        return found
+
+    def invalidate(self, name: Optional[str] = None) -> List[str]:
+        """Drop ``name`` (or everything when None) and its dependents; returns what was dropped"""
+        with self._registry_lock:
+            names = list(self._factories) if name is None else [name] + self.dependents(name)
+            dropped = [n for n in names if self._values.pop(n, None) is not None]
+        for hook in list(self._hooks):
+            for n in dropped:
+                hook(n)
+        return dropped
+
+    def replace(self, values: Dict[str, Any]) -> List[str]:
+        """
+        Swap in already-built values for loaded resources in one step, then
+        invalidate whatever depends on a changed value without having been
+        replaced itself; returns what was invalidated
+        """
+        with self._registry_lock:
+            pending = [name for name, value in values.items() if self._values.get(name) is not value]
+            self._values.update(values)
+            stale: List[str] = []
+            while pending:
+                current = pending.pop()
+                for other, deps in self._dependencies.items():
+                    if current in deps and other not in values and other not in stale:
+                        stale.append(other)
+                        pending.append(other)
+        return [dropped for name in stale for dropped in self.invalidate(name)]
+
+    def on_invalidate(self, hook: Callable[[str], None]) -> None:
+        """Call ``hook(name)`` whenever a loaded resource is invalidated"""
+        self._hooks.append(hook)
+
+
+registry = ResourceRegistry()
+registry.register("emb_model", lambda r: _load_sentence_transformer(EMBEDDING_MODEL_NAME))
+registry.register("rexus_df", lambda r: _load_buildings())
+registry.register("city_state_index", lambda r: CityStateIndex(r.get("rexus_df")), depends_on=["rexus_df"])
+# The model is only needed to (re)encode the corpus on an embedding cache miss
+registry.register(
+    "rexus_embeddings",
+    lambda r: load_or_build_embeddings(r.get("rexus_df"), _LazyModel(r)),
+    depends_on=["rexus_df"],
+)
+registry.register(
+    "rexus_index",
+    lambda r: build_vector_index(r.get("rexus_embeddings"), os.getenv("REXUS_VECTOR_INDEX", "exact")),
+    depends_on=["rexus_embeddings"],
+)
+registry.register(
+    "rexus_retriever",
+    lambda r: HybridRetriever(r.get("rexus_df"), r.get("rexus_index")),
+    depends_on=["rexus_df", "rexus_index"],
+)
+registry.register("gazetteer", lambda r: _build_gazetteer(r.get("rexus_df")), depends_on=["rexus_df"])
+# Shared by every session so the cache, rate limit and coalescing are process-wide
+registry.register("upstream_geocoder", lambda r: CachedGeocoder(NominatimGeocoder(rate_limiter=TokenBucket())))
+registry.register(
+    "geocoder",
+    lambda r: Geocoder(r.get("gazetteer"), fallback=r.get("upstream_geocoder")),
+    depends_on=["gazetteer", "upstream_geocoder"],
+)
+registry.register(
+    "score_table",
+    lambda r: ScoreTable.load_or_build(r.get("rexus_df"), r.get("gazetteer")),
+    depends_on=["rexus_df", "gazetteer"],
+)
+# Shared so one user's answer can serve another's identical or paraphrased question
+registry.register("answer_cache", lambda r: AnswerCache())
+# None until `python census_snapshot.py` has been run
+registry.register("census_snapshot", lambda r: CensusSnapshot.load())
+
+# CSV mtime (ns) the loaded building table was ingested from; None while it is
+# not loaded, or was registered from somewhere else (e.g. a benchmark fixture)
+_source_mtime = {"value": None}
+_refresh_lock = threading.Lock()
+registry.on_invalidate(lambda name: _source_mtime.update(value=None) if name == "rexus_df" else None)
+
+
+def refresh_if_stale(csv_path: str = REXUS_CSV_PATH) -> bool:
+    """
+    Bring the building table and everything derived from it up to date if the
+    CSV changed since it was loaded, applying only the changed rows to loaded
+    indexes and caches (see :mod:`rexus_delta`) and falling back to a full
+    invalidation. Cheap enough (one stat) to call on every request.
+    """
+    loaded = _source_mtime["value"]
+    if loaded is None or not os.path.exists(csv_path) or os.stat(csv_path).st_mtime_ns == loaded:
+        return False
+    with _refresh_lock:
+        # Another thread may have applied the change while this one waited
+        if _source_mtime["value"] is None or os.stat(csv_path).st_mtime_ns == _source_mtime["value"]:
+            return False
+        from rexus_delta import refresh_registry
+
+        try:
+            refresh_registry(registry, _LazyModel(registry), csv_path)
+            _source_mtime["value"] = store_source_mtime()
+        except Exception:
+            logger.exception("Incremental refresh failed; rebuilding from %s", csv_path)
+            registry.invalidate("rexus_df")
+        return True
+
+
+def _load_buildings():
+    df = load_rexus_store()
+    # The stamp of the store that was read, so an edit made after this load is still seen
+    _source_mtime["value"] = store_source_mtime()
+    return df
+
+
+def _build_gazetteer(buildings):
+    gazetteer = Gazetteer.from_file()
+    gazetteer.extend_from_buildings(buildings)
+    return gazetteer
+
+
+def _load_sentence_transformer(model_name: str):
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name)
+
+
+class _LazyModel:
+    """Defers loading the shared model until something actually encodes"""
+
+    def __init__(self, registry: ResourceRegistry):
+        self._registry = registry
+
+    def encode(self, *args, **kwargs):
+        return self._registry.get("emb_model").encode(*args, **kwargs)
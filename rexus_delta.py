@@ -0,0 +1,224 @@
+"""
+Incremental ingestion of refreshed REXUS inventory exports.
+
+A new snapshot, in either export layout (see
+:func:`rexus_store.conform_rexus_export`), is diffed against the current
+store by Location Code. Only the inserted, updated and deleted buildings are
+then applied to what is derived from the table: unchanged rows keep their
+embeddings, quantized codes, IVF cells and BM25 postings, and only places
+whose buildings changed are rescored. Parsing the CSV and the vectorized
+lookup indexes remain a pass over the table; the model, tokenizer and
+scoring work scales with the size of the change.
+
+    python rexus_delta.py new_export.csv [--dry-run]
+
+copies the snapshot over ``data_gov_bldg_rexus.csv`` in the canonical
+layout and brings the store, the embedding cache and the score table up to
+date. A running app or API server picks the change up on its next request
+through :func:`resources.refresh_if_stale`, which calls
+:func:`refresh_registry`.
+"""
+import argparse
+import logging
+import os
+import time
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+import telemetry
+from building_index import CityStateIndex
+from embedding_cache import embedding_cache_path, rexus_corpus_text, update_embeddings
+from rexus_store import (
+    KEY_COLUMN, REXUS_COLUMNS, REXUS_CSV_PATH, REXUS_STORE_PATH, conform_rexus_export, drop_duplicate_codes,
+    load_rexus_store, normalize_rexus_frame, write_rexus_store,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class RexusDelta:
+    """
+    How the rows of a new building table relate to the current one. For each
+    new row, ``matches`` is the current row with the same Location Code and
+    ``source`` the same row only if every column is unchanged (else -1).
+    """
+
+    def __init__(self, old: pd.DataFrame, new: pd.DataFrame, matches: np.ndarray, source: np.ndarray):
+        self.old = old
+        self.new = new
+        self.matches = matches
+        self.source = source
+
+    @property
+    def inserted(self) -> pd.Series:
+        return self.new[KEY_COLUMN][self.matches < 0]
+
+    @property
+    def updated(self) -> pd.Series:
+        return self.new[KEY_COLUMN][(self.matches >= 0) & (self.source < 0)]
+
+    @property
+    def deleted(self) -> pd.Series:
+        kept = np.zeros(len(self.old), dtype=bool)
+        kept[self.matches[self.matches >= 0]] = True
+        return self.old[KEY_COLUMN][~kept]
+
+    @property
+    def changed(self) -> np.ndarray:
+        """Mask of new rows that were inserted or updated"""
+        return self.source < 0
+
+    @property
+    def unchanged(self) -> bool:
+        """True when the new table is row for row the current one"""
+        return len(self.new) == len(self.old) and bool((self.source == np.arange(len(self.source))).all())
+
+    def text_source(self) -> np.ndarray:
+        """``source`` for the embedded corpus text: updates that keep the address reuse their row"""
+        matched = np.flatnonzero(self.matches >= 0)
+        old_text = rexus_corpus_text(self.old).to_numpy()[self.matches[matched]]
+        same = old_text == rexus_corpus_text(self.new.iloc[matched]).to_numpy()
+        source = np.full(len(self.new), -1, dtype=np.int64)
+        source[matched[same]] = self.matches[matched[same]]
+        return source
+
+    def summary(self) -> Dict[str, int]:
+        return {
+            "rows": len(self.new),
+            "inserted": len(self.inserted),
+            "updated": len(self.updated),
+            "deleted": len(self.deleted),
+            "unchanged": int((self.source >= 0).sum()),
+        }
+
+
+def diff_snapshots(old: pd.DataFrame, new: pd.DataFrame) -> RexusDelta:
+    """
+    Match two typed building tables by Location Code and compare the matched
+    rows. Both must hold one row per code (see
+    :func:`rexus_store.drop_duplicate_codes`): the positions in the result
+    index the rows of ``old`` and of everything built from it.
+    """
+    for name, df in (("current", old), ("new", new)):
+        if df[KEY_COLUMN].duplicated().any():
+            raise ValueError(f"The {name} building table has duplicate {KEY_COLUMN} values")
+    matches = pd.Index(old[KEY_COLUMN]).get_indexer(new[KEY_COLUMN]).astype(np.int64)
+    # Row fingerprints over the values (not the category sets) of every column
+    old_hash = pd.util.hash_pandas_object(old[REXUS_COLUMNS], index=False).to_numpy()
+    new_hash = pd.util.hash_pandas_object(new[REXUS_COLUMNS], index=False).to_numpy()
+    same = (matches >= 0) & (old_hash[np.maximum(matches, 0)] == new_hash) if len(old) else np.zeros(len(new), bool)
+    return RexusDelta(old, new, matches, np.where(same, matches, -1))
+
+
+def _updated_embeddings(previous: np.ndarray, delta: RexusDelta, source: np.ndarray, csv_path: str,
+                        emb_model=None) -> np.ndarray:
+    path = embedding_cache_path(csv_path)
+    if os.path.exists(path):
+        embeddings = np.load(path, mmap_mode="r")
+        if embeddings.shape[0] == len(delta.new):
+            return embeddings
+    return update_embeddings(previous, source, rexus_corpus_text(delta.new).tolist(), path, emb_model)
+
+
+def apply_snapshot(
+    snapshot_path: str,
+    csv_path: str = REXUS_CSV_PATH,
+    store_path: str = REXUS_STORE_PATH,
+    emb_model=None,
+    dry_run: bool = False,
+) -> RexusDelta:
+    """
+    Replace the inventory at ``csv_path`` with a new export and update the
+    store, plus the embedding cache and score table where they already exist
+    """
+    from geocoder import Gazetteer
+    from score_table import ScoreTable, score_table_path
+
+    old = load_rexus_store(csv_path, store_path)
+    # Two-digit years keep the century of the stored date for the same building
+    raw = conform_rexus_export(pd.read_csv(snapshot_path, dtype=str, keep_default_na=False), previous=old)
+    raw = drop_duplicate_codes(raw)
+    with telemetry.span("store.parse_csv"):
+        new = normalize_rexus_frame(raw)
+    delta = diff_snapshots(old, new)
+    if dry_run or delta.unchanged:
+        return delta
+
+    # Caches are keyed by the CSV content, so find the current ones before replacing it
+    embeddings_path = embedding_cache_path(csv_path)
+    scores_path = score_table_path(csv_path)
+    raw.to_csv(csv_path + ".tmp", index=False)
+    os.replace(csv_path + ".tmp", csv_path)
+    write_rexus_store(delta.new, csv_path, store_path)
+
+    if os.path.exists(embeddings_path):
+        _updated_embeddings(np.load(embeddings_path, mmap_mode="r"), delta, delta.text_source(), csv_path, emb_model)
+    if os.path.exists(scores_path):
+        import pyarrow.feather as feather
+
+        gazetteer = Gazetteer.from_file()
+        gazetteer.extend_from_buildings(delta.new)
+        ScoreTable(feather.read_table(scores_path).to_pandas()).updated(delta.new, gazetteer, csv_path)
+    return delta
+
+
+def refresh_registry(
+    registry,
+    emb_model=None,
+    csv_path: str = REXUS_CSV_PATH,
+    store_path: str = REXUS_STORE_PATH,
+) -> Optional[RexusDelta]:
+    """
+    Move the loaded building table and its derived resources in ``registry``
+    to the current CSV, applying only the changed rows; resources this does
+    not know how to update are invalidated by :meth:`ResourceRegistry.replace`
+    """
+    if not registry.is_loaded("rexus_df"):
+        return None
+    started = time.perf_counter()
+    with telemetry.span("store.refresh"):
+        delta = diff_snapshots(registry.get("rexus_df"), load_rexus_store(csv_path, store_path))
+        new = delta.new
+        values: Dict[str, Any] = {"rexus_df": new}
+        if registry.is_loaded("city_state_index"):
+            values["city_state_index"] = CityStateIndex(new)
+        if registry.is_loaded("rexus_embeddings"):
+            source = delta.text_source()
+            values["rexus_embeddings"] = _updated_embeddings(
+                registry.get("rexus_embeddings"), delta, source, csv_path, emb_model
+            )
+            if registry.is_loaded("rexus_index"):
+                values["rexus_index"] = registry.get("rexus_index").updated(values["rexus_embeddings"], source)
+                if registry.is_loaded("rexus_retriever"):
+                    values["rexus_retriever"] = registry.get("rexus_retriever").updated(new, values["rexus_index"], delta.source)
+        if registry.is_loaded("gazetteer"):
+            # Add-only: places of deleted buildings keep resolving, as they did before. A
+            # new place is centred on all of its buildings, not just the changed ones
+            gazetteer = registry.get("gazetteer")
+            places = new["Bldg City"].astype(str).str.upper() + "|" + new["Bldg State"].astype(str).str.upper()
+            gazetteer.extend_from_buildings(new[places.isin(places[delta.changed])])
+            values["gazetteer"] = gazetteer
+            if registry.is_loaded("score_table"):
+                values["score_table"] = registry.get("score_table").updated(new, gazetteer, csv_path)
+        dropped = registry.replace(values)
+    logger.info("Applied %s to %s in %.3fs%s", delta.summary(), sorted(values), time.perf_counter() - started,
+                f"; rebuilding {sorted(dropped)}" if dropped else "")
+    return delta
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("snapshot", help="new REXUS export (data.gov or data/rexus_data.csv layout)")
+    parser.add_argument("--csv", default=REXUS_CSV_PATH, help="inventory CSV to replace")
+    parser.add_argument("--dry-run", action="store_true", help="only report what would change")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    started = time.monotonic()
+    result = apply_snapshot(args.snapshot, args.csv, dry_run=args.dry_run)
+    summary = result.summary()
+    print(", ".join(f"{value} {key}" for key, value in summary.items()) + f" ({time.monotonic() - started:.1f}s)")
+    if args.dry_run or result.unchanged:
+        print("Nothing written" if args.dry_run else "Snapshot matches the current inventory")
@@ -0,0 +1,212 @@
+"""Typed, columnar on-disk store for the GSA REXUS building inventory."""
+import logging
+import os
+import re
+import sys
+from datetime import date
+from typing import Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+import telemetry
+
+REXUS_CSV_PATH = "data_gov_bldg_rexus.csv"
+KEY_COLUMN = "Location Code"
+STORE_DIR = os.path.join("data", "cache")
+REXUS_STORE_PATH = os.path.join(STORE_DIR, "rexus.feather")
+
+# Column layout of the data.gov export; other exports are conformed to it
+REXUS_COLUMNS = [
+    "Location Code", "Region Code", "Bldg Address1", "Bldg Address2", "Bldg City", "Bldg County", "Bldg State",
+    "Bldg Zip", "Congressional District", "Bldg Status", "Property Type", "Bldg ANSI Usable",
+    "Total Parking Spaces", "Owned/Leased", "Construction Date", "Historical Type", "Historical Status",
+    "ABA Accessibility Flag",
+]
+NUMERIC_COLUMNS = ["Bldg ANSI Usable", "Total Parking Spaces"]
+DATE_COLUMNS = ["Construction Date"]
+CATEGORICAL_COLUMNS = [
+    "Region Code",
+    "Bldg State",
+    "Congressional District",
+    "Bldg Status",
+    "Property Type",
+    "Owned/Leased",
+    "Historical Type",
+    "Historical Status",
+    "ABA Accessibility Flag",
+]
+DATE_FORMAT = "%d-%b-%Y"
+
+_TWO_DIGIT_YEAR = re.compile(r"^(\d{1,2})-([A-Za-z]{3})-(\d{2})$")
+_SOURCE_MTIME_KEY = b"rexus_source_mtime"
+_SOURCE_SIZE_KEY = b"rexus_source_size"
+# Bumped when stores written by older code must be re-ingested (2: one row per Location Code)
+_STORE_FORMAT_KEY = b"rexus_store_format"
+_STORE_FORMAT = b"2"
+
+logger = logging.getLogger(__name__)
+
+
+def conform_rexus_export(
+    raw: pd.DataFrame,
+    reference_year: Optional[int] = None,
+    previous: Optional[pd.DataFrame] = None,
+) -> pd.DataFrame:
+    """
+    Bring a string-typed REXUS export into the data.gov layout. Some exports
+    (e.g. ``data/rexus_data.csv``) drop Address2 and Congressional District,
+    strip leading zeros from ZIPs ("61031125") and write two-digit years
+    ("1-Jan-33"). A two-digit year keeps the century of the building's date
+    in ``previous`` (a typed table) when day, month and year digits agree,
+    so "1-Jan-19" stays 1919; any other is placed in the latest century that
+    does not put it after ``reference_year`` (default: this year).
+    """
+    df = raw.rename(columns=lambda c: c.strip())
+    for column in REXUS_COLUMNS:
+        if column not in df.columns:
+            df[column] = ""
+
+    zips = df["Bldg Zip"].astype(str).str.strip()
+    digits = zips.str.fullmatch(r"\d+")
+    df["Bldg Zip"] = zips.where(~digits, zips.str.zfill(5).where(zips.str.len() <= 5, zips.str.zfill(9)))
+
+    dates = df["Construction Date"].astype(str).str.strip()
+    parts = dates.str.extract(_TWO_DIGIT_YEAR)
+    short = parts[0].notna()
+    if short.any():
+        reference_year = reference_year or date.today().year
+        years = parts.loc[short, 2].astype(int)
+        years = years + reference_year // 100 * 100 - 100 * (years > reference_year % 100)
+        day_month = parts.loc[short, 0].str.zfill(2) + "-" + parts.loc[short, 1].str.title()
+        if previous is not None:
+            stored = previous.drop_duplicates(KEY_COLUMN, keep="last").set_index(KEY_COLUMN)["Construction Date"]
+            stored = pd.DatetimeIndex(stored.reindex(df.loc[short, KEY_COLUMN].astype(str).str.strip()).to_numpy())
+            same = stored.strftime("%d-%b-%y").to_numpy() == (day_month + "-" + parts.loc[short, 2]).to_numpy()
+            years = years.where(~same, stored.year)
+        df.loc[short, "Construction Date"] = day_month + "-" + years.astype(int).astype(str)
+    return df[REXUS_COLUMNS]
+
+
+def normalize_rexus_frame(raw: pd.DataFrame) -> pd.DataFrame:
+    """Convert a string-typed REXUS frame into numeric, date and categorical columns"""
+    df = raw.copy()
+    # The export pads some headers (e.g. "ABA Accessibility Flag ") with spaces
+    df.columns = [c.strip() for c in df.columns]
+
+    for col in df.columns:
+        df[col] = df[col].astype("string").str.strip().replace("", pd.NA)
+
+    for col in NUMERIC_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("Int64")
+    for col in DATE_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], format=DATE_FORMAT, errors="coerce")
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    return df.reset_index(drop=True)
+
+
+def drop_duplicate_codes(df: pd.DataFrame) -> pd.DataFrame:
+    """Keep the last row of each Location Code, so row positions identify buildings"""
+    duplicated = df[KEY_COLUMN].astype(str).str.strip().duplicated(keep="last")
+    if duplicated.any():
+        logger.warning("Dropping %d duplicate %s rows (keeping the last of each)", int(duplicated.sum()), KEY_COLUMN)
+        df = df[~duplicated.to_numpy()].reset_index(drop=True)
+    return df
+
+
+def read_rexus_csv(csv_path: str) -> pd.DataFrame:
+    """Parse any REXUS export into the typed store layout, one row per Location Code"""
+    with telemetry.span("store.parse_csv"):
+        raw = conform_rexus_export(pd.read_csv(csv_path, dtype=str, keep_default_na=False))
+        return normalize_rexus_frame(drop_duplicate_codes(raw))
+
+
+def ingest_rexus_csv(csv_path: str = REXUS_CSV_PATH, store_path: str = REXUS_STORE_PATH) -> pd.DataFrame:
+    """Parse the REXUS CSV once and write it as an uncompressed Arrow/Feather file"""
+    df = read_rexus_csv(csv_path)
+    write_rexus_store(df, csv_path, store_path)
+    return df
+
+
+def write_rexus_store(df: pd.DataFrame, csv_path: str, store_path: str = REXUS_STORE_PATH) -> None:
+    """Write a typed frame as the store for ``csv_path``, stamped with the CSV's size and mtime"""
+    stat = os.stat(csv_path)
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[_SOURCE_MTIME_KEY] = str(stat.st_mtime_ns).encode()
+    metadata[_SOURCE_SIZE_KEY] = str(stat.st_size).encode()
+    metadata[_STORE_FORMAT_KEY] = _STORE_FORMAT
+    table = table.replace_schema_metadata(metadata)
+
+    os.makedirs(os.path.dirname(store_path) or ".", exist_ok=True)
+    tmp_path = store_path + ".tmp"
+    # Uncompressed so readers can memory-map the columns without decoding
+    feather.write_feather(table, tmp_path, compression="uncompressed")
+    os.replace(tmp_path, store_path)
+
+
+def _store_metadata(store_path: str) -> Optional[dict]:
+    try:
+        with pa.memory_map(store_path) as source:
+            return pa.ipc.open_file(source).schema.metadata or {}
+    except (OSError, pa.ArrowInvalid):
+        return None
+
+
+def store_source_mtime(store_path: str = REXUS_STORE_PATH) -> Optional[int]:
+    """The CSV mtime (ns) the store at ``store_path`` was written from, if it is stamped"""
+    metadata = _store_metadata(store_path) if os.path.exists(store_path) else None
+    stamp = (metadata or {}).get(_SOURCE_MTIME_KEY)
+    return int(stamp) if stamp else None
+
+
+def _store_is_fresh(csv_path: str, store_path: str) -> bool:
+    if not os.path.exists(store_path):
+        return False
+    if not os.path.exists(csv_path):
+        return True
+    stat = os.stat(csv_path)
+    metadata = _store_metadata(store_path)
+    if metadata is None:
+        return False
+    return (
+        metadata.get(_STORE_FORMAT_KEY) == _STORE_FORMAT
+        and metadata.get(_SOURCE_MTIME_KEY) == str(stat.st_mtime_ns).encode()
+        and metadata.get(_SOURCE_SIZE_KEY) == str(stat.st_size).encode()
+    )
+
+
+def load_rexus_store(
+    csv_path: str = REXUS_CSV_PATH,
+    store_path: str = REXUS_STORE_PATH,
+    columns: Optional[list] = None,
+) -> pd.DataFrame:
+    """Load the typed building table, ingesting the CSV first if the store is missing or stale"""
+    if not _store_is_fresh(csv_path, store_path):
+        df = ingest_rexus_csv(csv_path, store_path)
+        return df[columns] if columns else df
+    with telemetry.span("store.load"):
+        table = feather.read_table(store_path, columns=columns, memory_map=True)
+        return table.to_pandas()
+
+
+def format_rexus_value(value) -> str:
+    """Render a typed store value the way the original CSV showed it"""
+    if value is None or value is pd.NA or (not isinstance(value, str) and pd.isna(value)):
+        return "N/A"
+    if isinstance(value, pd.Timestamp):
+        return value.strftime(DATE_FORMAT)
+    return str(value)
+
+
+if __name__ == "__main__":
+    source = sys.argv[1] if len(sys.argv) > 1 else REXUS_CSV_PATH
+    target = sys.argv[2] if len(sys.argv) > 2 else REXUS_STORE_PATH
+    frame = ingest_rexus_csv(source, target)
+    print(f"Wrote {len(frame)} buildings to {target}")
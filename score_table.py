@@ -0,0 +1,231 @@
+"""
+Nationwide score table: every scoring model run once over each distinct
+(Bldg City, Bldg State) in the building inventory, stored as a versioned
+Feather file with presorted per-metric orders for leaderboard queries.
+
+    python score_table.py                              # build (or reuse) the table
+    python score_table.py walkability --state OR --top 20
+    python score_table.py safety_score --min 80
+"""
+import argparse
+import logging
+import os
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+import scoring
+from building_index import normalize_city
+from embedding_cache import file_content_hash
+from geocoder import Gazetteer, normalize_state
+from rexus_store import REXUS_CSV_PATH, STORE_DIR
+
+# Bump whenever a scoring model or the place grouping changes so stale tables are rebuilt
+SCORE_MODEL_VERSION = 2
+SCORE_TABLE_DIR = os.path.join(STORE_DIR, "scores")
+
+# Metric -> True when a higher value is better
+METRICS = {
+    "safety_score": True,
+    "violent_crime_rate": False,
+    "property_crime_rate": False,
+    "police_response": False,
+    "walkability": True,
+    "air_quality": True,
+    "parks_nearby": True,
+    "restaurants": True,
+    "commute_time": False,
+    "public_transit": True,
+    "healthcare_access": True,
+    "school_rating": True,
+    "school_rank": False,
+    "buildings": True,
+}
+
+logger = logging.getLogger(__name__)
+
+
+def score_table_path(csv_path: str = REXUS_CSV_PATH, table_dir: str = SCORE_TABLE_DIR) -> str:
+    """Table file for a (scoring model version, source CSV content) pair"""
+    return os.path.join(table_dir, f"scores-v{SCORE_MODEL_VERSION}-{file_content_hash(csv_path)[:16]}.feather")
+
+
+def _places(buildings: pd.DataFrame) -> pd.DataFrame:
+    """Distinct (key, state) places with their display city and building count"""
+    keys = pd.DataFrame({
+        "key": buildings["Bldg City"].map(normalize_city),
+        "state": buildings["Bldg State"].astype(str).map(normalize_state),
+        "city": buildings["Bldg City"].astype(str).str.strip().str.title(),
+    })
+    return (
+        keys.groupby(["key", "state"], sort=True)
+        .agg(city=("city", "first"), buildings=("city", "size"))
+        .reset_index()
+    )
+
+
+def _score_places(places: pd.DataFrame, gazetteer: Gazetteer) -> pd.DataFrame:
+    cities = places["city"].tolist()
+
+    # Offline gazetteer only: a nationwide batch must not queue thousands of Nominatim calls
+    coords = [gazetteer.lookup(f"{city}, {state}") for city, state in zip(cities, places["state"])]
+    lat = np.array([c.lat if c else np.nan for c in coords])
+    lon = np.array([c.lon if c else np.nan for c in coords])
+
+    safety = scoring.safety_scores(cities)
+    quality = scoring.quality_scores(lat, lon)
+    education = scoring.education_scores(cities)
+    table = places.assign(
+        lat=lat,
+        lon=lon,
+        safety_score=safety["crime_index"],
+        violent_crime_rate=safety["violent_crime_rate"],
+        property_crime_rate=safety["property_crime_rate"],
+        police_response=safety["police_response"],
+        **{name: quality[name] for name in quality},
+        school_rating=education["school_rating"],
+        school_rank=education["school_rank"],
+    )
+    table["buildings"] = table["buildings"].astype("float64")
+    return table
+
+
+def build_score_table(buildings: pd.DataFrame, gazetteer: Gazetteer) -> pd.DataFrame:
+    """One row per distinct city/state with every model's raw metrics"""
+    return _score_places(_places(buildings), gazetteer).drop(columns="key")
+
+
+def update_score_table(previous: pd.DataFrame, buildings: pd.DataFrame, gazetteer: Gazetteer) -> pd.DataFrame:
+    """
+    :func:`build_score_table` for a changed inventory, reusing ``previous``
+    rows: only places that are new, now display a different city spelling,
+    or were unlocated are scored again. Building counts are recounted.
+    """
+    places = _places(buildings)
+    reused = previous.dropna(subset=["lat", "lon"]).drop(columns="buildings")
+    reused = reused.assign(key=reused["city"].map(normalize_city)).drop_duplicates(["key", "state"])
+    merged = places.merge(reused, on=["key", "state", "city"], how="left", indicator=True)
+    stale = (merged.pop("_merge") == "left_only").to_numpy()
+    if stale.any():
+        scored = _score_places(places[stale].reset_index(drop=True), gazetteer)
+        for column in scored.columns:
+            merged.loc[stale, column] = scored[column].to_numpy()
+    merged["buildings"] = merged["buildings"].astype("float64")
+    logger.info("Rescored %d of %d places", int(stale.sum()), len(merged))
+    return merged[previous.columns]
+
+
+def _write_table(table: pd.DataFrame, path: str) -> None:
+    arrow = pa.Table.from_pandas(table, preserve_index=False)
+    arrow = arrow.replace_schema_metadata({
+        **(arrow.schema.metadata or {}),
+        b"score_model_version": str(SCORE_MODEL_VERSION).encode(),
+    })
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    feather.write_feather(arrow, path + ".tmp", compression="uncompressed")
+    os.replace(path + ".tmp", path)
+    for name in os.listdir(os.path.dirname(path)):
+        stale = os.path.join(os.path.dirname(path), name)
+        if name.startswith("scores-") and name.endswith(".feather") and stale != path:
+            os.remove(stale)
+
+
+class ScoreTable:
+    """
+    The materialized table plus, for every metric, row orders sorted
+    best-first nationwide and within each state, so leaderboard and
+    threshold queries are a slice or a binary search rather than a re-score.
+    """
+
+    def __init__(self, table: pd.DataFrame):
+        self.table = table.reset_index(drop=True)
+        # Sort keys ascend best-first: higher-is-better metrics are negated
+        self.keys: Dict[str, np.ndarray] = {
+            m: self.table[m].to_numpy(dtype=np.float64) * (-1 if higher else 1) for m, higher in METRICS.items()
+        }
+        states = self.table["state"].to_numpy()
+        self._state_rows = {state: np.flatnonzero(states == state) for state in np.unique(states)}
+        self._orders: Dict[Tuple[str, Optional[str]], np.ndarray] = {}
+        for metric, keys in self.keys.items():
+            self._orders[(metric, None)] = self._sorted_rows(keys, np.arange(len(keys)))
+            for state, rows in self._state_rows.items():
+                self._orders[(metric, state)] = self._sorted_rows(keys, rows)
+
+    @staticmethod
+    def _sorted_rows(keys: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """``rows`` best-first (ties keep table order), unscored (NaN) rows dropped"""
+        rows = rows[~np.isnan(keys[rows])]
+        return rows[np.argsort(keys[rows], kind="stable")]
+
+    @classmethod
+    def load_or_build(cls, buildings: pd.DataFrame, gazetteer: Gazetteer, csv_path: str = REXUS_CSV_PATH,
+                      table_dir: str = SCORE_TABLE_DIR) -> "ScoreTable":
+        path = score_table_path(csv_path, table_dir)
+        if os.path.exists(path):
+            return cls(feather.read_table(path, memory_map=True).to_pandas())
+        logger.info("Building nationwide score table at %s", path)
+        table = build_score_table(buildings, gazetteer)
+        _write_table(table, path)
+        return cls(table)
+
+    def updated(self, buildings: pd.DataFrame, gazetteer: Gazetteer, csv_path: str = REXUS_CSV_PATH,
+                table_dir: str = SCORE_TABLE_DIR) -> "ScoreTable":
+        """The table for a changed inventory (see :func:`update_score_table`), saved under its new version"""
+        path = score_table_path(csv_path, table_dir)
+        if os.path.exists(path):
+            return type(self)(feather.read_table(path, memory_map=True).to_pandas())
+        table = update_score_table(self.table, buildings, gazetteer)
+        _write_table(table, path)
+        return type(self)(table)
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    def _order(self, metric: str, state: Optional[str]) -> np.ndarray:
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric '{metric}'; expected one of {sorted(METRICS)}")
+        key = (metric, normalize_state(state) if state else None)
+        return self._orders.get(key, np.empty(0, dtype=np.int64))
+
+    def top(self, metric: str, n: int = 20, state: Optional[str] = None, best_first: bool = True) -> pd.DataFrame:
+        """The ``n`` best (or worst) places by ``metric``, optionally within one state"""
+        order = self._order(metric, state)
+        return self.table.iloc[order[:n] if best_first else order[::-1][:n]]
+
+    def where(self, metric: str, min_value: Optional[float] = None, max_value: Optional[float] = None,
+              state: Optional[str] = None, limit: Optional[int] = None) -> pd.DataFrame:
+        """Places with ``min_value < metric <= max_value`` (either bound optional), best first"""
+        order = self._order(metric, state)
+        keys = self.keys[metric][order]
+        if METRICS[metric]:
+            lo = 0 if max_value is None else np.searchsorted(keys, -max_value, side="left")
+            hi = len(order) if min_value is None else np.searchsorted(keys, -min_value, side="left")
+        else:
+            lo = 0 if min_value is None else np.searchsorted(keys, min_value, side="right")
+            hi = len(order) if max_value is None else np.searchsorted(keys, max_value, side="right")
+        rows = order[lo:hi]
+        return self.table.iloc[rows[:limit] if limit else rows]
+
+
+if __name__ == "__main__":
+    from resources import registry
+
+    parser = argparse.ArgumentParser(description="Build and query the nationwide score table")
+    parser.add_argument("metric", nargs="?", choices=sorted(METRICS))
+    parser.add_argument("--state")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--min", type=float, dest="min_value")
+    parser.add_argument("--max", type=float, dest="max_value")
+    args = parser.parse_args()
+
+    scores = registry.get("score_table")
+    print(f"{len(scores)} places scored (model v{SCORE_MODEL_VERSION})")
+    if args.metric:
+        if args.min_value is not None or args.max_value is not None:
+            result = scores.where(args.metric, args.min_value, args.max_value, args.state, args.top)
+        else:
+            result = scores.top(args.metric, args.top, args.state)
+        print(result[["city", "state", args.metric]].to_string(index=False))
@@ -0,0 +1,83 @@
+"""
+Vectorized scoring models for the safety, quality of life and education
+sections. Each takes arrays for a whole batch of places and returns arrays
+of raw metrics, so scoring fifty cities costs about the same as scoring two.
+"""
+from typing import Dict, Sequence
+
+import numpy as np
+
+SAFETY_BASE_SCORE = 75
+SAFETY_ADJUSTMENTS = {
+    "new york": 5, "san francisco": -5, "seattle": 3, "portland": -2,
+    "los angeles": -3, "chicago": -8, "boston": 7, "austin": 4
+}
+EDUCATION_RATINGS = {
+    "seattle": (8.5, 12),
+    "portland": (7.8, 24),
+    "san francisco": (8.9, 8),
+    "new york": (8.7, 10),
+    "chicago": (7.5, 35),
+    "boston": (9.1, 5),
+    "austin": (8.2, 18),
+    "denver": (7.9, 22),
+}
+DEFAULT_EDUCATION_RATING = (7.0, 50)
+
+
+def _lookup(table: Dict[str, object], cities: Sequence[str], default) -> list:
+    return [table.get(str(city).lower(), default) for city in cities]
+
+
+def _int(values: np.ndarray) -> np.ndarray:
+    """Truncate toward zero like int(), keeping NaN for unscored rows"""
+    return np.trunc(values)
+
+
+def safety_scores(cities: Sequence[str]) -> Dict[str, np.ndarray]:
+    """Crime index and derived rates for each city"""
+    score = SAFETY_BASE_SCORE + np.array(_lookup(SAFETY_ADJUSTMENTS, cities, 0), dtype=np.float64)
+    risk = 100 - score
+    return {
+        "crime_index": score,
+        "violent_crime_rate": risk / 20,
+        "property_crime_rate": risk / 4,
+        "police_response": _int(5 + risk / 10),
+        "crime_trend": (score - 70) / 2,
+        "neighborhood_watch": _int(score / 3),
+    }
+
+
+def quality_scores(lat: Sequence[float], lon: Sequence[float]) -> Dict[str, np.ndarray]:
+    """Location-derived quality of life estimates; NaN coordinates give NaN scores"""
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    distance_from_coast = np.abs(lon + 100) / 20  # Coastal proximity factor
+    urban_density = np.abs(40 - lat) / 10  # Urban density approximation
+    elevation_factor = np.clip(np.abs(lat - 40), 0, 10)  # Climate/elevation influence
+
+    base_score = np.clip(75 - distance_from_coast + urban_density - elevation_factor, 50, 95)
+    return {
+        "walkability": np.minimum(100, _int(base_score * (1 + urban_density / 20))),
+        "air_quality": np.minimum(100, _int(base_score + (distance_from_coast - urban_density))),
+        "parks_nearby": _int(base_score / 8 + elevation_factor),
+        "restaurants": _int(base_score * (2 + urban_density / 10)),
+        "commute_time": _int(35 - base_score / 4 + urban_density),
+        "public_transit": np.minimum(100, _int(base_score * (0.8 + urban_density / 15))),
+        "healthcare_access": np.minimum(100, _int(base_score * (0.9 + urban_density / 20))),
+    }
+
+
+def aqi_to_score(aqi: Sequence[float]) -> np.ndarray:
+    """Map measured US AQI (0 best) onto the 0-100 air quality score (100 best)"""
+    return np.minimum(100, _int(np.maximum(0, 100 - np.asarray(aqi, dtype=np.float64) / 3)))
+
+
+def education_scores(cities: Sequence[str]) -> Dict[str, np.ndarray]:
+    """District rating, state rank and school count for each city"""
+    ratings = np.array(_lookup(EDUCATION_RATINGS, cities, DEFAULT_EDUCATION_RATING), dtype=np.float64).reshape(-1, 2)
+    return {
+        "school_rating": ratings[:, 0],
+        "school_rank": ratings[:, 1],
+        "total_schools": _int(30 + ratings[:, 0] * 5),
+    }
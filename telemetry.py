@@ -0,0 +1,291 @@
+"""
+Latency spans and counters for the location and assistant pipelines.
+
+A :func:`trace` collects every :func:`span` opened while it is active,
+including spans in worker threads started through :func:`bind`, so one
+comparison or question yields a waterfall of its stages. Independently of
+traces, every span feeds a per-stage latency histogram and :func:`count`
+feeds labelled counters (cache hits, retries, upstream errors).
+
+Metrics are exported as Prometheus text (``GET /metrics`` on the API server,
+or a standalone endpoint on 127.0.0.1 when ``METRICS_PORT`` is set for the
+app; ``METRICS_HOST`` widens the bind address) or as JSON; with
+``TELEMETRY_JSON_LOGS=1`` each finished trace is also logged as one JSON line.
+"""
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the latency histogram buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+RECENT_TRACES = 20
+
+_Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, Any]) -> _Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels: _Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + "}"
+
+
+class Metrics:
+    """Thread-safe labelled counters and latency histograms"""
+
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS):
+        self.buckets = buckets
+        self._counters: Dict[str, Dict[_Labels, float]] = {}
+        self._histograms: Dict[str, Dict[_Labels, List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def count(self, name: str, value: float = 1, **labels: Any) -> None:
+        key = _labels(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels: Any) -> None:
+        key = _labels(labels)
+        with self._lock:
+            # Per-bucket counts, then sum and count
+            series = self._histograms.setdefault(name, {})
+            values = series.setdefault(key, [0.0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    values[i] += 1
+                    break
+            values[-2] += seconds
+            values[-1] += 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def prometheus(self) -> str:
+        """Every series in the Prometheus text exposition format"""
+        lines: List[str] = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                lines.append(f"# TYPE {name} counter")
+                lines.extend(f"{name}{_format_labels(labels)} {value:g}" for labels, value in sorted(series.items()))
+            for name, series in sorted(self._histograms.items()):
+                lines.append(f"# TYPE {name} histogram")
+                for labels, values in sorted(series.items()):
+                    cumulative = 0.0
+                    for bound, bucket in zip(self.buckets, values):
+                        cumulative += bucket
+                        lines.append(f"{name}_bucket{_format_labels(labels, ('le', f'{bound:g}'))} {cumulative:g}")
+                    lines.append(f"{name}_bucket{_format_labels(labels, ('le', '+Inf'))} {values[-1]:g}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {values[-2]:.6f}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {values[-1]:g}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Counters, and per-series histogram count/sum/mean, as plain JSON"""
+        with self._lock:
+            counters = {
+                name: [{"labels": dict(labels), "value": value} for labels, value in sorted(series.items())]
+                for name, series in sorted(self._counters.items())
+            }
+            histograms = {
+                name: [
+                    {"labels": dict(labels), "count": values[-1], "sum": round(values[-2], 6),
+                     "mean": round(values[-2] / values[-1], 6) if values[-1] else None}
+                    for labels, values in sorted(series.items())
+                ]
+                for name, series in sorted(self._histograms.items())
+            }
+        return {"counters": counters, "histograms": histograms}
+
+
+metrics = Metrics()
+
+
+class Span(NamedTuple):
+    stage: str
+    start: float  # seconds after the trace started
+    duration: float
+    thread: str
+    error: Optional[str]
+    attrs: Dict[str, Any]
+
+
+class Trace:
+    """The spans of one request; worker threads may still add spans after it finishes"""
+
+    def __init__(self, name: str, **attrs: Any):
+        self.name = name
+        self.attrs = attrs
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def waterfall(self) -> List[Span]:
+        """Spans ordered by start time"""
+        with self._lock:
+            return sorted(self.spans, key=lambda span: (span.start, -span.duration))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace": self.name,
+            "started_at": self.started_at,
+            "duration_ms": None if self.duration is None else round(self.duration * 1000, 3),
+            "attrs": self.attrs,
+            "spans": [
+                {"stage": s.stage, "start_ms": round(s.start * 1000, 3), "duration_ms": round(s.duration * 1000, 3),
+                 "thread": s.thread, "error": s.error, **({"attrs": s.attrs} if s.attrs else {})}
+                for s in self.waterfall()
+            ],
+        }
+
+
+_current: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("telemetry_trace", default=None)
+_recent_lock = threading.Lock()
+_recent: Deque[Trace] = deque(maxlen=RECENT_TRACES)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current.get()
+
+
+@contextmanager
+def trace(name: str, **attrs: Any) -> Iterator[Trace]:
+    """Collect the spans of one request into a new :class:`Trace`"""
+    active = Trace(name, **attrs)
+    token = _current.set(active)
+    try:
+        yield active
+    finally:
+        _current.reset(token)
+        active.duration = time.perf_counter() - active.started
+        metrics.observe("request_duration_seconds", active.duration, pipeline=name)
+        with _recent_lock:
+            _recent.append(active)
+        if os.getenv("TELEMETRY_JSON_LOGS") == "1":
+            logger.info(json.dumps(active.to_dict(), default=str))
+
+
+@contextmanager
+def span(stage: str, **attrs: Any) -> Iterator[None]:
+    """Time a stage into the ``stage_duration_seconds`` histogram and the current trace"""
+    active = _current.get()
+    started = time.perf_counter()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        duration = time.perf_counter() - started
+        metrics.observe("stage_duration_seconds", duration, stage=stage)
+        if error is not None:
+            metrics.count("stage_errors_total", stage=stage)
+        if active is not None:
+            active.add(Span(stage, started - active.started, duration, threading.current_thread().name, error, attrs))
+
+
+def record_span(stage: str, started: float, duration: float, active: Optional[Trace] = None,
+                error: Optional[str] = None, **attrs: Any) -> None:
+    """Record a stage timed elsewhere, e.g. an OpenAI stream finishing after its request returned"""
+    metrics.observe("stage_duration_seconds", duration, stage=stage)
+    if error is not None:
+        metrics.count("stage_errors_total", stage=stage)
+    if active is not None:
+        active.add(Span(stage, started - active.started, duration, threading.current_thread().name, error, attrs))
+
+
+def bind(fn: Callable, stage: Optional[str] = None) -> Callable:
+    """``fn`` carrying the caller's trace into another thread, optionally inside a span"""
+    context = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        if stage is None:
+            return context.run(fn, *args, **kwargs)
+
+        def timed():
+            with span(stage):
+                return fn(*args, **kwargs)
+
+        return context.run(timed)
+
+    return run
+
+
+def count(name: str, value: float = 1, **labels: Any) -> None:
+    metrics.count(name, value, **labels)
+
+
+def recent_traces() -> List[Dict[str, Any]]:
+    with _recent_lock:
+        return [t.to_dict() for t in _recent]
+
+
+def snapshot() -> Dict[str, Any]:
+    return dict(metrics.snapshot(), recent_traces=recent_traces())
+
+
+def prometheus_text() -> str:
+    return metrics.prometheus()
+
+
+_server_lock = threading.Lock()
+_server: Dict[int, Any] = {}
+
+
+def start_metrics_server(port: int, host: str = "127.0.0.1"):
+    """
+    Serve ``/metrics`` (Prometheus) and ``/metrics.json`` from a daemon thread,
+    once per process. Local-only by default: the JSON includes recent traces,
+    which carry users' locations and questions, so binding a wider ``host``
+    (e.g. "0.0.0.0" for a scraper on another machine) must be asked for.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.rstrip("/") == "/metrics":
+                body, content_type = prometheus_text().encode(), "text/plain; version=0.0.4"
+            elif self.path.rstrip("/") == "/metrics.json":
+                body, content_type = json.dumps(snapshot(), default=str).encode(), "application/json"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    with _server_lock:
+        if port not in _server:
+            server = ThreadingHTTPServer((host, port), MetricsHandler)
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+            logger.info("Serving metrics on http://%s:%d/metrics", host, port)
+            _server[port] = server
+        return _server[port]
@@ -0,0 +1,65 @@
+import time
+
+import numpy as np
+import pytest
+
+import answer_cache
+from answer_cache import AnswerCache, prompt_key, rows_key
+
+
+def _embedding(angle: float) -> np.ndarray:
+    """A 2-d question embedding; cosine similarity between two is cos(angle difference)"""
+    return np.array([np.cos(angle), np.sin(angle)]) * 3  # any scale, the cache normalizes
+
+
+@pytest.fixture
+def cache():
+    return AnswerCache(ttl=100, max_exact=2, max_semantic=2, threshold=0.9)
+
+
+def test_exact_key_covers_prompt_and_parameters():
+    assert prompt_key("prompt", model="a", temperature=0.2) == prompt_key("prompt", temperature=0.2, model="a")
+    assert prompt_key("prompt", model="a") != prompt_key("prompt", model="b")
+    assert rows_key([3, 1]) != rows_key([1, 3])
+
+
+def test_semantic_tier_respects_threshold_and_context(cache):
+    rows = rows_key([1, 2])
+    cache.put(prompt_key("p1"), "answer", rows, "What is in Seattle?", _embedding(0.0))
+
+    # cos(0.3) ~ 0.955 clears the 0.9 threshold; cos(0.6) ~ 0.825 does not
+    assert cache.get(prompt_key("p2"), rows, _embedding(0.3)) == ("answer", "semantic")
+    assert cache.get(prompt_key("p2"), rows, _embedding(0.6)) == (None, None)
+    # A close question over different buildings is a miss
+    assert cache.get(prompt_key("p2"), rows_key([1, 3]), _embedding(0.0)) == (None, None)
+    assert cache.get(prompt_key("p1")) == ("answer", "exact")
+
+
+def test_semantic_tier_picks_the_closest_question(cache):
+    rows = rows_key([1])
+    cache.put("k1", "far", rows, "q1", _embedding(0.4))
+    cache.put("k2", "near", rows, "q2", _embedding(0.1))
+    assert cache.get("other", rows, _embedding(0.0)) == ("near", "semantic")
+
+
+def test_least_recently_used_entries_are_evicted(cache):
+    cache.put("a", "A")
+    cache.put("b", "B")
+    assert cache.get("a") == ("A", "exact")  # "b" is now least recently used
+    cache.put("c", "C")
+
+    assert cache.get("b") == (None, None)
+    assert cache.get("a") == ("A", "exact") and cache.get("c") == ("C", "exact")
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_expire_after_ttl(cache, monkeypatch):
+    now = time.time()
+    rows = rows_key([1])
+    cache.put("k", "answer", rows, "question", _embedding(0.0))
+
+    monkeypatch.setattr(answer_cache.time, "time", lambda: now + 101)
+    assert cache.get("k") == (None, None)
+    assert cache.get("other", rows, _embedding(0.0)) == (None, None)
+    stats = cache.stats()
+    assert stats["expirations"] == 2 and stats["exact_entries"] == 0 and stats["semantic_entries"] == 0
@@ -0,0 +1,47 @@
+import http.client
+import json
+import threading
+
+import pytest
+
+from api_server import make_server
+
+
+@pytest.fixture()
+def server():
+    server = make_server("127.0.0.1", 0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _request(conn, method, path, payload=None):
+    body = None if payload is None else json.dumps(payload)
+    conn.request(method, path, body=body, headers={"Content-Type": "application/json"} if body else {})
+    response = conn.getresponse()
+    return response.status, json.loads(response.read() or b"null")
+
+
+def test_unread_body_does_not_leak_into_the_next_request(server):
+    conn = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=5)
+    assert _request(conn, "POST", "/nope", {"a": 1})[0] == 404
+    # Same keep-alive connection: the POST body must not be parsed as the next request line
+    status, payload = _request(conn, "GET", "/health")
+    assert status == 200 and payload["status"] == "ok"
+    conn.close()
+
+
+@pytest.mark.parametrize("filters, field", [
+    ({"locations": ["Seattle, WA"]}, "filters.locations"),
+    ({"states": "WA"}, "filters.states"),
+    ({"statuses": [1]}, "filters.statuses"),
+    ({"zip": ["98104"]}, "zip"),
+    (["WA"], "filters"),
+])
+def test_invalid_filters_are_rejected(server, filters, field):
+    conn = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=5)
+    status, payload = _request(conn, "POST", "/retrieve", {"queries": ["parking"], "filters": filters})
+    assert status == 400
+    assert field in payload["error"]
+    conn.close()
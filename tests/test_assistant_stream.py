@@ -0,0 +1,111 @@
+import os
+import socket
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import assistant
+from assistant import start_answer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+from fake_completion_server import ANSWER, make_handler  # noqa: E402
+
+PARAMS = {"model": "fake", "max_tokens": 350}
+
+
+def _serve(handler):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@pytest.fixture()
+def completions(monkeypatch):
+    """Point the assistant's OpenAI client at a fake server built from a handler class"""
+    servers = []
+
+    def start(handler):
+        server = _serve(handler)
+        servers.append(server)
+        monkeypatch.setenv("OPENAI_BASE_URL", f"http://127.0.0.1:{server.server_address[1]}/v1")
+        monkeypatch.setenv("OPENAI_API_KEY", "fake")
+        monkeypatch.setattr(assistant, "_client", {})
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_chunks_arrive_incrementally(completions):
+    completions(make_handler(ANSWER, delay=0.02, first_token_delay=0.0))
+    completed = []
+    answer = start_answer("q", "prompt", PARAMS, on_complete=completed.append)
+
+    partial = set()
+    while not answer.done:
+        text = answer.text
+        if 0 < len(text) < len(ANSWER):
+            partial.add(text)
+        time.sleep(0.005)
+
+    assert answer.error is None
+    assert answer.text == ANSWER
+    # Readers saw several growing prefixes before the stream finished
+    assert len(partial) > 2 and all(ANSWER.startswith(text) for text in partial)
+    assert answer.ttft is not None and answer.ttft < answer.latency
+    assert completed == [answer]
+
+
+def test_cancel_mid_stream_stops_reading(completions):
+    completions(make_handler(ANSWER, delay=0.1, first_token_delay=0.0))
+    completed = []
+    answer = start_answer("q", "prompt", PARAMS, on_complete=completed.append)
+    while not answer.chunks:
+        time.sleep(0.005)
+
+    answer.cancel()
+
+    assert answer.wait(timeout=2)
+    assert answer.cancelled and answer.error is None
+    assert 0 < len(answer.text) < len(ANSWER)
+    assert completed == []
+
+
+class _TruncatingHandler(make_handler(ANSWER, delay=0.0, first_token_delay=0.0)):
+    def _chunk(self, payload):
+        if payload["choices"][0]["delta"].get("content", "").strip() == "data":
+            # Drop the connection partway through the event stream
+            self.connection.shutdown(socket.SHUT_RDWR)
+            raise ConnectionResetError
+        super()._chunk(payload)
+
+
+class _RejectingHandler(make_handler(ANSWER, delay=0.0, first_token_delay=0.0)):
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = b'{"error": {"message": "bad request", "type": "invalid_request_error"}}'
+        self.send_response(400)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.mark.parametrize("handler", [_RejectingHandler, _TruncatingHandler])
+def test_errors_finish_the_stream_and_free_the_worker(completions, handler):
+    completions(handler)
+    completed = []
+    answers = [start_answer("q", "prompt", PARAMS, on_complete=completed.append) for _ in range(assistant._pool._max_workers + 1)]
+
+    for answer in answers:
+        assert answer.wait(timeout=10)
+        assert answer.error and answer.error.startswith("Error with OpenAI API")
+    assert completed == []
+    # Every worker thread was released: the pool still runs new work promptly
+    assert assistant._pool.submit(lambda: "free").result(timeout=2) == "free"
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from building_index import CityStateIndex, city_state_key
+from hybrid_retrieval import HybridRetriever
+from vector_index import ExactIndex
+
+
+@pytest.fixture(scope="module")
+def index():
+    df = pd.DataFrame({
+        "Bldg City": ["ST. PAUL", "ST PAUL", "SEATTLE", "FT  WORTH"],
+        "Bldg State": ["MN", "MN", "WA", "TX"],
+    })
+    return CityStateIndex(df)
+
+
+@pytest.mark.parametrize("city, state, expected", [
+    ("St. Paul", "MN", [0, 1]),
+    ("Saint Paul", "mn", [0, 1]),
+    ("ST PAUL", "Minnesota", [0, 1]),
+    ("Seattle", "Washington", [2]),
+    ("Fort Worth", "TX", [3]),
+    ("Portland", "OR", []),
+])
+def test_lookup_matches_geocoder_spellings(index, city, state, expected):
+    assert index.positions(city, state).tolist() == expected
+
+
+def test_key_matches_index_keys(index):
+    assert city_state_key("saint paul", "Minnesota") == index.keys[0] == index.keys[1]
+
+
+def test_retriever_filters_on_the_index_keys(index):
+    df = index.df.assign(**{column: "" for column in ["Bldg Address1", "Bldg County", "Bldg Zip", "Bldg Status"]})
+    retriever = HybridRetriever(df, ExactIndex(np.eye(len(df), dtype=np.float32)))
+
+    assert retriever._city_state.tolist() == index.keys.tolist()
+    assert np.flatnonzero(retriever.filter_mask(locations=[("Saint Paul", "Minnesota")])).tolist() == [0, 1]
+    updated = retriever.updated(df, retriever.vector_index, np.array([-1, 1, 2, -1]))
+    assert updated._city_state.tolist() == index.keys.tolist()
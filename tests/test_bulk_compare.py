@@ -0,0 +1,82 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+import bulk_compare
+from bulk_compare import _load_checkpoint, _Resolved, resolve_gazetteer_misses
+from geocoder import GeocodeResult
+
+
+def test_only_gazetteer_misses_reach_nominatim(monkeypatch):
+    from resources import registry
+
+    calls = []
+
+    class Upstream:
+        def lookup(self, location):
+            calls.append(location)
+            return GeocodeResult(1.0, 2.0, "Nowhere", "ZZ", "nominatim")
+
+    real_get = registry.get
+    monkeypatch.setattr(registry, "get", lambda name: Upstream() if name == "upstream_geocoder" else real_get(name))
+
+    resolved = resolve_gazetteer_misses(["Seattle, WA", "Nowhereville Flats, ZZ"])
+
+    assert calls == ["Nowhereville Flats, ZZ"]
+    # Workers answer from the parent's results under any spelling with the same cache key
+    assert _Resolved(resolved).lookup(" nowhereville flats, zz ").lat == 1.0
+    assert _Resolved(resolved).lookup("Seattle, WA") is None
+
+
+def test_records_with_failed_sources_are_retried(tmp_path):
+    path = tmp_path / "out.csv.checkpoint.jsonl"
+    entries = [
+        {"key": "seattle|wa", "location": "Seattle, WA", "record": {"lat": 47.6, "failed_sources": None}},
+        {"key": "boston|ma", "location": "Boston, MA", "record": {"lat": 42.4, "failed_sources": "safety: timed out"}},
+    ]
+    path.write_text("".join(json.dumps(entry) + "\n" for entry in entries) + '{"key": "torn')
+
+    assert list(_load_checkpoint(str(path))) == ["seattle|wa"]
+
+
+
+class _FakeOrchestrator:
+    def fetch(self, locations, rank_by):
+        results = []
+        for location in locations:
+            city = location.split(",")[0].strip()
+            if city == "Nowhere":
+                # A different field set, as for a city without buildings
+                results.append({"coordinates": None, "failed_sources": {"geocode": "not found"},
+                                "real_estate": {"first_address": "No building found in database."}})
+            else:
+                results.append({"coordinates": {"lat": float(len(city)), "lon": -1.0, "source": "gazetteer"},
+                                "failed_sources": {}, "real_estate": {"matching_buildings": "1", "city": city}})
+        return results
+
+
+@pytest.mark.parametrize("suffix", ["csv", "parquet"])
+def test_rows_are_streamed_in_input_order(tmp_path, monkeypatch, suffix):
+    import location_data
+
+    # Forked workers inherit the patched orchestrator and registry
+    monkeypatch.setattr(location_data, "get_orchestrator", lambda: _FakeOrchestrator())
+    monkeypatch.setattr(bulk_compare, "_init_worker", lambda resolved: None)
+    input_path = tmp_path / "pairs.csv"
+    pd.DataFrame({
+        "location_a": ["Seattle, WA", "Nowhere, ZZ", "Boston, MA", "saint paul, mn", ""],
+        "location_b": ["Boston, MA", "Seattle, WA", "St. Paul, MN", "Seattle, WA", "Seattle, WA"],
+    }).to_csv(input_path, index=False)
+    output_path = str(tmp_path / f"out.{suffix}")
+
+    assert bulk_compare.run(str(input_path), output_path, workers=2, chunk_size=1, offline=True) == 5
+
+    out = pd.read_parquet(output_path) if suffix == "parquet" else pd.read_csv(output_path, dtype=str)
+    assert out["location_a"].fillna("").tolist() == ["Seattle, WA", "Nowhere, ZZ", "Boston, MA", "saint paul, mn", ""]
+    assert out["b.real_estate.city"].tolist() == ["Boston", "Seattle", "St. Paul", "Seattle", "Seattle"]
+    assert out["a.real_estate.first_address"].notna().tolist() == [False, True, False, False, False]
+    assert out["a.error"].notna().tolist() == [False, False, False, False, True]
+    assert float(out["a.lat"][0]) == 7.0
+    assert sorted(os.listdir(tmp_path)) == ["out." + suffix, "pairs.csv"]
@@ -0,0 +1,52 @@
+import json
+
+import pytest
+
+from census_snapshot import CensusSnapshot, ingest_acs, place_key
+
+
+@pytest.mark.parametrize("name, key", [
+    ("Seattle city, Washington", "SEATTLE"),
+    ("St. Paul city, Minnesota", "SAINT PAUL"),
+    ("Anchorage municipality, Alaska", "ANCHORAGE"),
+    ("Nashville-Davidson metropolitan government (balance), Tennessee", "NASHVILLE DAVIDSON"),
+    ("Lexington-Fayette urban county, Kentucky", "LEXINGTON FAYETTE"),
+    ("Arlington CDP, Virginia", "ARLINGTON"),
+    ("Ponce zona urbana, Puerto Rico", "PONCE"),
+    # Capitalized words belong to the name, not the suffix
+    ("Salt Lake City city, Utah", "SALT LAKE CITY"),
+])
+def test_place_key_strips_area_descriptions(name, key):
+    assert place_key(name) == key
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    header = ["NAME", "B19013_001E", "B01003_001E", "B01002_001E", "B25077_001E", "B25064_001E", "state", "place"]
+    rows = [
+        ["Seattle city, Washington", "97185", "737015", "35.5", "748400", "1758", "53", "63000"],
+        ["Franklin CDP, Tennessee", "50000", "90000", "40.0", "200000", "900", "47", "27739"],
+        ["Franklin city, Tennessee", "94560", "83454", "38.2", "523200", "1422", "47", "27740"],
+        ["St. Paul city, Minnesota", "-666666666", "311527", "32.7", "247400", "1110", "27", "58000"],
+    ]
+    source = tmp_path / "acs.json"
+    source.write_text(json.dumps([header] + rows))
+    store = str(tmp_path / "acs.feather")
+    ingest_acs(str(source), store, year=2021)
+    return CensusSnapshot.load(store)
+
+
+def test_lookup_by_normalized_name_and_state(snapshot):
+    assert snapshot.year == 2021
+    assert snapshot.lookup("seattle", "Washington")["total_population"] == 737015
+    assert snapshot.lookup("Seattle", "OR") is None
+    assert snapshot.by_geoid("5363000")["name"] == "Seattle city, Washington"
+
+
+def test_incorporated_place_wins_over_cdp(snapshot):
+    assert snapshot.lookup("Franklin", "TN")["name"] == "Franklin city, Tennessee"
+
+
+def test_suppressed_estimates_are_missing(snapshot):
+    row = snapshot.lookup("Saint Paul", "MN")
+    assert row["median_household_income"] is None and row["total_population"] == 311527
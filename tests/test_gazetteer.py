@@ -0,0 +1,74 @@
+import pandas as pd
+import pytest
+
+from geocoder import Gazetteer
+
+
+@pytest.fixture(scope="module")
+def gazetteer():
+    return Gazetteer.from_file()
+
+
+@pytest.mark.parametrize("query, city, state", [
+    ("NYC, NY", "New York", "NY"),
+    ("New York City, New York", "New York", "NY"),
+    ("LA, CA", "Los Angeles", "CA"),
+    ("Washington DC, DC", "Washington", "DC"),
+    ("St. Paul, Minnesota", "Saint Paul", "MN"),
+    ("Ft Worth, TX", "Fort Worth", "TX"),
+    ("  mt. vernon ,  wa ", "Mount Vernon", "WA"),
+])
+def test_aliases_and_abbreviations_resolve_exactly(gazetteer, query, city, state):
+    result = gazetteer.lookup(query)
+    assert (result.city, result.state, result.source) == (city, state, "gazetteer")
+
+
+def test_fuzzy_match_stays_within_the_state(gazetteer):
+    result = gazetteer.lookup("Seatle, WA")
+    assert (result.city, result.source) == ("Seattle", "gazetteer-fuzzy")
+    assert (result.lat, result.lon) == gazetteer.lookup("Seattle, WA")[:2]
+    assert gazetteer.lookup("Seatle, OR") is None
+    assert gazetteer.lookup("Xqzzyv, WA") is None
+    # A stricter cutoff turns the misspelling into a miss
+    assert gazetteer.lookup("Seatle, WA", fuzzy_cutoff=0.95) is None
+
+
+@pytest.mark.parametrize("query", ["98101", "98101-1234"])
+def test_zip_codes(gazetteer, query):
+    result = gazetteer.lookup(query)
+    assert (result.city, result.state, result.source) == ("Seattle", "WA", "gazetteer-zip")
+
+
+def test_unparsable_location_is_a_miss(gazetteer):
+    assert gazetteer.lookup("Seattle") is None
+
+
+def test_centroids_prefer_primary_zip_names():
+    zips = pd.DataFrame({
+        "zip": ["98101", "98102", "98103"], "lat": [47.0, 48.0, 50.0], "lon": [-122.0, -123.0, -125.0],
+        "city": ["Seattle", "Seattle", "Seattle"], "state": ["WA", "WA", "WA"], "primary": [1, 1, 0],
+    })
+    # An alternate name counts only for a place with no ZIP of its own
+    zips.loc[3] = ["98104", 40.0, -120.0, "Rural Route", "WA", 0]
+    gazetteer = Gazetteer(zips)
+
+    assert gazetteer.lookup("Seattle, WA")[:2] == (47.5, -122.5)
+    assert gazetteer.lookup("Rural Route, WA")[:2] == (40.0, -120.0)
+    assert gazetteer.lookup("98103") is None
+
+
+def test_building_only_places_are_added_at_their_zip_centroid():
+    zips = pd.DataFrame({
+        "zip": ["98101", "98102"], "lat": [47.0, 48.0], "lon": [-122.0, -123.0],
+        "city": ["Seattle", "Seattle"], "state": ["WA", "WA"], "primary": [1, 1],
+    })
+    gazetteer = Gazetteer(zips)
+    buildings = pd.DataFrame({
+        "Bldg City": ["FEDERAL CAMPUS", "FEDERAL CAMPUS", "SEATTLE"],
+        "Bldg State": ["WA", "WA", "WA"],
+        "Bldg Zip": ["981010001", "98102", "98101"],
+    })
+
+    assert gazetteer.extend_from_buildings(buildings) == 1
+    result = gazetteer.lookup("Federal Campus, Washington")
+    assert (result.lat, result.lon, result.city) == (47.5, -122.5, "Federal Campus")
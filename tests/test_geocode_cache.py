@@ -0,0 +1,127 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import geocode_cache
+from geocode_cache import CachedGeocoder, GeocodeCache, SingleFlight, TokenBucket
+from geocoder import GeocodeResult, NominatimGeocoder
+
+SEATTLE = GeocodeResult(47.6, -122.3, "Seattle", "WA", "nominatim")
+
+
+class _Geolocator:
+    """geopy stand-in: returns (or raises) the scripted answers in order"""
+
+    def __init__(self, *answers):
+        self.answers = list(answers)
+        self.calls = 0
+
+    def geocode(self, query, timeout):
+        self.calls += 1
+        answer = self.answers.pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+
+def _nominatim(*answers) -> NominatimGeocoder:
+    geocoder = NominatimGeocoder(max_retries=3, retry_delay=0)
+    geocoder._geolocator = _Geolocator(*answers)
+    return geocoder
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return GeocodeCache(str(tmp_path / "geocode.sqlite"), ttl=100, negative_ttl=10)
+
+
+@pytest.mark.parametrize("answer", [None, SimpleNamespace(latitude="", longitude="-122.3"),
+                                    SimpleNamespace(latitude=147.6, longitude=-122.3)])
+def test_empty_and_malformed_answers_are_cached_negatives(cache, answer):
+    upstream = _nominatim(answer)
+    geocoder = CachedGeocoder(upstream, cache)
+
+    assert geocoder.lookup("Seattle, WA") is None
+    assert geocoder.lookup("seattle, washington") is None
+    # One request, no retries, and the second lookup is a negative hit rather than an error
+    assert upstream.geolocator.calls == 1
+    assert geocoder.stats()["negative_hits"] == 1 and geocoder.stats()["upstream_errors"] == 0
+
+
+def test_upstream_errors_are_retried_and_not_cached(cache):
+    upstream = _nominatim(OSError("timeout"), OSError("timeout"), OSError("timeout"),
+                          SimpleNamespace(latitude=47.6, longitude=-122.3))
+    geocoder = CachedGeocoder(upstream, cache)
+
+    with pytest.raises(OSError):
+        geocoder.lookup("Seattle, WA")
+    assert upstream.geolocator.calls == 3
+    assert geocoder.lookup("Seattle, WA") == SEATTLE
+    assert geocoder.stats()["upstream_errors"] == 1
+
+
+def test_entries_expire_after_their_ttl(cache, monkeypatch):
+    now = time.time()
+    cache.put("seattle|WA", SEATTLE)
+    cache.put("nowhere|ZZ", None)
+    assert cache.get("seattle|WA") == (True, SEATTLE)
+    assert cache.get("nowhere|ZZ") == (True, None)
+
+    # Negatives expire first, then positives
+    monkeypatch.setattr(geocode_cache.time, "time", lambda: now + 50)
+    assert cache.get("nowhere|ZZ") == (False, None)
+    assert cache.get("seattle|WA") == (True, SEATTLE)
+    monkeypatch.setattr(geocode_cache.time, "time", lambda: now + 150)
+    assert cache.get("seattle|WA") == (False, None)
+    assert cache.purge_expired() == 2 and len(cache) == 0
+
+
+def test_token_bucket_spaces_requests_after_a_burst():
+    bucket = TokenBucket(rate=20, capacity=2)
+    started = time.monotonic()
+    waits = [bucket.acquire() for _ in range(6)]
+
+    # The first two ride the burst capacity; the remaining four wait about 1/20s each
+    assert waits[:2] == [0.0, 0.0]
+    assert all(wait > 0 for wait in waits[2:])
+    assert 0.18 <= time.monotonic() - started < 1.0
+
+
+def test_single_flight_coalesces_concurrent_callers():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        release.wait(5)
+        return "result"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("key", slow))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    while not calls:
+        time.sleep(0.01)
+    # Give the followers time to join the flight before the leader finishes
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert sorted(results) == [("result", False)] + [("result", True)] * 7
+    # The flight is over, so the next call runs again
+    assert flight.do("key", lambda: "again") == ("again", False)
+
+
+def test_single_flight_raises_errors_and_then_forgets_them():
+    def failing():
+        raise RuntimeError("upstream down")
+
+    flight = SingleFlight()
+    with pytest.raises(RuntimeError):
+        flight.do("key", failing)
+    assert flight.do("key", lambda: "recovered") == ("recovered", False)
@@ -0,0 +1,26 @@
+import time
+
+import location_data
+from location_data import FetchOrchestrator
+
+
+def test_timed_out_batch_is_not_cancelled_for_other_locations(monkeypatch):
+    def slow(*args):
+        time.sleep(0.1)
+        return {}
+
+    # One worker: the safety batch is still queued behind the per-location tasks at its deadline
+    monkeypatch.setattr(location_data, "get_real_estate_data", slow)
+    monkeypatch.setattr(location_data, "get_demographic_data", slow)
+    monkeypatch.setattr(location_data, "get_measured_aqi", lambda lat, lon: float("nan"))
+    orchestrator = FetchOrchestrator(max_workers=1, timeouts={"safety": 0.05})
+
+    results = orchestrator.fetch(["Seattle, WA", "Portland, OR", "Boston, MA"])
+
+    assert results[0]["failed_sources"]["safety"].startswith("timed out")
+    for data in results[1:]:
+        # Each later location gets the batch result or its own timeout, never a CancelledError
+        if "safety" in data["failed_sources"]:
+            assert data["failed_sources"]["safety"].startswith("timed out")
+        else:
+            assert data["safety"] is not None
@@ -0,0 +1,99 @@
+import json
+import socket
+import struct
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import providers
+from providers import HTTPClient, ProviderError
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_GET(self):
+        self.server.hits[self.path] = hits = self.server.hits.get(self.path, 0) + 1
+        failures = self.server.failures.get(self.path, 0)
+        if hits <= failures and self.path.startswith("/reset"):
+            # Abortive close: the client sees a connection reset, not a response
+            self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+            self.close_connection = True
+            return
+        status, payload = (503, {"error": "busy"}) if hits <= failures else (200, {"hits": hits})
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture()
+def stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    server.connections, server.hits, server.failures = 0, {}, {}
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server, f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture()
+def sleeps(monkeypatch):
+    recorded = []
+    monkeypatch.setattr(providers.time, "sleep", recorded.append)
+    return recorded
+
+
+def test_retries_503_with_jittered_backoff(stub, sleeps):
+    server, base = stub
+    server.failures["/flaky"] = 2
+    client = HTTPClient(max_retries=3, backoff=0.5)
+
+    assert client.get_json(base + "/flaky") == {"hits": 3}
+    assert server.hits["/flaky"] == 3
+    assert len(sleeps) == 2
+    for attempt, delay in enumerate(sleeps):
+        assert 0.5 * 2 ** attempt * 0.5 <= delay <= 0.5 * 2 ** attempt * 1.5
+
+
+def test_retries_connection_resets(stub, sleeps):
+    server, base = stub
+    server.failures["/reset"] = 1
+    client = HTTPClient(max_retries=2, backoff=0.1)
+
+    assert client.get_json(base + "/reset") == {"hits": 2}
+    assert server.hits["/reset"] == 2
+    assert len(sleeps) == 1 and 0.05 <= sleeps[0] <= 0.15
+
+
+def test_gives_up_after_max_retries(stub, sleeps):
+    server, base = stub
+    server.failures["/down"] = 10
+    client = HTTPClient(max_retries=2, backoff=0.1)
+
+    with pytest.raises(ProviderError, match="after 3 attempts: status 503"):
+        client.get_json(base + "/down")
+    assert server.hits["/down"] == 3
+    assert len(sleeps) == 2
+
+
+def test_pooled_connection_is_reused(stub):
+    server, base = stub
+    client = HTTPClient()
+
+    for _ in range(5):
+        client.get_json(base + "/ok")
+    assert server.hits["/ok"] == 5
+    assert server.connections == 1
+    client.close()
@@ -0,0 +1,43 @@
+import os
+
+import pandas as pd
+import pytest
+
+from location_data import get_real_estate_data
+from resources import refresh_if_stale, registry
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def inventory(tmp_path, monkeypatch):
+    """A small copy of the inventory in a scratch working directory, read through the shared registry"""
+    rows = pd.read_csv(os.path.join(ROOT, "data_gov_bldg_rexus.csv"), dtype=str, keep_default_na=False).iloc[:20]
+    monkeypatch.chdir(tmp_path)
+    rows.to_csv("data_gov_bldg_rexus.csv", index=False)
+    registry.invalidate()
+    yield rows
+    registry.invalidate()
+
+
+def _rewrite(rows):
+    stat = os.stat("data_gov_bldg_rexus.csv")
+    rows.to_csv("data_gov_bldg_rexus.csv", index=False)
+    # Filesystems with coarse timestamps could otherwise keep the old mtime
+    os.utime("data_gov_bldg_rexus.csv", ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_csv_edited_after_first_load_is_served(inventory):
+    # Nothing loaded yet, so nothing to bring up to date
+    assert not refresh_if_stale()
+    assert get_real_estate_data("Springfield", "ZZ")["first_address"] == "No building found in database."
+
+    added = inventory.iloc[[0]].assign(**{"Location Code": "ZZ9999", "Bldg City": "SPRINGFIELD", "Bldg State": "ZZ",
+                                         "Bldg Address1": "1 NEW ST"})
+    _rewrite(pd.concat([inventory, added], ignore_index=True))
+
+    # No question was asked in between: the lookup path refreshes on its own
+    assert get_real_estate_data("Springfield", "ZZ")["first_address"] == "1 NEW ST"
+    assert len(registry.get("rexus_df")) == len(inventory) + 1
+    assert not refresh_if_stale()
+
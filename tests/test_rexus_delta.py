@@ -0,0 +1,94 @@
+import os
+import shutil
+import zlib
+
+import numpy as np
+import pandas as pd
+
+import rexus_delta
+from embedding_cache import rexus_corpus_text
+from hybrid_retrieval import HybridRetriever
+from resources import ResourceRegistry
+from rexus_delta import KEY_COLUMN, apply_snapshot
+from rexus_store import conform_rexus_export, load_rexus_store
+from vector_index import ExactIndex
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_two_digit_year_keeps_stored_century():
+    previous = pd.DataFrame({
+        "Location Code": ["CT0024", "XX0001"],
+        "Construction Date": pd.to_datetime(["1919-01-01", "1970-01-01"]),
+    })
+    raw = pd.DataFrame({
+        "Location Code": ["CT0024", "XX0001", "XX0002"],
+        "Construction Date": ["1-Jan-19", "1-Jan-00", "1-Jan-19"],
+    })
+    conformed = conform_rexus_export(raw, reference_year=2026, previous=previous)
+    # Matching day, month and digits keep the stored 1919; the rest fall back to the pivot
+    assert conformed["Construction Date"].tolist() == ["01-Jan-1919", "01-Jan-2000", "01-Jan-2019"]
+
+
+def test_bundled_snapshot_has_no_century_shifts(tmp_path):
+    csv_path = str(tmp_path / "rexus.csv")
+    shutil.copy(os.path.join(ROOT, "data_gov_bldg_rexus.csv"), csv_path)
+    store_path = str(tmp_path / "rexus.feather")
+    old = load_rexus_store(csv_path, store_path)
+
+    delta = apply_snapshot(os.path.join(ROOT, "data", "rexus_data.csv"), csv_path, store_path, dry_run=True)
+
+    merged = old.merge(delta.new, on=KEY_COLUMN, suffixes=("_old", "_new"))
+    before, after = merged["Construction Date_old"], merged["Construction Date_new"]
+    shifted = (
+        before.notna() & after.notna() & (before != after)
+        & (before.dt.strftime("%m-%d") == after.dt.strftime("%m-%d"))
+        & ((after.dt.year - before.dt.year) % 100 == 0)
+    )
+    assert not shifted.any(), merged.loc[shifted, [KEY_COLUMN, "Construction Date_old", "Construction Date_new"]]
+    assert delta.summary()["inserted"] == 205
+    assert delta.summary()["deleted"] == 178
+
+
+class _HashModel:
+    """Deterministic stand-in for the sentence-transformer: one vector per distinct text"""
+
+    def encode(self, texts):
+        return np.stack([np.random.default_rng(zlib.crc32(text.encode())).normal(size=8) for text in texts])
+
+
+def test_refresh_after_duplicate_code_keeps_rows_aligned(tmp_path, monkeypatch):
+    bundled = pd.read_csv(os.path.join(ROOT, "data_gov_bldg_rexus.csv"), dtype=str, keep_default_na=False)
+    rows = bundled.iloc[:6].copy()
+    # The first building appears twice; the later row is the one kept
+    old_raw = pd.concat([rows.iloc[[0]].assign(**{"Bldg Address1": "1 STALE ST"}), rows], ignore_index=True)
+    csv_path, store_path = str(tmp_path / "rexus.csv"), str(tmp_path / "rexus.feather")
+    old_raw.to_csv(csv_path, index=False)
+    monkeypatch.setattr(rexus_delta, "embedding_cache_path", lambda path: str(tmp_path / "embeddings.npy"))
+
+    model = _HashModel()
+    registry = ResourceRegistry()
+    registry.register("rexus_df", lambda r: load_rexus_store(csv_path, store_path))
+    registry.register("rexus_embeddings", lambda r: model.encode(rexus_corpus_text(r.get("rexus_df")).tolist()),
+                      depends_on=["rexus_df"])
+    registry.register("rexus_index", lambda r: ExactIndex(r.get("rexus_embeddings")), depends_on=["rexus_embeddings"])
+    registry.register("rexus_retriever", lambda r: HybridRetriever(r.get("rexus_df"), r.get("rexus_index")),
+                      depends_on=["rexus_df", "rexus_index"])
+    old = registry.get("rexus_df")
+    assert len(old) == 6 and not old[KEY_COLUMN].duplicated().any()
+    registry.get("rexus_retriever")
+
+    new_raw = rows.drop(index=2).assign(**{"Bldg Address1": lambda df: df["Bldg Address1"].where(df.index != 4, "9 NEW AVE")})
+    new_raw.to_csv(csv_path, index=False)
+    delta = rexus_delta.refresh_registry(registry, model, csv_path, store_path)
+
+    new = registry.get("rexus_df")
+    assert delta.summary()["deleted"] == 1 and delta.summary()["updated"] == 1
+    assert np.allclose(registry.get("rexus_embeddings"), model.encode(rexus_corpus_text(new).tolist()))
+    rebuilt = HybridRetriever(new, ExactIndex(registry.get("rexus_embeddings")))
+    updated = registry.get("rexus_retriever")
+    assert updated.bm25.postings.keys() == rebuilt.bm25.postings.keys()
+    for token, (doc_ids, tf) in rebuilt.bm25.postings.items():
+        order = np.argsort(updated.bm25.postings[token][0])
+        assert updated.bm25.postings[token][0][order].tolist() == sorted(doc_ids.tolist())
+    assert np.array_equal(updated.bm25.doc_lengths, rebuilt.bm25.doc_lengths)
@@ -0,0 +1,24 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from score_table import METRICS, ScoreTable
+
+
+@pytest.fixture(scope="module")
+def scores():
+    table = pd.DataFrame({"city": ["Seattle", "Spokane", "Portland"], "state": ["WA", "WA", "OR"]})
+    for metric in METRICS:
+        table[metric] = np.nan
+    table["walkability"] = [90.0, 60.0, 80.0]
+    return ScoreTable(table)
+
+
+@pytest.mark.parametrize("state", ["WA", "wa", "Washington", " washington "])
+def test_state_filters_accept_names_and_codes(scores, state):
+    assert scores.top("walkability", state=state)["city"].tolist() == ["Seattle", "Spokane"]
+    assert scores.where("walkability", min_value=70, state=state)["city"].tolist() == ["Seattle"]
+
+
+def test_unknown_state_matches_nothing(scores):
+    assert scores.top("walkability", state="Atlantis").empty
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from vector_index import ExactIndex, Float16Index, Int8Index, IVFIndex, build_vector_index, normalize_rows
+
+
+def _clustered(n: int, dim: int = 64, clusters: int = 20, seed: int = 0) -> np.ndarray:
+    """Embedding-like data: points scattered around a few directions"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    return (centers[rng.integers(clusters, size=n)] + 0.4 * rng.normal(size=(n, dim))).astype(np.float32)
+
+
+def _recall(index, exact: ExactIndex, queries: np.ndarray, k: int = 10) -> float:
+    _, expected = exact.search(queries, k)
+    _, found = index.search(queries, k)
+    return np.mean([len(set(e) & set(f)) / k for e, f in zip(expected, found)])
+
+
+@pytest.fixture(scope="module")
+def data():
+    vectors = _clustered(3000)
+    queries = _clustered(200, seed=1)
+    return vectors, queries, ExactIndex(vectors)
+
+
+@pytest.mark.parametrize("backend, min_recall", [("int8", 0.99), ("float16", 1.0)])
+def test_quantized_recall_against_exact(data, backend, min_recall):
+    vectors, queries, exact = data
+    index = build_vector_index(vectors, backend)
+
+    assert _recall(index, exact, queries) >= min_recall
+    # Re-ranked at full precision, so the scores are exact ones
+    expected, _ = exact.search(queries, 3)
+    scores, _ = index.search(queries, 3)
+    assert np.allclose(scores, expected, atol=1e-5)
+    assert index.nbytes < normalize_rows(vectors).nbytes / (3.5 if backend == "int8" else 1.9)
+
+
+@pytest.mark.parametrize("index_cls", [Int8Index, Float16Index])
+def test_quantized_update_matches_a_rebuild(data, index_cls):
+    vectors, _, _ = data
+    index = index_cls(vectors[:2000])
+    new_vectors = np.concatenate([vectors[500:2000], vectors[2000:]])
+    source = np.concatenate([np.arange(500, 2000), np.full(1000, -1)])
+
+    updated, rebuilt = index.updated(new_vectors, source), index_cls(new_vectors)
+    assert np.array_equal(updated.codes, rebuilt.codes)
+    assert np.array_equal(updated.scales, rebuilt.scales)
+
+
+def test_ivf_update_keeps_cells_and_matches_rebuild_recall(data):
+    vectors, queries, _ = data
+    index = IVFIndex(vectors[:2000], n_probe=4)
+    new_vectors = np.concatenate([vectors[500:2000], vectors[2000:]])
+    source = np.concatenate([np.arange(500, 2000), np.full(1000, -1)])
+
+    updated = index.updated(new_vectors, source)
+    assignment = updated._assignment()
+    # Every row is in exactly one cell; kept rows stay in theirs, new rows join the nearest centroid
+    assert sorted(updated._order.tolist()) == list(range(len(new_vectors)))
+    assert np.array_equal(assignment[:1500], index._assignment()[500:2000])
+    assert np.array_equal(assignment[1500:], np.argmax(updated.vectors[1500:] @ updated.centroids.T, axis=1))
+
+    exact = ExactIndex(new_vectors)
+    rebuilt = IVFIndex(new_vectors, n_lists=index.n_lists, n_probe=4)
+    # Centroids trained on the old rows still partition rows from the same distribution
+    # about as well; k-means initialization alone moves recall by a few points
+    assert _recall(updated, exact, queries) >= _recall(rebuilt, exact, queries) - 0.1
@@ -0,0 +1,283 @@
+"""Pluggable cosine-similarity vector indexes for building retrieval."""
+from typing import Dict, Optional, Tuple, Type
+
+import numpy as np
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """Unit-normalize rows as float32, returning the input untouched if it already is"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    if np.allclose(norms, 1.0, atol=1e-4):
+        return vectors
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the k largest scores along the last axis, best first, using
+    a partial selection instead of sorting every score.
+    """
+    n = scores.shape[-1]
+    k = min(k, n)
+    if k <= 0:
+        return np.empty(scores.shape[:-1] + (0,), dtype=np.int64)
+    if k < n:
+        part = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    else:
+        part = np.broadcast_to(np.arange(n), scores.shape).copy()
+    order = np.argsort(-np.take_along_axis(scores, part, axis=-1), axis=-1, kind="stable")
+    return np.take_along_axis(part, order, axis=-1)
+
+
+def quantize_rows(vectors: np.ndarray, dtype: str = "int8", block_size: int = 16384) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Compact codes and per-row float32 scales with ``vectors ~= codes * scales[:, None]``.
+    int8 uses symmetric per-row scaling (max |value| maps to 127); float16
+    is a plain cast with unit scales. Works block by block so a
+    memory-mapped input is never copied whole.
+    """
+    if dtype not in ("int8", "float16"):
+        raise ValueError(f"Unsupported quantization dtype '{dtype}', expected 'int8' or 'float16'")
+    n = len(vectors)
+    codes = np.empty(vectors.shape, dtype=np.int8 if dtype == "int8" else np.float16)
+    scales = np.ones(n, dtype=np.float32)
+    for start in range(0, n, block_size):
+        block = np.asarray(vectors[start:start + block_size], dtype=np.float32)
+        if dtype == "float16":
+            codes[start:start + block_size] = block
+            continue
+        block_scales = np.abs(block).max(axis=1) / 127
+        block_scales[block_scales == 0] = 1.0
+        codes[start:start + block_size] = np.rint(block / block_scales[:, None])
+        scales[start:start + block_size] = block_scales
+    return codes, scales
+
+
+def _pad(scores: np.ndarray, indices: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    missing = k - len(indices)
+    if missing <= 0:
+        return scores, indices
+    return (
+        np.concatenate([scores, np.full(missing, -np.inf, dtype=np.float32)]),
+        np.concatenate([indices, np.full(missing, -1, dtype=np.int64)]),
+    )
+
+
+class VectorIndex:
+    """Base class: holds unit-normalized vectors and answers batched top-k queries"""
+
+    name = "base"
+
+    def __init__(self, vectors: np.ndarray):
+        self.vectors = normalize_rows(vectors)
+
+    def __len__(self) -> int:
+        return self.vectors.shape[0]
+
+    def search(self, queries: np.ndarray, top_k: int = 3) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return (scores, indices), each shaped (n_queries, top_k) and ordered
+        best first. Slots beyond the available candidates hold -inf / -1.
+        """
+        raise NotImplementedError
+
+    def updated(self, vectors: np.ndarray, source: np.ndarray) -> "VectorIndex":
+        """
+        An index of the same kind over ``vectors``, where row ``i`` repeats row
+        ``source[i]`` of this index (or is new when -1). Subclasses carry over
+        whatever they derived from the reused rows instead of rebuilding it.
+        """
+        return type(self)(vectors)
+
+
+class ExactIndex(VectorIndex):
+    """Brute-force inner product over every vector"""
+
+    name = "exact"
+
+    def search(self, queries: np.ndarray, top_k: int = 3) -> Tuple[np.ndarray, np.ndarray]:
+        queries = normalize_rows(queries)
+        scores = queries @ self.vectors.T
+        indices = top_k_indices(scores, top_k)
+        top_scores = np.take_along_axis(scores, indices, axis=-1)
+        if indices.shape[1] < top_k:
+            padded = [_pad(s, i, top_k) for s, i in zip(top_scores, indices)]
+            return np.stack([p[0] for p in padded]), np.stack([p[1] for p in padded])
+        return top_scores, indices
+
+
+class IVFIndex(VectorIndex):
+    """
+    Inverted-file index: spherical k-means partitions the vectors into
+    ``n_lists`` cells and a query only scores the ``n_probe`` closest cells.
+    """
+
+    name = "ivf"
+
+    def __init__(
+        self,
+        vectors: np.ndarray,
+        n_lists: Optional[int] = None,
+        n_probe: int = 8,
+        n_iter: int = 10,
+        seed: int = 0,
+    ):
+        super().__init__(vectors)
+        n = len(self.vectors)
+        self.n_lists = max(1, min(n, n_lists or int(np.sqrt(n))))
+        self.n_probe = max(1, min(n_probe, self.n_lists))
+        self.centroids = self._train(n_iter, seed)
+        self._assign_lists(self._nearest_centroid(self.vectors))
+
+    def _nearest_centroid(self, vectors: np.ndarray, batch_size: int = 8192) -> np.ndarray:
+        assignment = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), batch_size):
+            block = vectors[start:start + batch_size]
+            assignment[start:start + batch_size] = np.argmax(block @ self.centroids.T, axis=1)
+        return assignment
+
+    def _train(self, n_iter: int, seed: int) -> np.ndarray:
+        rng = np.random.default_rng(seed)
+        if len(self.vectors) == 0:
+            return np.zeros((1, self.vectors.shape[1]), dtype=np.float32)
+        self.centroids = self.vectors[rng.choice(len(self.vectors), self.n_lists, replace=False)].copy()
+        for _ in range(n_iter):
+            assignment = self._nearest_centroid(self.vectors)
+            sums = np.zeros_like(self.centroids)
+            np.add.at(sums, assignment, self.vectors)
+            counts = np.bincount(assignment, minlength=self.n_lists)
+            empty = counts == 0
+            if empty.any():
+                # Re-seed empty cells with random vectors so every list stays useful
+                sums[empty] = self.vectors[rng.choice(len(self.vectors), int(empty.sum()))]
+            self.centroids = normalize_rows(sums)
+        return self.centroids
+
+    def _assign_lists(self, assignment: np.ndarray) -> None:
+        self._order = np.argsort(assignment, kind="stable")
+        counts = np.bincount(assignment, minlength=self.n_lists)
+        self._offsets = np.concatenate([[0], np.cumsum(counts)])
+
+    def _assignment(self) -> np.ndarray:
+        assignment = np.empty(len(self._order), dtype=np.int64)
+        assignment[self._order] = np.repeat(np.arange(self.n_lists), np.diff(self._offsets))
+        return assignment
+
+    def updated(self, vectors: np.ndarray, source: np.ndarray) -> "IVFIndex":
+        """Keeps the trained centroids; only new rows are assigned to a cell"""
+        index = object.__new__(type(self))
+        VectorIndex.__init__(index, vectors)
+        index.n_lists, index.n_probe, index.centroids = self.n_lists, self.n_probe, self.centroids
+        assignment = np.empty(len(index.vectors), dtype=np.int64)
+        reused = source >= 0
+        assignment[reused] = self._assignment()[source[reused]]
+        assignment[~reused] = index._nearest_centroid(index.vectors[~reused])
+        index._assign_lists(assignment)
+        return index
+
+    def search(self, queries: np.ndarray, top_k: int = 3) -> Tuple[np.ndarray, np.ndarray]:
+        queries = normalize_rows(queries)
+        probes = top_k_indices(queries @ self.centroids.T, self.n_probe)
+        all_scores = np.empty((len(queries), top_k), dtype=np.float32)
+        all_indices = np.empty((len(queries), top_k), dtype=np.int64)
+        for row, (query, cells) in enumerate(zip(queries, probes)):
+            candidates = np.concatenate([self._order[self._offsets[c]:self._offsets[c + 1]] for c in cells])
+            scores = self.vectors[candidates] @ query
+            best = top_k_indices(scores, top_k)
+            all_scores[row], all_indices[row] = _pad(scores[best], candidates[best], top_k)
+        return all_scores, all_indices
+
+
+class QuantizedIndex(VectorIndex):
+    """
+    Scans compact codes (see :func:`quantize_rows`) to shortlist
+    ``rerank * top_k`` candidates, then re-ranks the shortlist against the
+    full-precision vectors. Only the codes need to stay resident; the float32
+    matrix can remain memory-mapped on disk, where re-ranking touches just
+    the shortlisted rows.
+    """
+
+    name = "quantized"
+    dtype = "int8"
+
+    def __init__(self, vectors: np.ndarray, rerank: int = 10, block_size: int = 1024):
+        super().__init__(vectors)
+        self.rerank = max(1, rerank)
+        self.block_size = block_size
+        self.codes, self.scales = quantize_rows(self.vectors, self.dtype, block_size)
+
+    def updated(self, vectors: np.ndarray, source: np.ndarray) -> "QuantizedIndex":
+        """Reuses the codes of unchanged rows and quantizes only the new ones"""
+        index = object.__new__(type(self))
+        VectorIndex.__init__(index, vectors)
+        index.rerank, index.block_size = self.rerank, self.block_size
+        reused = source >= 0
+        index.codes = np.empty(index.vectors.shape, dtype=self.codes.dtype)
+        index.scales = np.empty(len(index.vectors), dtype=np.float32)
+        index.codes[reused], index.scales[reused] = self.codes[source[reused]], self.scales[source[reused]]
+        fresh = np.flatnonzero(~reused)
+        index.codes[fresh], index.scales[fresh] = quantize_rows(index.vectors[fresh], self.dtype, self.block_size)
+        return index
+
+    @property
+    def nbytes(self) -> int:
+        """Resident size of the codes and scales"""
+        return self.codes.nbytes + self.scales.nbytes
+
+    def approximate_scores(self, queries: np.ndarray) -> np.ndarray:
+        """Dot products against the dequantized codes, shaped (n_queries, n)"""
+        queries = normalize_rows(queries)
+        scores = np.empty((len(queries), len(self.codes)), dtype=np.float32)
+        # Dequantize a cache-sized block at a time: the float32 working set stays
+        # small and the scan runs at about the speed of a float32 one
+        for start in range(0, len(self.codes), self.block_size):
+            block = self.codes[start:start + self.block_size].astype(np.float32)
+            scores[:, start:start + len(block)] = (queries @ block.T) * self.scales[start:start + len(block)]
+        return scores
+
+    def search(self, queries: np.ndarray, top_k: int = 3) -> Tuple[np.ndarray, np.ndarray]:
+        queries = normalize_rows(queries)
+        shortlists = top_k_indices(self.approximate_scores(queries), top_k * self.rerank)
+        all_scores = np.empty((len(queries), top_k), dtype=np.float32)
+        all_indices = np.empty((len(queries), top_k), dtype=np.int64)
+        for row, (query, candidates) in enumerate(zip(queries, shortlists)):
+            # Sorted positions read the memory-mapped rows in file order
+            candidates = np.sort(candidates)
+            scores = np.asarray(self.vectors[candidates], dtype=np.float32) @ query
+            best = top_k_indices(scores, top_k)
+            all_scores[row], all_indices[row] = _pad(scores[best], candidates[best], top_k)
+        return all_scores, all_indices
+
+
+class Int8Index(QuantizedIndex):
+    """int8 codes with per-vector scales: a quarter of the float32 size"""
+
+    name = "int8"
+    dtype = "int8"
+
+
+class Float16Index(QuantizedIndex):
+    """float16 codes: half the float32 size"""
+
+    name = "float16"
+    dtype = "float16"
+
+
+VECTOR_INDEX_BACKENDS: Dict[str, Type[VectorIndex]] = {
+    ExactIndex.name: ExactIndex,
+    IVFIndex.name: IVFIndex,
+    Int8Index.name: Int8Index,
+    Float16Index.name: Float16Index,
+}
+
+
+def build_vector_index(vectors: np.ndarray, backend: str = "exact", **params) -> VectorIndex:
+    """Build an index over ``vectors`` with one of the registered backends"""
+    try:
+        index_cls = VECTOR_INDEX_BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown vector index backend '{backend}', expected one of {sorted(VECTOR_INDEX_BACKENDS)}")
+    return index_cls(vectors, **params)